@@ -0,0 +1,186 @@
+"""
+Batch triage and assignment of appointments by operations managers.
+
+Ownership, doctors and departments for the whole batch are loaded with one
+query each; slots for appointments that do not hold one yet are reserved
+together by ``reserve_slots``; the changed appointments are written with
+one ``bulk_update`` and their audit rows with one ``bulk_create``, all in
+a single transaction. Moving an already-booked appointment still goes through
+``update_appointment_slot`` in its own savepoint, so a taken slot rejects
+that item without undoing the rest of the batch.
+"""
+from django.db import transaction
+from django.utils import timezone
+from hospitals.models import Doctor, Department
+from users.models import AuditLog
+from .availability import INACTIVE_STATUSES
+from .booking import SLOT_EXEMPT_TYPES, SlotUnavailable, holds_slot, reserve_slots, update_appointment_slot
+from .models import Appointment
+from .transitions import can_transition, record_transitions
+
+# Statuses an operations manager may move an appointment to
+OPERATIONS_STATUSES = ['REVIEWED', 'ASSIGNED', 'CONFIRMED', 'RESCHEDULED', 'CANCELLED']
+MAX_BULK_ASSIGNMENTS = 500
+
+UPDATE_FIELDS = ['doctor', 'department', 'status', 'reviewed_by', 'reviewed_at', 'operations_notes',
+                 'consultation_fee', 'platform_commission', 'updated_at']
+
+
+def _as_id(value):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid id: {value}')
+
+
+def _parse(items):
+    """Normalize request items, returning (parsed, errors)"""
+    parsed = []
+    errors = []
+    seen = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Each assignment must be an object'})
+            continue
+        try:
+            appointment_id = _as_id(item.get('appointment_id'))
+            doctor_id = _as_id(item.get('doctor_id'))
+            department_id = _as_id(item.get('department_id'))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        if appointment_id is None:
+            errors.append({'index': index, 'error': 'appointment_id is required'})
+            continue
+        if appointment_id in seen:
+            errors.append({'index': index, 'appointment_id': appointment_id, 'error': 'Duplicate appointment'})
+            continue
+        seen.add(appointment_id)
+        new_status = item.get('status') or ('ASSIGNED' if doctor_id else 'REVIEWED')
+        if new_status not in OPERATIONS_STATUSES:
+            errors.append({'index': index, 'appointment_id': appointment_id, 'error': f'Invalid status: {new_status}'})
+            continue
+        parsed.append({
+            'index': index,
+            'appointment_id': appointment_id,
+            'doctor_id': doctor_id,
+            'department_id': department_id,
+            'status': new_status,
+            'notes': item.get('notes'),
+        })
+    return parsed, errors
+
+
+def bulk_assign(user, items, ip_address=None):
+    """
+    Apply a batch of assignments and status changes for an operations manager.
+
+    Each item has ``appointment_id`` and optional ``doctor_id``,
+    ``department_id``, ``status`` (defaults to ASSIGNED with a doctor,
+    REVIEWED otherwise) and ``notes``. Returns (updated_appointments, errors);
+    items listed in ``errors`` are left untouched.
+    """
+    parsed, errors = _parse(items)
+    appointments = Appointment.objects.select_related('hospital').filter(
+        id__in=[item['appointment_id'] for item in parsed], hospital__operations_manager=user
+    ).in_bulk()
+    doctors = Doctor.objects.filter(
+        id__in={item['doctor_id'] for item in parsed if item['doctor_id']}, is_active=True
+    ).in_bulk()
+    departments = Department.objects.filter(
+        id__in={item['department_id'] for item in parsed if item['department_id']}, is_active=True
+    ).in_bulk()
+
+    now = timezone.now()
+    accepted = []
+    for item in parsed:
+        appointment = appointments.get(item['appointment_id'])
+        doctor = doctors.get(item['doctor_id']) if item['doctor_id'] else None
+        department = departments.get(item['department_id']) if item['department_id'] else None
+        error = None
+        if appointment is None:
+            error = 'Appointment not found'
+        elif item['doctor_id'] and (doctor is None or doctor.hospital_id != appointment.hospital_id):
+            error = 'Doctor not found in this hospital'
+        elif item['department_id'] and (department is None or department.hospital_id != appointment.hospital_id):
+            error = 'Department not found in this hospital'
+        elif item['status'] != appointment.status and not can_transition(appointment.status, item['status']):
+            error = f'Cannot change an appointment from {appointment.status} to {item["status"]}'
+        if error is not None:
+            errors.append({'index': item['index'], 'appointment_id': item['appointment_id'], 'error': error})
+        else:
+            accepted.append((item, appointment, doctor, department))
+
+    updated = []
+    changes = []
+    claimed = set()  # Slots taken by earlier items of this batch
+    with transaction.atomic():
+        # Appointments that do not hold a slot yet (the usual triage case) are
+        # reserved together; moves of already-booked ones go one by one.
+        fresh = [
+            entry for entry in accepted
+            if entry[2] is not None and not holds_slot(entry[1])
+            and entry[0]['status'] not in INACTIVE_STATUSES
+            and entry[1].appointment_type not in SLOT_EXEMPT_TYPES
+        ]
+        failures = dict(zip(
+            [entry[1].id for entry in fresh],
+            reserve_slots([
+                (doctor.id, appointment.appointment_date, appointment.appointment_time, appointment.id)
+                for _, appointment, doctor, _ in fresh
+            ], claimed) if fresh else [],
+        ))
+
+        for item, appointment, doctor, department in accepted:
+            error = failures.get(appointment.id)
+            if appointment.id not in failures:
+                try:
+                    with transaction.atomic():
+                        update_appointment_slot(
+                            appointment, claimed=claimed,
+                            doctor_id=doctor.id if doctor else appointment.doctor_id,
+                            status=item['status'],
+                        )
+                except SlotUnavailable as e:
+                    error = str(e.detail)
+            if error is not None:
+                errors.append({'index': item['index'], 'appointment_id': item['appointment_id'], 'error': error})
+                continue
+
+            if doctor is not None:
+                appointment.doctor = doctor
+                if not appointment.consultation_fee:
+                    appointment.consultation_fee = doctor.consultation_fee
+            if department is not None:
+                appointment.department = department
+            if appointment.consultation_fee:
+                appointment.platform_commission = (
+                    appointment.consultation_fee * appointment.hospital.commission_rate
+                ) / 100
+            changes.append((appointment.id, appointment.status, item['status']))
+            appointment.status = item['status']
+            appointment.reviewed_by = user
+            appointment.reviewed_at = now
+            appointment.updated_at = now
+            if item['notes'] is not None:
+                appointment.operations_notes = item['notes']
+            updated.append(appointment)
+
+        if updated:
+            Appointment.objects.bulk_update(updated, UPDATE_FIELDS)
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    user=user,
+                    action=f'APPOINTMENT_{appointment.status}',
+                    resource_type='Appointment',
+                    resource_id=appointment.id,
+                    ip_address=ip_address,
+                    details={'bulk': True, 'doctor_id': appointment.doctor_id},
+                )
+                for appointment in updated
+            ])
+            record_transitions(changes, user=user, at=now)
+    errors.sort(key=lambda error: error['index'])
+    return updated, errors
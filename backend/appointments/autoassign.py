@@ -0,0 +1,148 @@
+"""
+Auto-assignment of REQUESTED appointments to doctors.
+
+One pass per hospital loads the unassigned backlog, the hospital's approved
+doctors and their booked slots (see ``appointments.availability``) up front,
+then pops appointments off a heap ordered by priority and requested time.
+Each appointment goes to the least-loaded doctor of its department who is
+free at the requested time (doctors not placed in a department count for
+the one named like their specialization), where load is the covering OPD window's
+bookings relative to its ``max_appointments``. Placements update the
+in-memory bitmaps as they are made, so the plan never double-books, and are
+then written through ``bulk_assign`` in one transaction.
+"""
+import heapq
+from datetime import date
+from django.db.models import Case, IntegerField, Value, When
+from hospitals.models import Department, Doctor
+from .assignment import bulk_assign
+from .availability import Availability, covering_schedule
+from .booking import SLOT_EXEMPT_TYPES
+from .models import Appointment
+
+PRIORITY_RANK = {'URGENT': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
+
+
+class AutoAssigner:
+    """Plans doctor assignments for one hospital's unassigned appointments"""
+
+    def __init__(self, hospital_id, start_date=None, limit=None):
+        self.hospital_id = hospital_id
+        self.start_date = start_date or date.today()
+        self.limit = limit
+
+    def load(self):
+        backlog = Appointment.objects.filter(
+            hospital_id=self.hospital_id, status='REQUESTED', doctor__isnull=True,
+            appointment_date__gte=self.start_date,
+        ).values('id', 'priority', 'appointment_type', 'appointment_date', 'appointment_time',
+                 'department_id', 'created_at')
+        if self.limit:
+            # Slice in the same order the heap pops, so urgent requests are never cut off by older routine ones
+            priority_rank = Case(
+                *[When(priority=priority, then=Value(rank)) for priority, rank in PRIORITY_RANK.items()],
+                default=Value(len(PRIORITY_RANK)), output_field=IntegerField()
+            )
+            backlog = backlog.order_by(
+                priority_rank, 'appointment_date', 'appointment_time', 'created_at', 'id'
+            )[:self.limit]
+        self.backlog = list(backlog)
+
+        doctors = list(Doctor.objects.filter(hospital_id=self.hospital_id, is_active=True, is_approved=True))
+        departments = {
+            name.strip().lower(): department_id
+            for department_id, name in Department.objects.filter(hospital_id=self.hospital_id).values_list(
+                'id', 'name'
+            )
+        }
+        self.doctors_by_department = {}
+        for doctor in doctors:
+            department_id = doctor.department_id or departments.get(doctor.specialization.strip().lower())
+            if department_id:
+                self.doctors_by_department.setdefault(department_id, []).append(doctor.id)
+        self.all_doctor_ids = [doctor.id for doctor in doctors]
+
+        end_date = max((row['appointment_date'] for row in self.backlog), default=self.start_date)
+        self.availability = Availability.for_doctors(doctors, self.start_date, end_date)
+
+    def candidates(self, appointment):
+        if appointment['department_id']:
+            return self.doctors_by_department.get(appointment['department_id'], [])
+        return self.all_doctor_ids
+
+    def load_of(self, doctor_id, day, appointment_time):
+        """(bookings / max_appointments) of the window covering the time, or None when off duty"""
+        schedule = covering_schedule(
+            self.availability.windows(doctor_id, day), appointment_time, self.availability.slot_minutes
+        )
+        if schedule is None:
+            return None
+        booked = self.availability.booked_count[(schedule.id, day)]
+        return booked / max(1, schedule.max_appointments)
+
+    def place(self, appointment):
+        """Pick a doctor for one appointment, returning (doctor_id, reason)"""
+        candidates = self.candidates(appointment)
+        if not candidates:
+            return None, 'No approved doctor in this department'
+        day = appointment['appointment_date']
+        appointment_time = appointment['appointment_time']
+        exempt = appointment['appointment_type'] in SLOT_EXEMPT_TYPES
+
+        best = None
+        for doctor_id in candidates:
+            if not exempt and not self.availability.is_free(doctor_id, day, appointment_time):
+                continue
+            load = self.load_of(doctor_id, day, appointment_time)
+            if load is None:
+                continue
+            if best is None or (load, doctor_id) < best:
+                best = (load, doctor_id)
+        if best is None:
+            return None, 'No doctor free at the requested time'
+
+        doctor_id = best[1]
+        if not exempt:
+            self.availability.mark_booked(doctor_id, day, appointment_time)
+        return doctor_id, None
+
+    def plan(self):
+        """Return (assignments, unplaced) in the order appointments were considered"""
+        self.load()
+        heap = [
+            (PRIORITY_RANK.get(row['priority'], len(PRIORITY_RANK)), row['appointment_date'],
+             row['appointment_time'], row['created_at'], row['id'], row)
+            for row in self.backlog
+        ]
+        heapq.heapify(heap)
+
+        assignments = []
+        unplaced = []
+        while heap:
+            appointment = heapq.heappop(heap)[-1]
+            doctor_id, reason = self.place(appointment)
+            if doctor_id is None:
+                unplaced.append({'appointment_id': appointment['id'], 'error': reason})
+            else:
+                assignments.append({'appointment_id': appointment['id'], 'doctor_id': doctor_id,
+                                    'status': 'ASSIGNED', 'notes': 'Auto-assigned'})
+        return assignments, unplaced
+
+
+def auto_assign(user, hospital_id, dry_run=False, start_date=None, limit=None, ip_address=None):
+    """
+    Run one auto-assignment pass for a hospital.
+
+    Returns (assignments, unplaced). Unless ``dry_run``, the assignments are
+    applied through ``bulk_assign``; any it rejects (e.g. a slot taken by a
+    concurrent booking) move to ``unplaced``.
+    """
+    assignments, unplaced = AutoAssigner(hospital_id, start_date, limit).plan()
+    if dry_run or not assignments:
+        return assignments, unplaced
+
+    updated, errors = bulk_assign(user, assignments, ip_address=ip_address)
+    updated_ids = {appointment.id for appointment in updated}
+    for error in errors:
+        unplaced.append({'appointment_id': error.get('appointment_id'), 'error': error['error']})
+    return [item for item in assignments if item['appointment_id'] in updated_ids], unplaced
@@ -0,0 +1,240 @@
+"""
+Slot availability engine.
+
+A doctor's active OPDSchedule rows are expanded into fixed-length slots for
+each date in a range. Booked appointments are folded into one integer bitmap
+per (schedule window, date), where bit ``i`` marks slot ``i`` as taken, and a
+window stops offering slots once ``max_appointments`` bookings are reached.
+Slots overlapping a DoctorBlockedTime or one of the doctor's OT bookings are
+set in the same bitmap without counting as bookings. Everything is computed
+from three queries: schedules (with doctors), the booked appointments and
+the blocked time in the range.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.utils import timezone
+from hospitals.models import DoctorBlockedTime, OPDSchedule, OTBooking
+from hospitals.theaters import ACTIVE_BOOKING_STATUSES
+from .models import Appointment
+
+# Appointments in these states no longer hold their slot
+INACTIVE_STATUSES = ['CANCELLED']
+
+WEEKDAYS = ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY']
+
+
+def default_slot_minutes():
+    return getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 15)
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def weekday_name(day):
+    return WEEKDAYS[day.weekday()]
+
+
+def slot_count(schedule, slot_minutes):
+    """Number of whole slots that fit in a schedule window"""
+    return max(0, (to_minutes(schedule.end_time) - to_minutes(schedule.start_time)) // slot_minutes)
+
+
+def slot_index(schedule, appointment_time, slot_minutes):
+    """Index of the slot containing ``appointment_time``, or None when outside the window"""
+    offset = to_minutes(appointment_time) - to_minutes(schedule.start_time)
+    if offset < 0:
+        return None
+    index = offset // slot_minutes
+    return index if index < slot_count(schedule, slot_minutes) else None
+
+
+def local_naive(value):
+    """An aware datetime as a naive local one, comparable with appointment date and time"""
+    return timezone.localtime(value).replace(tzinfo=None)
+
+
+def blocked_intervals(doctor_ids, start_date, end_date):
+    """
+    Blocked time and active OT bookings overlapping the dates, as
+    {doctor_id: [(start, end), ...]} in naive local time
+    """
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    intervals = defaultdict(list)
+    blocked = DoctorBlockedTime.objects.filter(
+        doctor_id__in=doctor_ids, starts_at__lt=end, ends_at__gt=start
+    ).order_by().values_list('doctor_id', 'starts_at', 'ends_at')
+    # Surgeons are also away from OPD while they operate
+    surgeries = OTBooking.objects.filter(
+        surgeon_id__in=doctor_ids, status__in=ACTIVE_BOOKING_STATUSES, starts_at__lt=end, ends_at__gt=start
+    ).order_by().values_list('surgeon_id', 'starts_at', 'ends_at')
+    for doctor_id, starts_at, ends_at in blocked.union(surgeries, all=True):
+        intervals[doctor_id].append((local_naive(starts_at), local_naive(ends_at)))
+    return intervals
+
+
+def is_blocked(intervals, day, slot_time, slot_minutes):
+    """Whether the slot starting at ``slot_time`` overlaps any of ``intervals``"""
+    start = datetime.combine(day, slot_time)
+    end = start + timedelta(minutes=slot_minutes)
+    return any(blocked_start < end and start < blocked_end for blocked_start, blocked_end in intervals)
+
+
+def covering_schedule(schedules, appointment_time, slot_minutes):
+    """First schedule whose slots contain ``appointment_time``"""
+    for schedule in schedules:
+        if slot_index(schedule, appointment_time, slot_minutes) is not None:
+            return schedule
+    return None
+
+
+class Availability:
+    """Booked-slot bitmaps for a set of doctors over a date range"""
+
+    def __init__(self, schedules, start_date, end_date, slot_minutes=None):
+        self.slot_minutes = slot_minutes or default_slot_minutes()
+        self.start_date = start_date
+        self.end_date = end_date
+        self.schedules_by_day = defaultdict(list)
+        for schedule in schedules:
+            self.schedules_by_day[(schedule.doctor_id, schedule.day)].append(schedule)
+        for windows in self.schedules_by_day.values():
+            windows.sort(key=lambda schedule: schedule.start_time)
+        # (schedule_id, date) -> bitmap of booked slots / number of bookings
+        self.booked = defaultdict(int)
+        self.booked_count = defaultdict(int)
+
+    @classmethod
+    def for_doctors(cls, doctors, start_date, end_date, slot_minutes=None, exclude_ids=()):
+        """``exclude_ids`` are appointments about to move, whose slots count as free"""
+        schedules = OPDSchedule.objects.filter(
+            doctor__in=doctors, is_active=True
+        ).select_related('doctor__user')
+        availability = cls(schedules, start_date, end_date, slot_minutes)
+        availability.load_bookings(exclude_ids)
+        availability.load_blocked_times()
+        return availability
+
+    def doctor_ids(self):
+        return {doctor_id for doctor_id, _ in self.schedules_by_day}
+
+    def windows(self, doctor_id, day):
+        return self.schedules_by_day.get((doctor_id, weekday_name(day)), [])
+
+    def load_bookings(self, exclude_ids=()):
+        bookings = Appointment.objects.filter(
+            doctor_id__in=self.doctor_ids(),
+            appointment_date__range=(self.start_date, self.end_date),
+        ).exclude(status__in=INACTIVE_STATUSES)
+        if exclude_ids:
+            bookings = bookings.exclude(id__in=exclude_ids)
+        bookings = bookings.values_list('doctor_id', 'appointment_date', 'appointment_time')
+        for doctor_id, day, appointment_time in bookings:
+            self.mark_booked(doctor_id, day, appointment_time)
+
+    def load_blocked_times(self):
+        intervals = blocked_intervals(self.doctor_ids(), self.start_date, self.end_date)
+        for doctor_id, doctor_intervals in intervals.items():
+            for blocked_start, blocked_end in doctor_intervals:
+                self.block(doctor_id, blocked_start, blocked_end)
+
+    def block(self, doctor_id, blocked_start, blocked_end):
+        """Take every slot overlapping [blocked_start, blocked_end) out of the bitmaps"""
+        day = max(blocked_start.date(), self.start_date)
+        while day <= min(blocked_end.date(), self.end_date):
+            for schedule in self.windows(doctor_id, day):
+                start = to_minutes(schedule.start_time)
+                for index in range(slot_count(schedule, self.slot_minutes)):
+                    slot_time = to_time(start + index * self.slot_minutes)
+                    if is_blocked([(blocked_start, blocked_end)], day, slot_time, self.slot_minutes):
+                        self.booked[(schedule.id, day)] |= 1 << index
+            day += timedelta(days=1)
+
+    def mark_booked(self, doctor_id, day, appointment_time):
+        schedule = covering_schedule(self.windows(doctor_id, day), appointment_time, self.slot_minutes)
+        if schedule is None:
+            return None
+        index = slot_index(schedule, appointment_time, self.slot_minutes)
+        self.booked[(schedule.id, day)] |= 1 << index
+        self.booked_count[(schedule.id, day)] += 1
+        return schedule
+
+    def is_free(self, doctor_id, day, appointment_time):
+        schedule = covering_schedule(self.windows(doctor_id, day), appointment_time, self.slot_minutes)
+        if schedule is None:
+            return False
+        if self.booked_count[(schedule.id, day)] >= schedule.max_appointments:
+            return False
+        index = slot_index(schedule, appointment_time, self.slot_minutes)
+        return not self.booked[(schedule.id, day)] >> index & 1
+
+    def free_slots(self, doctor_id, day, not_before=None):
+        """Yield (schedule, slot_time) for free slots of one doctor on one day"""
+        for schedule in self.windows(doctor_id, day):
+            remaining = schedule.max_appointments - self.booked_count[(schedule.id, day)]
+            bitmap = self.booked[(schedule.id, day)]
+            start = to_minutes(schedule.start_time)
+            for index in range(slot_count(schedule, self.slot_minutes)):
+                if remaining <= 0:
+                    break
+                if bitmap >> index & 1:
+                    continue
+                minutes = start + index * self.slot_minutes
+                if not_before is not None and minutes < not_before:
+                    continue
+                remaining -= 1
+                yield schedule, to_time(minutes)
+
+    def next_free_slot(self, doctor_ids, after):
+        """
+        Earliest free (day, slot_time, doctor_id) at or after the naive local
+        datetime ``after`` among ``doctor_ids``; ties go to the first doctor.
+        """
+        day = max(after.date(), self.start_date)
+        while day <= self.end_date:
+            not_before = to_minutes(after) if day == after.date() else None
+            best = None
+            for rank, doctor_id in enumerate(doctor_ids):
+                # Windows are sorted by start time, so the first free slot is the earliest
+                for _, slot_time in self.free_slots(doctor_id, day, not_before):
+                    if best is None or (slot_time, rank) < best[:2]:
+                        best = (slot_time, rank, doctor_id)
+                    break
+            if best is not None:
+                return day, best[0], best[2]
+            day += timedelta(days=1)
+        return None
+
+    def next_free_slots(self, limit, now=None):
+        """The earliest ``limit`` free slots across all doctors, in chronological order"""
+        now = timezone.localtime(now or timezone.now())
+        results = []
+        day = max(self.start_date, now.date())
+        doctor_ids = sorted(self.doctor_ids())
+        while day <= self.end_date and len(results) < limit:
+            not_before = to_minutes(now) + 1 if day == now.date() else None
+            slots = []
+            for doctor_id in doctor_ids:
+                for schedule, slot_time in self.free_slots(doctor_id, day, not_before):
+                    slots.append((slot_time, doctor_id, schedule))
+            slots.sort(key=lambda slot: (slot[0], slot[1]))
+            for slot_time, doctor_id, schedule in slots[:limit - len(results)]:
+                end = datetime.combine(day, slot_time) + timedelta(minutes=self.slot_minutes)
+                results.append({
+                    'doctor_id': doctor_id,
+                    'doctor_name': schedule.doctor.user.full_name,
+                    'department_id': schedule.doctor.department_id,
+                    'hospital_id': schedule.doctor.hospital_id,
+                    'schedule_id': schedule.id,
+                    'date': day,
+                    'start_time': slot_time,
+                    'end_time': end.time(),
+                })
+            day += timedelta(days=1)
+        return results
@@ -0,0 +1,286 @@
+"""
+Race-free slot booking.
+
+Each (OPD schedule window, date) has a SlotCapacity counter row. Booking a
+doctor's slot locks that single row with ``select_for_update``, checks the
+slot itself is still free, and bumps the counter with a conditional ``F()``
+update, all inside the caller's transaction. Concurrent bookings for the same
+doctor window queue on one row; everything else proceeds in parallel.
+``reserve_slots`` does the same for a whole batch of new bookings with one
+lock query, one taken-slot query and one counter update per window. Slots
+overlapping a doctor's blocked time are never reserved.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from hospitals.models import OPDSchedule
+from .availability import (
+    INACTIVE_STATUSES, blocked_intervals, covering_schedule, default_slot_minutes, is_blocked, slot_index, weekday_name
+)
+from .models import Appointment, SlotCapacity
+
+# Appointment types that do not consume an OPD slot
+SLOT_EXEMPT_TYPES = ['EMERGENCY']
+
+
+class SlotUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The requested slot is not available.'
+    default_code = 'slot_unavailable'
+
+
+def holds_slot(appointment):
+    """Whether an appointment is counted against its doctor's slot capacity"""
+    return bool(
+        appointment.doctor_id
+        and appointment.status not in INACTIVE_STATUSES
+        and appointment.appointment_type not in SLOT_EXEMPT_TYPES
+    )
+
+
+def _schedule_for(doctor_id, appointment_date, appointment_time, slot_minutes):
+    schedules = OPDSchedule.objects.filter(
+        doctor_id=doctor_id, day=weekday_name(appointment_date), is_active=True
+    ).order_by('start_time')
+    return covering_schedule(schedules, appointment_time, slot_minutes)
+
+
+def _slot_bounds(schedule, appointment_date, appointment_time, slot_minutes):
+    index = slot_index(schedule, appointment_time, slot_minutes)
+    start = datetime.combine(appointment_date, schedule.start_time) + timedelta(minutes=index * slot_minutes)
+    return start.time(), (start + timedelta(minutes=slot_minutes)).time()
+
+
+def _active_bookings(schedule, appointment_date, exclude_id=None):
+    bookings = Appointment.objects.filter(
+        doctor_id=schedule.doctor_id,
+        appointment_date=appointment_date,
+        appointment_time__gte=schedule.start_time,
+        appointment_time__lt=schedule.end_time,
+    ).exclude(status__in=INACTIVE_STATUSES).exclude(appointment_type__in=SLOT_EXEMPT_TYPES)
+    if exclude_id:
+        bookings = bookings.exclude(id=exclude_id)
+    return bookings
+
+
+def _locked_counter(schedule, appointment_date, exclude_id=None):
+    """Fetch (creating on first use) and lock the counter row for a window/date"""
+    counter = SlotCapacity.objects.select_for_update().filter(schedule=schedule, slot_date=appointment_date).first()
+    if counter is not None:
+        return counter
+    try:
+        with transaction.atomic():
+            SlotCapacity.objects.create(
+                schedule=schedule,
+                doctor_id=schedule.doctor_id,
+                slot_date=appointment_date,
+                capacity=schedule.max_appointments,
+                booked=_active_bookings(schedule, appointment_date, exclude_id).count(),
+            )
+    except IntegrityError:
+        pass  # Created concurrently; lock the winner's row below
+    return SlotCapacity.objects.select_for_update().get(schedule=schedule, slot_date=appointment_date)
+
+
+def reserve_slot(doctor_id, appointment_date, appointment_time, exclude_id=None, claimed=None):
+    """
+    Reserve the slot containing ``appointment_time`` for a doctor.
+
+    Must run inside ``transaction.atomic``. ``exclude_id`` is the appointment
+    being (re)booked, so its own current booking is not counted against it.
+    ``claimed`` is an optional set of slots reserved earlier in the same batch
+    whose appointments are not saved yet; the new slot is added to it.
+    Raises SlotUnavailable when the time is outside the doctor's OPD schedule,
+    the slot is taken or the window's max_appointments is reached.
+    """
+    slot_minutes = default_slot_minutes()
+    schedule = _schedule_for(doctor_id, appointment_date, appointment_time, slot_minutes)
+    if schedule is None:
+        raise SlotUnavailable('Doctor has no OPD slot at this time.')
+
+    slot_start, slot_end = _slot_bounds(schedule, appointment_date, appointment_time, slot_minutes)
+    blocked = blocked_intervals([doctor_id], appointment_date, appointment_date)[doctor_id]
+    if is_blocked(blocked, appointment_date, slot_start, slot_minutes):
+        raise SlotUnavailable('Doctor is unavailable at this time.')
+
+    counter = _locked_counter(schedule, appointment_date, exclude_id)
+    if counter.capacity != schedule.max_appointments:
+        counter.capacity = schedule.max_appointments
+        counter.save(update_fields=['capacity', 'updated_at'])
+
+    if claimed is not None and (schedule.id, appointment_date, slot_start) in claimed:
+        raise SlotUnavailable('This slot has already been booked.')
+    taken = _active_bookings(schedule, appointment_date, exclude_id).filter(
+        appointment_time__gte=slot_start, appointment_time__lt=slot_end
+    ).exists()
+    if taken:
+        raise SlotUnavailable('This slot has already been booked.')
+
+    updated = SlotCapacity.objects.filter(pk=counter.pk, booked__lt=F('capacity')).update(booked=F('booked') + 1)
+    if not updated:
+        raise SlotUnavailable('No appointments left in this OPD session.')
+    if claimed is not None:
+        claimed.add((schedule.id, appointment_date, slot_start))
+    return counter
+
+
+def reserve_slots(bookings, claimed=None):
+    """
+    Reserve slots for many new bookings at once.
+
+    ``bookings`` is a list of (doctor_id, appointment_date, appointment_time,
+    appointment_id) for appointments that do not hold a slot yet. Must run
+    inside ``transaction.atomic``. Counters are locked in id order so
+    concurrent batches cannot deadlock. Returns a list aligned with
+    ``bookings`` holding None for each reserved slot or the reason it could
+    not be reserved; reserved slots are added to ``claimed`` when given.
+    """
+    slot_minutes = default_slot_minutes()
+    claimed = set() if claimed is None else claimed
+    results = [None] * len(bookings)
+    doctor_ids = {booking[0] for booking in bookings}
+    windows = defaultdict(list)
+    for schedule in OPDSchedule.objects.filter(doctor_id__in=doctor_ids, is_active=True).order_by('start_time'):
+        windows[(schedule.doctor_id, schedule.day)].append(schedule)
+
+    def slot_for(doctor_id, appointment_date, appointment_time):
+        schedule = covering_schedule(windows[(doctor_id, weekday_name(appointment_date))],
+                                     appointment_time, slot_minutes)
+        if schedule is None:
+            return None, None
+        return schedule, _slot_bounds(schedule, appointment_date, appointment_time, slot_minutes)[0]
+
+    dates = [booking[1] for booking in bookings]
+    blocked = blocked_intervals(doctor_ids, min(dates), max(dates)) if bookings else {}
+
+    targets = []
+    for index, (doctor_id, appointment_date, appointment_time, _) in enumerate(bookings):
+        schedule, slot_start = slot_for(doctor_id, appointment_date, appointment_time)
+        if schedule is None:
+            results[index] = 'Doctor has no OPD slot at this time.'
+        elif is_blocked(blocked.get(doctor_id, []), appointment_date, slot_start, slot_minutes):
+            results[index] = 'Doctor is unavailable at this time.'
+        else:
+            targets.append((index, schedule, appointment_date, slot_start))
+    if not targets:
+        return results
+
+    schedules = {schedule.id: schedule for _, schedule, _, _ in targets}
+    keys = {(schedule.id, appointment_date) for _, schedule, appointment_date, _ in targets}
+    counters = {
+        (counter.schedule_id, counter.slot_date): counter
+        for counter in SlotCapacity.objects.select_for_update().filter(
+            schedule_id__in=schedules, slot_date__in={key[1] for key in keys}
+        ).order_by('id')
+    }
+    for schedule_id, slot_date in sorted(keys - counters.keys()):
+        counters[(schedule_id, slot_date)] = _locked_counter(schedules[schedule_id], slot_date)
+
+    taken = set()
+    booked = Appointment.objects.filter(
+        doctor_id__in=doctor_ids, appointment_date__in={key[1] for key in keys}
+    ).exclude(status__in=INACTIVE_STATUSES).exclude(appointment_type__in=SLOT_EXEMPT_TYPES).exclude(
+        id__in=[booking[3] for booking in bookings if booking[3]]
+    ).values_list('doctor_id', 'appointment_date', 'appointment_time')
+    for doctor_id, appointment_date, appointment_time in booked:
+        schedule, slot_start = slot_for(doctor_id, appointment_date, appointment_time)
+        if schedule is not None:
+            taken.add((schedule.id, appointment_date, slot_start))
+
+    added = defaultdict(int)
+    for index, schedule, appointment_date, slot_start in targets:
+        key = (schedule.id, appointment_date)
+        slot = (schedule.id, appointment_date, slot_start)
+        if slot in taken or slot in claimed:
+            results[index] = 'This slot has already been booked.'
+        elif counters[key].booked + added[key] >= schedule.max_appointments:
+            results[index] = 'No appointments left in this OPD session.'
+        else:
+            added[key] += 1
+            claimed.add(slot)
+
+    for key, count in added.items():
+        SlotCapacity.objects.filter(pk=counters[key].pk).update(
+            booked=F('booked') + count, capacity=schedules[key[0]].max_appointments
+        )
+    return results
+
+
+def release_slot(appointment):
+    """Give back the slot held by an appointment (e.g. before cancelling or moving it)"""
+    if not holds_slot(appointment):
+        return
+    slot_minutes = default_slot_minutes()
+    schedule = _schedule_for(appointment.doctor_id, appointment.appointment_date,
+                             appointment.appointment_time, slot_minutes)
+    if schedule is None:
+        return
+    SlotCapacity.objects.filter(
+        schedule=schedule, slot_date=appointment.appointment_date, booked__gt=0
+    ).update(booked=F('booked') - 1)
+
+
+def release_slots(appointments):
+    """Give back the slots held by many appointments with one counter update per window"""
+    held = [appointment for appointment in appointments if holds_slot(appointment)]
+    if not held:
+        return
+    slot_minutes = default_slot_minutes()
+    windows = defaultdict(list)
+    schedules = OPDSchedule.objects.filter(
+        doctor_id__in={appointment.doctor_id for appointment in held}, is_active=True
+    ).order_by('start_time')
+    for schedule in schedules:
+        windows[(schedule.doctor_id, schedule.day)].append(schedule)
+
+    released = defaultdict(int)
+    for appointment in held:
+        schedule = covering_schedule(windows[(appointment.doctor_id, weekday_name(appointment.appointment_date))],
+                                     appointment.appointment_time, slot_minutes)
+        if schedule is not None:
+            released[(schedule.id, appointment.appointment_date)] += 1
+    for (schedule_id, slot_date), count in released.items():
+        SlotCapacity.objects.filter(schedule_id=schedule_id, slot_date=slot_date).update(
+            booked=Greatest(F('booked') - count, 0)
+        )
+
+
+def book_appointment_slot(appointment_type, doctor_id, appointment_date, appointment_time):
+    """Reserve a slot for a new appointment when its type consumes one"""
+    if doctor_id and appointment_type not in SLOT_EXEMPT_TYPES:
+        reserve_slot(doctor_id, appointment_date, appointment_time)
+
+
+def update_appointment_slot(appointment, claimed=None, **changes):
+    """
+    Keep slot counters in step with an appointment update.
+
+    ``changes`` holds the new doctor_id, appointment_date, appointment_time,
+    status and/or appointment_type. The old slot is released before the new
+    one is reserved; must run inside ``transaction.atomic`` so a failed
+    reservation also rolls the release back. ``claimed`` is passed on to
+    ``reserve_slot`` for batch updates.
+    """
+    fields = ['doctor_id', 'appointment_date', 'appointment_time', 'status', 'appointment_type']
+    current = {field: getattr(appointment, field) for field in fields}
+    target = {field: changes.get(field, current[field]) for field in fields}
+    holds_now = holds_slot(appointment)
+    holds_after = bool(
+        target['doctor_id']
+        and target['status'] not in INACTIVE_STATUSES
+        and target['appointment_type'] not in SLOT_EXEMPT_TYPES
+    )
+    same_slot = all(current[field] == target[field]
+                    for field in ['doctor_id', 'appointment_date', 'appointment_time'])
+    if holds_now and holds_after and same_slot:
+        return
+
+    if holds_now:
+        release_slot(appointment)
+    if holds_after:
+        reserve_slot(target['doctor_id'], target['appointment_date'], target['appointment_time'],
+                     exclude_id=appointment.id, claimed=claimed)
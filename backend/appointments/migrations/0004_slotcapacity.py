@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0005_hospitalstats'),
+        ('appointments', '0003_appointmentqueue_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot_date', models.DateField()),
+                ('capacity', models.IntegerField()),
+                ('booked', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_capacities', to='hospitals.doctor')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_capacities', to='hospitals.opdschedule')),
+            ],
+            options={
+                'db_table': 'slot_capacities',
+                'indexes': [models.Index(fields=['doctor', 'slot_date'], name='slot_capaci_doctor__3f8297_idx')],
+                'unique_together': {('schedule', 'slot_date')},
+            },
+        ),
+    ]
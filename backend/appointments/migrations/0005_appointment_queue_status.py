@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_queue_entries(apps, schema_editor):
+    AppointmentQueue = apps.get_model('appointments', 'AppointmentQueue')
+    for entry in AppointmentQueue.objects.iterator():
+        entry.queue_date = django.utils.timezone.localdate(entry.created_at)
+        entry.status = 'CALLED' if entry.called_at else 'WAITING'
+        entry.save(update_fields=['queue_date', 'status'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0005_hospitalstats'),
+        ('appointments', '0004_slotcapacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueueCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queue_type', models.CharField(choices=[('OPD', 'OPD'), ('EMERGENCY', 'Emergency')], max_length=20)),
+                ('queue_date', models.DateField()),
+                ('last_number', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'queue_counters',
+            },
+        ),
+        migrations.AddField(
+            model_name='appointmentqueue',
+            name='queue_date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AddField(
+            model_name='appointmentqueue',
+            name='status',
+            field=models.CharField(choices=[('WAITING', 'Waiting'), ('CALLED', 'Called'), ('SKIPPED', 'Skipped'), ('SERVED', 'Served')], default='WAITING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentqueue',
+            index=models.Index(fields=['hospital', 'queue_type', 'queue_date', 'status'], name='appointment_hospita_06b5a2_idx'),
+        ),
+        migrations.AddField(
+            model_name='queuecounter',
+            name='hospital',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='queue_counters', to='hospitals.hospital'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='queuecounter',
+            unique_together={('hospital', 'queue_type', 'queue_date')},
+        ),
+        migrations.RunPython(backfill_queue_entries, migrations.RunPython.noop),
+    ]
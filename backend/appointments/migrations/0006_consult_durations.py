@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0005_hospitalstats'),
+        ('appointments', '0005_appointment_queue_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ConsultDuration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('average_minutes', models.FloatField()),
+                ('samples', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='consult_duration', to='hospitals.department')),
+                ('doctor', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='consult_duration', to='hospitals.doctor')),
+            ],
+            options={
+                'db_table': 'consult_durations',
+            },
+        ),
+    ]
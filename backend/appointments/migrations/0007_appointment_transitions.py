@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('appointments', '0006_consult_durations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='appointments.appointment')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointment_transitions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'appointment_transitions',
+                'indexes': [models.Index(fields=['appointment', 'created_at'], name='appointment_appoint_c4153f_idx'), models.Index(fields=['to_status', 'created_at'], name='appointment_to_stat_f919de_idx')],
+            },
+        ),
+    ]
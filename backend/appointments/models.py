@@ -1,8 +1,9 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from datetime import date, time
 from users.models import User
-from hospitals.models import Doctor, Hospital, Department
+from hospitals.models import Doctor, Hospital, Department, OPDSchedule
 
 
 class Patient(models.Model):
@@ -90,6 +91,10 @@ class Appointment(models.Model):
     # Walk-in support
     is_walk_in = models.BooleanField(default=False)
     
+    # Consultation timing, stamped on IN_PROGRESS and COMPLETED
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -108,13 +113,49 @@ class Appointment(models.Model):
     def __str__(self):
         return f"{self.patient.user.full_name} - {self.hospital.name} - {self.appointment_date}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def save(self, *args, **kwargs):
+        previous_status = getattr(self, '_loaded_status', None)
+        if self.status != previous_status:
+            if self.status == 'IN_PROGRESS' and not self.started_at:
+                self.started_at = timezone.now()
+            elif self.status == 'COMPLETED' and not self.completed_at:
+                self.completed_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'status' in update_fields:
+                kwargs['update_fields'] = set(update_fields) | {'started_at', 'completed_at'}
         if not self.consultation_fee and self.doctor:
             self.consultation_fee = self.doctor.consultation_fee
         if self.consultation_fee and self.hospital:
             # Calculate platform commission
             self.platform_commission = (self.consultation_fee * self.hospital.commission_rate) / 100
         super().save(*args, **kwargs)
+        self._loaded_status = self.status
+
+
+class AppointmentTransition(models.Model):
+    """Append-only log of appointment status changes"""
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='transitions')
+    from_status = models.CharField(max_length=20, blank=True)  # Blank when the appointment was created
+    to_status = models.CharField(max_length=20)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='appointment_transitions')
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'appointment_transitions'
+        indexes = [
+            models.Index(fields=['appointment', 'created_at']),
+            models.Index(fields=['to_status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Appointment {self.appointment_id}: {self.from_status or '-'} -> {self.to_status}"
 
 
 class AppointmentQueue(models.Model):
@@ -124,10 +165,19 @@ class AppointmentQueue(models.Model):
         ('EMERGENCY', 'Emergency'),
     ]
     
+    STATUS_CHOICES = [
+        ('WAITING', 'Waiting'),
+        ('CALLED', 'Called'),
+        ('SKIPPED', 'Skipped'),
+        ('SERVED', 'Served'),
+    ]
+    
     hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='queues')
     queue_type = models.CharField(max_length=20, choices=QUEUE_TYPE_CHOICES)
+    queue_date = models.DateField(default=timezone.localdate)
     appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='queue_entries')
     queue_number = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='WAITING')
     estimated_wait_time = models.IntegerField(default=0)  # in minutes
     called_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -136,7 +186,60 @@ class AppointmentQueue(models.Model):
         db_table = 'appointment_queues'
         indexes = [
             models.Index(fields=['hospital', 'queue_type', 'queue_number']),
+            models.Index(fields=['hospital', 'queue_type', 'queue_date', 'status']),
         ]
     
     def __str__(self):
         return f"{self.hospital.name} - {self.queue_type} - #{self.queue_number}"
+
+
+class QueueCounter(models.Model):
+    """Per-hospital, per-queue, per-day token sequence"""
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='queue_counters')
+    queue_type = models.CharField(max_length=20, choices=AppointmentQueue.QUEUE_TYPE_CHOICES)
+    queue_date = models.DateField()
+    last_number = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'queue_counters'
+        unique_together = ['hospital', 'queue_type', 'queue_date']
+    
+    def __str__(self):
+        return f"{self.hospital.name} - {self.queue_type} - {self.queue_date} (#{self.last_number})"
+
+
+class SlotCapacity(models.Model):
+    """Booking counter for one OPD schedule window on one date"""
+    schedule = models.ForeignKey(OPDSchedule, on_delete=models.CASCADE, related_name='slot_capacities')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='slot_capacities')
+    slot_date = models.DateField()
+    capacity = models.IntegerField()
+    booked = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'slot_capacities'
+        unique_together = ['schedule', 'slot_date']
+        indexes = [
+            models.Index(fields=['doctor', 'slot_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.doctor} - {self.slot_date} ({self.booked}/{self.capacity})"
+
+
+class ConsultDuration(models.Model):
+    """Exponentially weighted average consultation length for a doctor or a department"""
+    doctor = models.OneToOneField(Doctor, on_delete=models.CASCADE, null=True, blank=True,
+                                  related_name='consult_duration')
+    department = models.OneToOneField(Department, on_delete=models.CASCADE, null=True, blank=True,
+                                      related_name='consult_duration')
+    average_minutes = models.FloatField()
+    samples = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'consult_durations'
+    
+    def __str__(self):
+        return f"{self.doctor or self.department} - {self.average_minutes:.1f} min"
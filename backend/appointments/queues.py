@@ -0,0 +1,247 @@
+"""
+Live OPD / emergency queue service.
+
+Token numbers come from a QueueCounter row per (hospital, queue type, day),
+incremented under a row lock so two check-ins can never share a number.
+Call-next, skip, recall and complete update AppointmentQueue rows and then
+the in-memory QueueBoard for that queue, so token displays and nurses'
+consoles read the board instead of the table. Check-ins and call-next also
+re-estimate everyone's wait (see ``appointments.waittimes``), and every
+change is pushed to the hospital's live event feed (``hospitals.events``).
+
+Each board carries a version number kept in the shared cache. A process
+rebuilds its board from the table the first time it is read and whenever
+another process has changed the queue since.
+"""
+import threading
+from bisect import insort
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from hospitals import events
+from hospitals.cache import bump_version, get_version
+from .models import AppointmentQueue, QueueCounter
+from .waittimes import refresh_queue_wait_times
+
+# Entries that still belong on a board
+OPEN_STATUSES = ['WAITING', 'CALLED', 'SKIPPED']
+
+
+def queue_scope(hospital_id, queue_type, queue_date):
+    return f'queue:{hospital_id}:{queue_type}:{queue_date.isoformat()}'
+
+
+class QueueBoard:
+    """In-memory view of one queue: tokens being served, waiting and skipped"""
+
+    def __init__(self, hospital_id, queue_type, queue_date):
+        self.hospital_id = hospital_id
+        self.queue_type = queue_type
+        self.queue_date = queue_date
+        self.version = None
+        self.entries = {}
+        self.waiting = []
+
+    def load(self, version):
+        """Rebuild from the table"""
+        self.entries = {}
+        self.waiting = []
+        rows = AppointmentQueue.objects.filter(
+            hospital_id=self.hospital_id, queue_type=self.queue_type,
+            queue_date=self.queue_date, status__in=OPEN_STATUSES,
+        ).values('id', 'queue_number', 'status', 'called_at', 'estimated_wait_time',
+                 'appointment_id', 'appointment__doctor_id')
+        for row in rows:
+            self.apply(row)
+        self.version = version
+
+    def apply(self, row):
+        """Insert or update one entry (a dict shaped like the rows in ``load``)"""
+        self.discard(row['id'])
+        if row['status'] not in OPEN_STATUSES:
+            return
+        self.entries[row['id']] = row
+        if row['status'] == 'WAITING':
+            insort(self.waiting, (row['queue_number'], row['id']))
+
+    def discard(self, entry_id):
+        previous = self.entries.pop(entry_id, None)
+        if previous is not None and previous['status'] == 'WAITING':
+            self.waiting.remove((previous['queue_number'], entry_id))
+
+    def waiting_entries(self):
+        return [self.entries[entry_id] for _, entry_id in self.waiting]
+
+    def snapshot(self):
+        called = sorted(
+            (entry for entry in self.entries.values() if entry['status'] == 'CALLED'),
+            key=lambda entry: entry['called_at'], reverse=True,
+        )
+        skipped = sorted(entry['queue_number'] for entry in self.entries.values() if entry['status'] == 'SKIPPED')
+        return {
+            'hospital_id': self.hospital_id,
+            'queue_type': self.queue_type,
+            'queue_date': self.queue_date,
+            'now_serving': [entry['queue_number'] for entry in called],
+            'waiting': [
+                {'queue_number': entry['queue_number'], 'estimated_wait_time': entry['estimated_wait_time']}
+                for entry in self.waiting_entries()
+            ],
+            'waiting_count': len(self.waiting),
+            'skipped': skipped,
+        }
+
+
+_boards = {}
+_boards_lock = threading.Lock()
+
+
+def get_board(hospital_id, queue_type, queue_date=None):
+    """Return the up-to-date board for a queue, rebuilding it only when stale"""
+    queue_date = queue_date or timezone.localdate()
+    key = (hospital_id, queue_type, queue_date)
+    version = get_version(queue_scope(*key))
+    with _boards_lock:
+        board = _boards.get(key)
+        if board is None:
+            board = _boards[key] = QueueBoard(*key)
+            # Forget boards of previous days
+            for stale in [k for k in _boards if k[2] < timezone.localdate()]:
+                del _boards[stale]
+        if board.version != version:
+            board.load(version)
+        return board
+
+
+def _entry_row(entry):
+    return {
+        'id': entry.id,
+        'queue_number': entry.queue_number,
+        'status': entry.status,
+        'called_at': entry.called_at,
+        'estimated_wait_time': entry.estimated_wait_time,
+        'appointment_id': entry.appointment_id,
+        'appointment__doctor_id': entry.appointment.doctor_id,
+    }
+
+
+def _publish(entries, hospital_id, queue_type, queue_date):
+    """Bump the queue version after commit and patch this process's board in place"""
+    key = (hospital_id, queue_type, queue_date)
+    rows = [_entry_row(entry) for entry in entries]
+
+    def update_board():
+        version = bump_version(queue_scope(*key))
+        with _boards_lock:
+            board = _boards.get(key)
+            if board is None:
+                return
+            if board.version == version - 1:
+                for row in rows:
+                    board.apply(row)
+                board.version = version
+            else:
+                board.version = None  # Missed another process's change; rebuild on next read
+    transaction.on_commit(update_board)
+    events.publish(hospital_id, 'queue', {
+        'queue_type': queue_type,
+        'queue_date': queue_date,
+        'entries': [
+            {field: row[field] for field in ['id', 'queue_number', 'status', 'estimated_wait_time', 'called_at']}
+            for row in rows
+        ],
+    })
+
+
+def allocate_queue_number(hospital_id, queue_type, queue_date):
+    """Next token number for a queue; must run inside ``transaction.atomic``"""
+    counter = QueueCounter.objects.select_for_update().filter(
+        hospital_id=hospital_id, queue_type=queue_type, queue_date=queue_date
+    ).first()
+    if counter is None:
+        # Continue after any tokens issued before the counter existed
+        issued = AppointmentQueue.objects.filter(
+            hospital_id=hospital_id, queue_type=queue_type, queue_date=queue_date
+        ).aggregate(last=Max('queue_number'))['last'] or 0
+        counter, _ = QueueCounter.objects.get_or_create(
+            hospital_id=hospital_id, queue_type=queue_type, queue_date=queue_date,
+            defaults={'last_number': issued},
+        )
+        counter = QueueCounter.objects.select_for_update().get(pk=counter.pk)
+    QueueCounter.objects.filter(pk=counter.pk).update(last_number=F('last_number') + 1)
+    return counter.last_number + 1
+
+
+def enqueue(appointment, queue_type):
+    """Check an appointment into today's queue, returning its entry"""
+    queue_date = timezone.localdate()
+    with transaction.atomic():
+        existing = AppointmentQueue.objects.filter(
+            appointment=appointment, queue_type=queue_type, queue_date=queue_date, status__in=OPEN_STATUSES
+        ).first()
+        if existing is not None:
+            return existing
+        entry = AppointmentQueue.objects.create(
+            hospital_id=appointment.hospital_id,
+            queue_type=queue_type,
+            queue_date=queue_date,
+            appointment=appointment,
+            queue_number=allocate_queue_number(appointment.hospital_id, queue_type, queue_date),
+        )
+        changed = refresh_queue_wait_times(appointment.hospital_id, queue_type, queue_date)
+        for other in changed:
+            if other.id == entry.id:
+                entry.estimated_wait_time = other.estimated_wait_time
+        _publish([entry] + changed, appointment.hospital_id, queue_type, queue_date)
+    return entry
+
+
+def call_next(hospital_id, queue_type, doctor_id=None, queue_date=None):
+    """Call the lowest waiting token (optionally for one doctor); None when nobody is waiting"""
+    queue_date = queue_date or timezone.localdate()
+    with transaction.atomic():
+        waiting = AppointmentQueue.objects.select_for_update().select_related('appointment').filter(
+            hospital_id=hospital_id, queue_type=queue_type, queue_date=queue_date, status='WAITING'
+        )
+        if doctor_id:
+            waiting = waiting.filter(appointment__doctor_id=doctor_id)
+        entry = waiting.order_by('queue_number').first()
+        if entry is None:
+            return None
+        entry.status = 'CALLED'
+        entry.called_at = timezone.now()
+        entry.save(update_fields=['status', 'called_at'])
+        changed = refresh_queue_wait_times(hospital_id, queue_type, queue_date)
+        _publish(changed + [entry], hospital_id, queue_type, queue_date)
+    return entry
+
+
+def _set_status(entry_id, allowed, new_status, hospital_ids=None):
+    with transaction.atomic():
+        entries = AppointmentQueue.objects.select_for_update().select_related('appointment')
+        if hospital_ids is not None:
+            entries = entries.filter(hospital_id__in=hospital_ids)
+        entry = entries.get(id=entry_id)
+        if entry.status not in allowed:
+            raise ValueError(f'Cannot mark a {entry.status.lower()} token as {new_status.lower()}')
+        entry.status = new_status
+        update_fields = ['status']
+        if new_status == 'CALLED':
+            entry.called_at = timezone.now()
+            update_fields.append('called_at')
+        entry.save(update_fields=update_fields)
+        _publish([entry], entry.hospital_id, entry.queue_type, entry.queue_date)
+    return entry
+
+
+def skip(entry_id, hospital_ids=None):
+    return _set_status(entry_id, ['WAITING', 'CALLED'], 'SKIPPED', hospital_ids)
+
+
+def recall(entry_id, hospital_ids=None):
+    """Call a skipped token again, or re-announce a called one"""
+    return _set_status(entry_id, ['SKIPPED', 'CALLED'], 'CALLED', hospital_ids)
+
+
+def complete(entry_id, hospital_ids=None):
+    return _set_status(entry_id, ['CALLED'], 'SERVED', hospital_ids)
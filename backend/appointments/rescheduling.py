@@ -0,0 +1,200 @@
+"""
+Bulk rescheduling of appointments displaced by a doctor's blocked time.
+
+One pass loads the appointments overlapping the DoctorBlockedTime, the
+doctor's active peers in the same department and everyone's availability
+(see ``appointments.availability``, which already treats blocked time as
+taken) for a search horizon. Appointments are placed in their original
+order on the earliest free slot from their original time onwards, across
+their own doctor and the peers, with ties going to their own doctor; the
+in-memory bitmaps are updated as slots are taken, so the plan never
+double-books.
+
+The plan is written in one transaction: new slots are reserved with
+``reserve_slots``, the old ones released with ``release_slots``, the rows
+saved with ``bulk_update``, and transitions, audit rows and patient
+notifications created with one ``bulk_create`` each.
+"""
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.utils import timezone
+from hospitals.models import Doctor
+from notifications.models import Notification
+from users.models import AuditLog
+from .availability import Availability, default_slot_minutes, is_blocked, local_naive
+from .booking import SLOT_EXEMPT_TYPES, release_slots, reserve_slots
+from .models import Appointment
+from .transitions import record_transitions, sources_for
+
+RESCHEDULABLE_STATUSES = sources_for('RESCHEDULED') + ['RESCHEDULED']
+DEFAULT_HORIZON_DAYS = 14
+
+
+class BlockRescheduler:
+    """Plans new slots for the appointments that fall in one doctor's blocked time"""
+
+    def __init__(self, blocked_time, horizon_days=DEFAULT_HORIZON_DAYS, now=None):
+        self.blocked_time = blocked_time
+        self.horizon_days = horizon_days
+        self.now = local_naive(now or timezone.now())
+
+    def affected_queryset(self):
+        starts = local_naive(self.blocked_time.starts_at)
+        ends = local_naive(self.blocked_time.ends_at)
+        return Appointment.objects.filter(
+            doctor_id=self.blocked_time.doctor_id,
+            appointment_date__range=(starts.date(), ends.date()),
+            status__in=RESCHEDULABLE_STATUSES,
+        ).exclude(appointment_type__in=SLOT_EXEMPT_TYPES)
+
+    def load(self):
+        starts = local_naive(self.blocked_time.starts_at)
+        ends = local_naive(self.blocked_time.ends_at)
+        slot_minutes = default_slot_minutes()
+        self.affected = [
+            appointment
+            for appointment in self.affected_queryset().select_related('patient').order_by(
+                'appointment_date', 'appointment_time', 'id'
+            )
+            if is_blocked([(starts, ends)], appointment.appointment_date, appointment.appointment_time, slot_minutes)
+        ]
+
+        doctor = Doctor.objects.select_related('user').get(id=self.blocked_time.doctor_id)
+        peers = []
+        if doctor.department_id:
+            peers = list(Doctor.objects.select_related('user').filter(
+                hospital_id=doctor.hospital_id, department_id=doctor.department_id, is_active=True, is_approved=True
+            ).exclude(id=doctor.id).order_by('id'))
+        self.doctors = {candidate.id: candidate for candidate in [doctor] + peers}
+        self.doctor_ids = [doctor.id] + [peer.id for peer in peers]
+
+        start_date = max(starts.date(), self.now.date())
+        end_date = max(ends.date(), start_date) + timedelta(days=self.horizon_days)
+        self.availability = Availability.for_doctors(
+            self.doctor_ids, start_date, end_date, exclude_ids=[appointment.id for appointment in self.affected]
+        )
+
+    def place(self, appointment):
+        """Pick (date, time, doctor_id) for one appointment, or None when nothing is free"""
+        after = max(datetime.combine(appointment.appointment_date, appointment.appointment_time), self.now)
+        slot = self.availability.next_free_slot(self.doctor_ids, after)
+        if slot is not None:
+            day, slot_time, doctor_id = slot
+            self.availability.mark_booked(doctor_id, day, slot_time)
+        return slot
+
+    def plan(self):
+        """Return (moves, unplaced); moves are (appointment, date, time, doctor_id)"""
+        self.load()
+        moves = []
+        unplaced = []
+        for appointment in self.affected:
+            slot = self.place(appointment)
+            if slot is None:
+                unplaced.append({'appointment_id': appointment.id,
+                                 'error': f'No free slot in the next {self.horizon_days} days'})
+            else:
+                moves.append((appointment, *slot))
+        return moves, unplaced
+
+
+def describe_move(appointment, day, slot_time, doctor):
+    return {
+        'appointment_id': appointment.id,
+        'from_date': appointment.appointment_date,
+        'from_time': appointment.appointment_time,
+        'from_doctor_id': appointment.doctor_id,
+        'appointment_date': day,
+        'appointment_time': slot_time,
+        'doctor_id': doctor.id,
+        'doctor_name': doctor.user.full_name,
+    }
+
+
+def _notification(appointment, day, slot_time, doctor):
+    return Notification(
+        user_id=appointment.patient.user_id,
+        notification_type='PUSH',
+        category='APPOINTMENT_RESCHEDULED',
+        title='Appointment Rescheduled',
+        message=(f"Your appointment on {appointment.appointment_date:%d %b %Y} at "
+                 f"{appointment.appointment_time:%H:%M} has been moved to {day:%d %b %Y} at {slot_time:%H:%M} "
+                 f"with Dr. {doctor.user.full_name} because your doctor is unavailable."),
+        appointment_id=appointment.id,
+        metadata={'appointment_date': day.isoformat(), 'appointment_time': slot_time.isoformat(),
+                  'doctor_id': doctor.id},
+    )
+
+
+def reschedule_blocked(user, blocked_time, horizon_days=DEFAULT_HORIZON_DAYS, dry_run=False, ip_address=None):
+    """
+    Move every appointment displaced by ``blocked_time`` to a new slot.
+
+    Returns (rescheduled, unplaced) as lists of dicts. Unplaced appointments
+    (nothing free within the horizon, or a slot taken concurrently) are left
+    untouched for operations to handle.
+    """
+    rescheduler = BlockRescheduler(blocked_time, horizon_days)
+    moves, unplaced = rescheduler.plan()
+    if dry_run or not moves:
+        return [describe_move(move[0], *move[1:3], rescheduler.doctors[move[3]]) for move in moves], unplaced
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Re-read under lock; anything that changed since planning is skipped
+        locked = rescheduler.affected_queryset().select_for_update().in_bulk(
+            [appointment.id for appointment, *_ in moves]
+        )
+        current = []
+        for move in moves:
+            if move[0].id in locked:
+                current.append(move)
+            else:
+                unplaced.append({'appointment_id': move[0].id, 'error': 'Appointment changed during rescheduling'})
+
+        failures = reserve_slots([
+            (doctor_id, day, slot_time, appointment.id) for appointment, day, slot_time, doctor_id in current
+        ]) if current else []
+        placed = []
+        for move, error in zip(current, failures):
+            if error is None:
+                placed.append(move)
+            else:
+                unplaced.append({'appointment_id': move[0].id, 'error': error})
+
+        release_slots([appointment for appointment, *_ in placed])
+        rescheduled = []
+        changes = []
+        notifications = []
+        for appointment, day, slot_time, doctor_id in placed:
+            doctor = rescheduler.doctors[doctor_id]
+            rescheduled.append(describe_move(appointment, day, slot_time, doctor))
+            changes.append((appointment.id, appointment.status, 'RESCHEDULED'))
+            notifications.append(_notification(appointment, day, slot_time, doctor))
+            appointment.doctor_id = doctor_id
+            appointment.appointment_date = day
+            appointment.appointment_time = slot_time
+            appointment.status = 'RESCHEDULED'
+            appointment.updated_at = now
+
+        appointments = [appointment for appointment, *_ in placed]
+        Appointment.objects.bulk_update(
+            appointments, ['doctor', 'appointment_date', 'appointment_time', 'status', 'updated_at']
+        )
+        record_transitions(changes, user=user, at=now)
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user=user,
+                action='APPOINTMENT_RESCHEDULED',
+                resource_type='Appointment',
+                resource_id=move['appointment_id'],
+                ip_address=ip_address,
+                details={'blocked_time_id': blocked_time.id, 'from_date': str(move['from_date']),
+                         'from_time': str(move['from_time']), 'from_doctor_id': move['from_doctor_id'],
+                         'doctor_id': move['doctor_id']},
+            )
+            for move in rescheduled
+        ])
+        Notification.objects.bulk_create(notifications)
+    unplaced.sort(key=lambda item: item['appointment_id'])
+    return rescheduled, unplaced
@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from datetime import date
+from django.db.models import Prefetch
 from users.serializers import UserSerializer
+from hospitals.models import Department
 from hospitals.serializers import DoctorSerializer, HospitalSerializer, DepartmentSerializer
-from .models import Patient, Appointment
+from .models import Patient, Appointment, AppointmentQueue
 
 
 class PatientSerializer(serializers.ModelSerializer):
@@ -42,10 +44,48 @@ class AppointmentSerializer(serializers.ModelSerializer):
                   'department', 'department_id', 'appointment_type', 'appointment_date', 
                   'appointment_time', 'status', 'reason', 'priority', 'reviewed_by', 
                   'reviewed_by_name', 'reviewed_at', 'operations_notes', 'consultation_fee',
-                  'platform_commission', 'is_walk_in', 'notes', 'patient_name', 'doctor_name',
-                  'hospital_name', 'department_name', 'created_at', 'updated_at']
+                  'platform_commission', 'is_walk_in', 'started_at', 'completed_at', 'notes',
+                  'patient_name', 'doctor_name', 'hospital_name', 'department_name',
+                  'created_at', 'updated_at']
         read_only_fields = ['id', 'consultation_fee', 'platform_commission', 'reviewed_by',
-                           'reviewed_at', 'created_at', 'updated_at']
+                           'reviewed_at', 'started_at', 'completed_at', 'created_at', 'updated_at']
+    
+    COMPACT_FIELDS = ['id', 'appointment_type', 'appointment_date', 'appointment_time', 'status',
+                      'priority', 'is_walk_in', 'patient_id', 'doctor_id', 'hospital_id', 'department_id',
+                      'hospital__name', 'department__name']
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load every nested object the serializer reads, in a constant number of queries"""
+        queryset = queryset.select_related(
+            'patient__user', 'doctor__user', 'doctor__hospital', 'doctor__department', 'reviewed_by',
+        ).prefetch_related(
+            Prefetch('department', queryset=DepartmentSerializer.setup_eager_loading(Department.objects.all())),
+        )
+        return HospitalSerializer.setup_eager_loading(queryset.select_related('hospital'), prefix='hospital__')
+    
+    @classmethod
+    def compact_values(cls, queryset):
+        """Single joined values() query backing ``?view=compact``"""
+        return queryset.values(
+            *cls.COMPACT_FIELDS,
+            'patient__user__first_name', 'patient__user__last_name',
+            'doctor__user__first_name', 'doctor__user__last_name',
+        )
+    
+    @classmethod
+    def compact(cls, rows):
+        """Flatten rows from ``compact_values`` into ids and display names"""
+        results = []
+        for row in rows:
+            item = {field: row[field] for field in cls.COMPACT_FIELDS if '__' not in field}
+            item['patient_name'] = f"{row['patient__user__first_name']} {row['patient__user__last_name']}"
+            item['doctor_name'] = (f"{row['doctor__user__first_name']} {row['doctor__user__last_name']}"
+                                   if row['doctor_id'] else None)
+            item['hospital_name'] = row['hospital__name']
+            item['department_name'] = row['department__name']
+            results.append(item)
+        return results
     
     def validate(self, attrs):
         appointment_date = attrs.get('appointment_date')
@@ -55,3 +95,12 @@ class AppointmentSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Appointment date cannot be in the past")
         
         return attrs
+
+
+class AppointmentQueueSerializer(serializers.ModelSerializer):
+    """Serializer for a queue token"""
+    class Meta:
+        model = AppointmentQueue
+        fields = ['id', 'hospital', 'queue_type', 'queue_date', 'appointment', 'queue_number',
+                  'status', 'estimated_wait_time', 'called_at', 'created_at']
+        read_only_fields = fields
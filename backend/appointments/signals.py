@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Appointment
+from .waittimes import record_consult
+
+
+@receiver(post_save, sender=Appointment)
+def record_consult_duration(sender, instance, **kwargs):
+    """Feed finished consultations into the wait-time averages"""
+    if instance.status == 'COMPLETED' and getattr(instance, '_loaded_status', None) != 'COMPLETED':
+        record_consult(instance)
@@ -0,0 +1,223 @@
+import base64
+import json
+from datetime import date, time, timedelta
+from django.test import TestCase
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.test import APIClient
+from hospitals.models import Doctor, Hospital, OPDSchedule, StaffMembership
+from users.models import User
+from .autoassign import AutoAssigner
+from .models import Appointment, AppointmentQueue, AppointmentTransition, Patient, SlotCapacity
+from .transitions import InvalidTransition, bulk_transition, check_transition
+
+WEEKDAYS = ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY']
+
+
+class AppointmentTestCase(TestCase):
+    """Shared factories for appointment tests"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def create_user(self, email, role):
+        return User.objects.create_user(email=email, password='password', first_name='Test', last_name='User',
+                                        role=role)
+
+    def create_hospital(self, name, **kwargs):
+        return Hospital.objects.create(
+            name=name, address='1 Main Road', city='Pune', state='Maharashtra', pincode='411001',
+            phone='0000000000', email='info@hospital.test', license_number=name, is_approved=True, **kwargs
+        )
+
+    def create_doctor(self, hospital, email):
+        return Doctor.objects.create(
+            user=self.create_user(email, 'DOCTOR'), hospital=hospital, specialization='General Medicine',
+            qualification='MBBS', license_number=email, consultation_fee=500, is_approved=True
+        )
+
+    def create_patient(self, email):
+        return Patient.objects.create(user=self.create_user(email, 'PATIENT'))
+
+
+class QueueHospitalAccessTests(AppointmentTestCase):
+    """Queue actions are limited to staff of the queue's hospital"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.create_user('admin@a.test', 'HOSPITAL_ADMIN')
+        self.hospital = self.create_hospital('Hospital A', admin=self.admin)
+        self.other_hospital = self.create_hospital('Hospital B')
+        patient = self.create_patient('patient@b.test')
+        self.appointment = Appointment.objects.create(
+            patient=patient, hospital=self.other_hospital, appointment_date=date.today(),
+            appointment_time=time(9), status='CONFIRMED'
+        )
+        self.entry = AppointmentQueue.objects.create(
+            appointment=self.appointment, hospital=self.other_hospital, queue_type='OPD',
+            queue_date=date.today(), queue_number=1
+        )
+
+    def assert_queue_actions_forbidden(self, user, entry_status=403):
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/appointments/queues/check-in/', {'appointment_id': self.appointment.id})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(f'/api/appointments/queues/{self.other_hospital.id}/OPD/call-next/')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(f'/api/appointments/queues/entries/{self.entry.id}/skip/')
+        self.assertEqual(response.status_code, entry_status)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, 'WAITING')
+
+    def create_member(self, email, role):
+        user = self.create_user(email, role)
+        StaffMembership.objects.create(user=user, hospital=self.hospital)
+        return user
+
+    # Entries are looked up within the user's own hospitals, so another hospital's is not found
+    def test_nurse_cannot_manage_another_hospitals_queue(self):
+        self.assert_queue_actions_forbidden(self.create_member('nurse@a.test', 'NURSE'), entry_status=404)
+
+    def test_medical_assistant_cannot_manage_another_hospitals_queue(self):
+        self.assert_queue_actions_forbidden(self.create_member('assistant@a.test', 'MEDICAL_ASSISTANT'),
+                                            entry_status=404)
+
+    def test_nurse_without_a_hospital_cannot_manage_queues(self):
+        self.assert_queue_actions_forbidden(self.create_user('nurse@b.test', 'NURSE'), entry_status=404)
+
+    def test_admin_cannot_manage_another_hospitals_queue(self):
+        self.assert_queue_actions_forbidden(self.admin, entry_status=404)
+
+
+class SlotBookingTests(AppointmentTestCase):
+    """Per-window slot counters"""
+
+    def setUp(self):
+        super().setUp()
+        self.operations_manager = self.create_user('ops@a.test', 'OPERATIONS_MANAGER')
+        self.hospital = self.create_hospital('Hospital A', operations_manager=self.operations_manager)
+        self.doctor = self.create_doctor(self.hospital, 'doctor@a.test')
+        self.day = date.today() + timedelta(days=1)
+        # Four 15 minute slots, at most two bookings
+        OPDSchedule.objects.create(doctor=self.doctor, day=WEEKDAYS[self.day.weekday()], start_time=time(9),
+                                   end_time=time(10), max_appointments=2)
+
+    def book(self, patient, appointment_time):
+        self.client.force_authenticate(patient.user)
+        return self.client.post('/api/appointments/', {
+            'hospital_id': self.hospital.id, 'doctor_id': self.doctor.id,
+            'appointment_date': self.day.isoformat(), 'appointment_time': appointment_time,
+        }, format='json')
+
+    def test_taken_slot_returns_conflict(self):
+        self.assertEqual(self.book(self.create_patient('one@a.test'), '09:00').status_code, 201)
+        self.assertEqual(self.book(self.create_patient('two@a.test'), '09:05').status_code, 409)
+
+    def test_full_window_returns_conflict(self):
+        self.assertEqual(self.book(self.create_patient('one@a.test'), '09:00').status_code, 201)
+        self.assertEqual(self.book(self.create_patient('two@a.test'), '09:15').status_code, 201)
+        self.assertEqual(self.book(self.create_patient('three@a.test'), '09:30').status_code, 409)
+        self.assertEqual(SlotCapacity.objects.get().booked, 2)
+
+    def test_time_outside_schedule_returns_conflict(self):
+        self.assertEqual(self.book(self.create_patient('one@a.test'), '11:00').status_code, 409)
+
+    def test_cancelling_releases_the_slot(self):
+        first = self.create_patient('one@a.test')
+        self.assertEqual(self.book(first, '09:00').status_code, 201)
+        self.assertEqual(self.book(self.create_patient('two@a.test'), '09:15').status_code, 201)
+        appointment = Appointment.objects.get(patient=first)
+
+        self.client.force_authenticate(self.operations_manager)
+        response = self.client.patch(f'/api/appointments/{appointment.id}/',
+                                     {'status': 'CANCELLED', 'hospital_id': self.hospital.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SlotCapacity.objects.get().booked, 1)
+        self.assertEqual(self.book(self.create_patient('three@a.test'), '09:00').status_code, 201)
+
+
+class TransitionTests(AppointmentTestCase):
+    """Appointment state machine"""
+
+    def setUp(self):
+        super().setUp()
+        self.hospital = self.create_hospital('Hospital A')
+        self.patient = self.create_patient('patient@a.test')
+        self.super_admin = self.create_user('root@a.test', 'SUPER_ADMIN')
+
+    def create_appointment(self, status):
+        return Appointment.objects.create(patient=self.patient, hospital=self.hospital, appointment_date=date.today(),
+                                          appointment_time=time(9), status=status)
+
+    def test_check_transition(self):
+        check_transition(self.super_admin, 'IN_PROGRESS', 'COMPLETED')
+        with self.assertRaises(InvalidTransition):
+            check_transition(self.super_admin, 'COMPLETED', 'REQUESTED')
+        with self.assertRaises(InvalidTransition):
+            check_transition(self.super_admin, 'CANCELLED', 'CONFIRMED')
+        with self.assertRaises(PermissionDenied):
+            check_transition(self.patient.user, 'IN_PROGRESS', 'COMPLETED')
+
+    def test_bulk_transition_moves_only_allowed_appointments(self):
+        in_progress = self.create_appointment('IN_PROGRESS')
+        requested = self.create_appointment('REQUESTED')
+        moved, skipped = bulk_transition(self.super_admin, [in_progress.id, requested.id], 'COMPLETED')
+        self.assertEqual(moved, [in_progress.id])
+        self.assertEqual(skipped, [requested.id])
+
+        in_progress.refresh_from_db()
+        requested.refresh_from_db()
+        self.assertEqual(in_progress.status, 'COMPLETED')
+        self.assertIsNotNone(in_progress.completed_at)
+        self.assertEqual(requested.status, 'REQUESTED')
+        self.assertEqual(
+            list(AppointmentTransition.objects.values_list('appointment_id', 'from_status', 'to_status')),
+            [(in_progress.id, 'IN_PROGRESS', 'COMPLETED')]
+        )
+
+
+class KeysetPaginationTests(AppointmentTestCase):
+    """Cursor pages of the appointment list"""
+
+    def test_pages_cover_every_appointment_once(self):
+        patient = self.create_patient('patient@a.test')
+        hospital = self.create_hospital('Hospital A')
+        # Equal date and time, so the id tiebreaker decides the order
+        ids = [
+            Appointment.objects.create(patient=patient, hospital=hospital, appointment_date=date.today(),
+                                       appointment_time=time(9)).id
+            for _ in range(5)
+        ]
+        self.client.force_authenticate(patient.user)
+        seen = []
+        url = '/api/appointments/?page_size=2'
+        while url:
+            body = self.client.get(url).json()
+            seen.extend(appointment['id'] for appointment in body['results'])
+            url = body['next']
+        self.assertEqual(seen, sorted(ids))
+
+    def test_tampered_cursor_is_not_found(self):
+        patient = self.create_patient('patient@a.test')
+        self.client.force_authenticate(patient.user)
+        for values in [['notadate', 0, 1], ['2024-01-01', 'notatime', 1], ['2024-01-01', '09:00', 'x']]:
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            with self.subTest(values=values):
+                response = self.client.get(f'/api/appointments/?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+
+
+class AutoAssignBacklogTests(AppointmentTestCase):
+    """Backlog selection for auto-assignment"""
+
+    def test_limit_keeps_the_most_urgent_requests(self):
+        hospital = self.create_hospital('Hospital A')
+        patient = self.create_patient('patient@a.test')
+        day = date.today() + timedelta(days=1)
+        Appointment.objects.create(patient=patient, hospital=hospital, appointment_date=day, appointment_time=time(9),
+                                   priority='LOW')
+        urgent = Appointment.objects.create(patient=patient, hospital=hospital,
+                                            appointment_date=day + timedelta(days=1), appointment_time=time(9),
+                                            priority='URGENT')
+        assigner = AutoAssigner(hospital.id, limit=1)
+        assigner.load()
+        self.assertEqual([row['id'] for row in assigner.backlog], [urgent.id])
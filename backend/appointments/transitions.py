@@ -0,0 +1,181 @@
+"""
+Appointment state machine.
+
+``TRANSITIONS`` is the single source of truth for which status may follow
+which, and ``ROLE_TARGETS`` for which statuses each role may set. Views and
+services check changes with ``check_transition`` and log them with
+``record_transitions``; ``bulk_transition`` moves many appointments with one
+conditional ``UPDATE ... WHERE status IN (...)``.
+
+Every change is appended to AppointmentTransition, so stage durations come
+from that narrow indexed table rather than from AuditLog.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, PermissionDenied
+from .availability import INACTIVE_STATUSES
+from .booking import release_slot
+from .models import Appointment, AppointmentTransition
+from .waittimes import record_consult
+
+TRANSITIONS = {
+    'REQUESTED': {'REVIEWED', 'ASSIGNED', 'RESCHEDULED', 'CANCELLED'},
+    'REVIEWED': {'ASSIGNED', 'RESCHEDULED', 'CANCELLED'},
+    'ASSIGNED': {'CONFIRMED', 'IN_PROGRESS', 'RESCHEDULED', 'CANCELLED'},
+    'CONFIRMED': {'IN_PROGRESS', 'RESCHEDULED', 'CANCELLED'},
+    'RESCHEDULED': {'REVIEWED', 'ASSIGNED', 'CONFIRMED', 'CANCELLED'},
+    'IN_PROGRESS': {'COMPLETED'},
+    'COMPLETED': {'BILLED', 'CLOSED'},
+    'BILLED': {'CLOSED'},
+    'CLOSED': set(),
+    'CANCELLED': set(),
+}
+
+ALL_STATUSES = set(TRANSITIONS)
+
+ROLE_TARGETS = {
+    'SUPER_ADMIN': ALL_STATUSES,
+    'HOSPITAL_DIRECTOR': ALL_STATUSES,
+    'HOSPITAL_ADMIN': ALL_STATUSES,
+    'OPERATIONS_MANAGER': {'REVIEWED', 'ASSIGNED', 'CONFIRMED', 'RESCHEDULED', 'CANCELLED'},
+    'DOCTOR': {'IN_PROGRESS', 'COMPLETED'},
+    'PATIENT': {'CANCELLED'},
+}
+
+
+class InvalidTransition(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This status change is not allowed.'
+    default_code = 'invalid_transition'
+
+
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, set())
+
+
+def sources_for(to_status):
+    """Statuses an appointment may be in to move to ``to_status``"""
+    return [from_status for from_status, targets in TRANSITIONS.items() if to_status in targets]
+
+
+def check_transition(user, from_status, to_status):
+    """Raise unless ``user`` may move an appointment from ``from_status`` to ``to_status``"""
+    if to_status not in ROLE_TARGETS.get(user.role, set()):
+        raise PermissionDenied(f'{user.get_role_display()} cannot set appointments to {to_status}')
+    if not can_transition(from_status, to_status):
+        raise InvalidTransition(f'Cannot change an appointment from {from_status} to {to_status}')
+
+
+def record_transitions(changes, user=None, at=None):
+    """Append (appointment_id, from_status, to_status) changes to the log"""
+    at = at or timezone.now()
+    AppointmentTransition.objects.bulk_create([
+        AppointmentTransition(appointment_id=appointment_id, from_status=from_status or '',
+                              to_status=to_status, changed_by=user, created_at=at)
+        for appointment_id, from_status, to_status in changes
+        if from_status != to_status
+    ])
+
+
+def complete_consultation(appointment, user=None):
+    """
+    Finish a consultation, e.g. once its prescription is written.
+
+    ASSIGNED and CONFIRMED appointments pass through IN_PROGRESS so the log
+    keeps every stage; appointments in other statuses are left alone.
+    """
+    changes = []
+    if appointment.status in ['ASSIGNED', 'CONFIRMED']:
+        changes.append((appointment.id, appointment.status, 'IN_PROGRESS'))
+        appointment.status = 'IN_PROGRESS'
+    if appointment.status == 'IN_PROGRESS':
+        changes.append((appointment.id, 'IN_PROGRESS', 'COMPLETED'))
+        appointment.status = 'COMPLETED'
+    if changes:
+        appointment.save()
+        record_transitions(changes, user=user)
+    return appointment
+
+
+def scope_for(user, queryset):
+    """Appointments ``user`` may change"""
+    if user.role == 'SUPER_ADMIN':
+        return queryset
+    if user.role == 'OPERATIONS_MANAGER':
+        return queryset.filter(hospital__operations_manager=user)
+    if user.role == 'HOSPITAL_ADMIN':
+        return queryset.filter(hospital__admin=user)
+    if user.role == 'HOSPITAL_DIRECTOR':
+        return queryset.filter(hospital__director=user)
+    if user.role == 'DOCTOR':
+        return queryset.filter(doctor__user=user)
+    if user.role == 'PATIENT':
+        return queryset.filter(patient__user=user)
+    return queryset.none()
+
+
+def bulk_transition(user, appointment_ids, to_status):
+    """
+    Move many appointments to ``to_status`` in one conditional UPDATE.
+
+    Only appointments the user may change and whose current status allows
+    the move are updated. Returns (moved_ids, skipped_ids).
+    """
+    if to_status not in ROLE_TARGETS.get(user.role, set()):
+        raise PermissionDenied(f'{user.get_role_display()} cannot set appointments to {to_status}')
+    sources = sources_for(to_status)
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = scope_for(user, Appointment.objects.filter(id__in=appointment_ids, status__in=sources))
+        # of=('self',): scope_for joins Hospital and User, whose rows must not be locked
+        locked = list(candidates.select_for_update(of=('self',)))
+        moved = [appointment.id for appointment in locked]
+
+        changes = {'status': to_status, 'updated_at': now}
+        if to_status == 'IN_PROGRESS':
+            changes['started_at'] = Coalesce(F('started_at'), Value(now))
+        elif to_status == 'COMPLETED':
+            changes['completed_at'] = Coalesce(F('completed_at'), Value(now))
+        Appointment.objects.filter(id__in=moved, status__in=sources).update(**changes)
+
+        if to_status in INACTIVE_STATUSES:
+            for appointment in locked:
+                release_slot(appointment)
+        if to_status == 'COMPLETED':
+            # update() skips Appointment.save and its signal, so feed the wait-time averages here
+            for appointment in locked:
+                appointment.completed_at = appointment.completed_at or now
+                record_consult(appointment)
+        record_transitions([(appointment.id, appointment.status, to_status) for appointment in locked],
+                           user=user, at=now)
+    skipped = sorted(set(appointment_ids) - set(moved))
+    return moved, skipped
+
+
+def stage_durations(transitions):
+    """
+    Average minutes appointments spent in each status.
+
+    ``transitions`` is a queryset of AppointmentTransition rows; they are read
+    once, ordered by appointment and time, and each consecutive pair of rows
+    for an appointment closes one stage.
+    """
+    totals = defaultdict(float)
+    counts = defaultdict(int)
+    previous = None
+    rows = transitions.order_by('appointment_id', 'created_at', 'id').values_list(
+        'appointment_id', 'to_status', 'created_at'
+    )
+    for appointment_id, to_status, created_at in rows.iterator():
+        if previous is not None and previous[0] == appointment_id:
+            totals[previous[1]] += (created_at - previous[2]).total_seconds() / 60
+            counts[previous[1]] += 1
+        previous = (appointment_id, to_status, created_at)
+    return {
+        stage: {'average_minutes': round(totals[stage] / counts[stage], 1), 'count': counts[stage]}
+        for stage in counts
+    }
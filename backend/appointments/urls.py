@@ -2,8 +2,10 @@ from django.urls import path
 from .views import (
     PatientListCreateAPIView, PatientDetailAPIView,
     AppointmentListCreateAPIView, AppointmentDetailAPIView,
-    operations_appointments, assign_appointment,
-    doctor_appointments, patient_appointments
+    operations_appointments, assign_appointment, bulk_assign_appointments, auto_assign_appointments,
+    bulk_transition_appointments, appointment_stage_durations, reschedule_blocked_appointments,
+    doctor_appointments, patient_appointments, doctor_availability,
+    queue_check_in, queue_board, queue_call_next, queue_entry_action
 )
 
 urlpatterns = [
@@ -13,7 +15,17 @@ urlpatterns = [
     path('<int:pk>/', AppointmentDetailAPIView.as_view(), name='appointment_detail'),
     path('operations/', operations_appointments, name='operations_appointments'),
     path('<int:appointment_id>/assign/', assign_appointment, name='assign_appointment'),
+    path('operations/bulk-assign/', bulk_assign_appointments, name='bulk_assign_appointments'),
+    path('operations/auto-assign/', auto_assign_appointments, name='auto_assign_appointments'),
+    path('operations/reschedule-blocked/', reschedule_blocked_appointments, name='reschedule_blocked_appointments'),
+    path('transitions/', bulk_transition_appointments, name='bulk_transition_appointments'),
+    path('stage-durations/', appointment_stage_durations, name='appointment_stage_durations'),
     path('doctor/my-appointments/', doctor_appointments, name='doctor_appointments'),
     path('patient/my-appointments/', patient_appointments, name='patient_appointments'),
+    path('availability/', doctor_availability, name='doctor_availability'),
+    path('queues/check-in/', queue_check_in, name='queue_check_in'),
+    path('queues/<int:hospital_id>/<str:queue_type>/', queue_board, name='queue_board'),
+    path('queues/<int:hospital_id>/<str:queue_type>/call-next/', queue_call_next, name='queue_call_next'),
+    path('queues/entries/<int:entry_id>/<str:action>/', queue_entry_action, name='queue_entry_action'),
 ]
 
@@ -1,14 +1,30 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 from datetime import date, timedelta
-from .models import Patient, Appointment, AppointmentQueue
-from .serializers import PatientSerializer, AppointmentSerializer
+from .models import Patient, Appointment, AppointmentQueue, AppointmentTransition
+from .availability import Availability
+from .booking import book_appointment_slot, update_appointment_slot
+from .assignment import OPERATIONS_STATUSES, MAX_BULK_ASSIGNMENTS, bulk_assign
+from .autoassign import auto_assign
+from .rescheduling import DEFAULT_HORIZON_DAYS, reschedule_blocked
+from .transitions import (
+    TRANSITIONS, bulk_transition, check_transition, record_transitions, scope_for, stage_durations
+)
+from .serializers import PatientSerializer, AppointmentSerializer, AppointmentQueueSerializer
+from . import queues
 from users.models import AuditLog
 from users.permissions import IsPatient, IsDoctor
-from hospitals.permissions import IsOperationsManager
+from hospitals.permissions import IsOperationsManager, IsHospitalStaff, staff_hospital_ids
+from hospitals.models import Doctor, DoctorBlockedTime
+from healthcare_platform.pagination import KeysetPagination, paginated_response
+
+MAX_AVAILABILITY_DAYS = 60
+MAX_AVAILABILITY_SLOTS = 100
 
 
 class PatientListCreateAPIView(generics.ListCreateAPIView):
@@ -50,9 +66,13 @@ class AppointmentListCreateAPIView(generics.ListCreateAPIView):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('appointment_date', 'appointment_time', 'id')
     
     def get_queryset(self):
-        queryset = Appointment.objects.select_related('patient', 'doctor', 'hospital', 'department')
+        queryset = Appointment.objects.all()
+        if self.request.query_params.get('view') != 'compact':
+            queryset = AppointmentSerializer.setup_eager_loading(queryset)
         
         # Patients can only see their own appointments
         if self.request.user.role == 'PATIENT':
@@ -104,10 +124,19 @@ class AppointmentListCreateAPIView(generics.ListCreateAPIView):
         
         return queryset.order_by('appointment_date', 'appointment_time')
     
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('view') != 'compact':
+            return super().list(request, *args, **kwargs)
+        queryset = AppointmentSerializer.compact_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(AppointmentSerializer.compact(page))
+        return Response(AppointmentSerializer.compact(queryset))
+    
     def perform_create(self, serializer):
         # Only patients can book appointments
         if self.request.user.role != 'PATIENT':
-            raise permissions.PermissionDenied("Only patients can book appointments")
+            raise PermissionDenied("Only patients can book appointments")
         
         patient = getattr(self.request.user, 'patient_profile', None)
         if not patient:
@@ -118,20 +147,30 @@ class AppointmentListCreateAPIView(generics.ListCreateAPIView):
         from hospitals.models import Hospital
         hospital = Hospital.objects.get(id=hospital_id)
         
-        appointment = serializer.save(
-            patient=patient,
-            hospital=hospital,
-            status='REQUESTED'  # Start with REQUESTED, Operations Manager will review
-        )
-        
-        # Log appointment booking
-        AuditLog.objects.create(
-            user=self.request.user,
-            action='APPOINTMENT_REQUESTED',
-            resource_type='Appointment',
-            resource_id=appointment.id,
-            ip_address=self.request.META.get('REMOTE_ADDR')
-        )
+        with transaction.atomic():
+            # Claim the doctor's slot in the same transaction as the booking
+            book_appointment_slot(
+                serializer.validated_data.get('appointment_type', 'OPD'),
+                serializer.validated_data.get('doctor_id'),
+                serializer.validated_data['appointment_date'],
+                serializer.validated_data['appointment_time'],
+            )
+            appointment = serializer.save(
+                patient=patient,
+                hospital=hospital,
+                status='REQUESTED'  # Start with REQUESTED, Operations Manager will review
+            )
+            
+            record_transitions([(appointment.id, '', appointment.status)], user=self.request.user)
+            
+            # Log appointment booking
+            AuditLog.objects.create(
+                user=self.request.user,
+                action='APPOINTMENT_REQUESTED',
+                resource_type='Appointment',
+                resource_id=appointment.id,
+                ip_address=self.request.META.get('REMOTE_ADDR')
+            )
 
 
 class AppointmentDetailAPIView(generics.RetrieveUpdateAPIView):
@@ -172,34 +211,34 @@ class AppointmentDetailAPIView(generics.RetrieveUpdateAPIView):
     def perform_update(self, serializer):
         appointment = self.get_object()
         old_status = appointment.status
+        new_status = serializer.validated_data.get('status', old_status)
         
-        # Only Operations Manager can approve/assign appointments
-        if self.request.user.role == 'OPERATIONS_MANAGER':
-            new_status = serializer.validated_data.get('status', old_status)
-            
-            # Operations Manager can review and assign
-            if new_status in ['REVIEWED', 'ASSIGNED', 'CONFIRMED', 'RESCHEDULED', 'CANCELLED']:
-                serializer.validated_data['reviewed_by'] = self.request.user
-                serializer.validated_data['reviewed_at'] = timezone.now()
-            
-            # If assigning to doctor, update status
-            if 'doctor_id' in serializer.validated_data and new_status == 'ASSIGNED':
-                serializer.validated_data['status'] = 'ASSIGNED'
-        
-        # Doctors can only update their own appointments to IN_PROGRESS or COMPLETED
-        elif self.request.user.role == 'DOCTOR':
+        # Doctors can only update their own appointments
+        if self.request.user.role == 'DOCTOR':
             doctor = getattr(self.request.user, 'doctor_profile', None)
             if appointment.doctor != doctor:
-                raise permissions.PermissionDenied("Can only update your assigned appointments")
-            
-            new_status = serializer.validated_data.get('status', old_status)
-            if new_status not in ['IN_PROGRESS', 'COMPLETED']:
-                raise permissions.PermissionDenied("Doctors can only mark appointments as In Progress or Completed")
+                raise PermissionDenied("Can only update your assigned appointments")
+        
+        # Which roles may set which statuses lives in the state machine
+        if new_status != old_status:
+            check_transition(self.request.user, old_status, new_status)
+        
+        # Operations Manager reviews and assigns
+        if self.request.user.role == 'OPERATIONS_MANAGER' and new_status in OPERATIONS_STATUSES:
+            serializer.validated_data['reviewed_by'] = self.request.user
+            serializer.validated_data['reviewed_at'] = timezone.now()
         
-        serializer.save()
+        with transaction.atomic():
+            update_appointment_slot(appointment, **{
+                field: serializer.validated_data[field]
+                for field in ['doctor_id', 'appointment_date', 'appointment_time', 'status', 'appointment_type']
+                if field in serializer.validated_data
+            })
+            serializer.save()
+            record_transitions([(appointment.id, old_status, new_status)], user=self.request.user)
         
         # Log status change
-        if old_status != serializer.validated_data.get('status', old_status):
+        if old_status != new_status:
             AuditLog.objects.create(
                 user=self.request.user,
                 action=f'APPOINTMENT_{serializer.validated_data.get("status", old_status)}',
@@ -209,6 +248,15 @@ class AppointmentDetailAPIView(generics.RetrieveUpdateAPIView):
             )
 
 
+def appointment_list_response(request, queryset, ordering):
+    """Full nested appointments, or flat rows with ``?view=compact``, keyset-paginated on request"""
+    if request.query_params.get('view') == 'compact':
+        return paginated_response(request, AppointmentSerializer.compact_values(queryset),
+                                  AppointmentSerializer.compact, ordering)
+    return paginated_response(request, AppointmentSerializer.setup_eager_loading(queryset),
+                              lambda rows: AppointmentSerializer(rows, many=True).data, ordering)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsOperationsManager])
 def operations_appointments(request):
@@ -221,10 +269,9 @@ def operations_appointments(request):
     appointments = Appointment.objects.filter(
         hospital__in=hospitals.all(),
         status=status_filter
-    ).order_by('appointment_date', 'appointment_time')
+    ).order_by('appointment_date', 'appointment_time', 'id')
     
-    serializer = AppointmentSerializer(appointments, many=True)
-    return Response(serializer.data)
+    return appointment_list_response(request, appointments, ['appointment_date', 'appointment_time', 'id'])
 
 
 @api_view(['POST'])
@@ -245,19 +292,26 @@ def assign_appointment(request, appointment_id):
         
         from hospitals.models import Doctor, Department
         
-        if doctor_id:
-            doctor = Doctor.objects.get(id=doctor_id)
-            appointment.doctor = doctor
-        
-        if department_id:
-            department = Department.objects.get(id=department_id)
-            appointment.department = department
+        old_status = appointment.status
+        if old_status != 'ASSIGNED':
+            check_transition(request.user, old_status, 'ASSIGNED')
         
-        appointment.status = 'ASSIGNED'
-        appointment.reviewed_by = request.user
-        appointment.reviewed_at = timezone.now()
-        appointment.operations_notes = notes
-        appointment.save()
+        with transaction.atomic():
+            if doctor_id:
+                doctor = Doctor.objects.get(id=doctor_id)
+                update_appointment_slot(appointment, doctor_id=doctor.id, status='ASSIGNED')
+                appointment.doctor = doctor
+            
+            if department_id:
+                department = Department.objects.get(id=department_id)
+                appointment.department = department
+            
+            appointment.status = 'ASSIGNED'
+            appointment.reviewed_by = request.user
+            appointment.reviewed_at = timezone.now()
+            appointment.operations_notes = notes
+            appointment.save()
+            record_transitions([(appointment.id, old_status, 'ASSIGNED')], user=request.user)
         
         # Log assignment
         AuditLog.objects.create(
@@ -274,6 +328,122 @@ def assign_appointment(request, appointment_id):
         return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsOperationsManager])
+def bulk_assign_appointments(request):
+    """Operations Manager triages and assigns many appointments in one request"""
+    assignments = request.data.get('assignments')
+    if not isinstance(assignments, list) or not assignments:
+        return Response({'error': 'assignments must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(assignments) > MAX_BULK_ASSIGNMENTS:
+        return Response({'error': f'At most {MAX_BULK_ASSIGNMENTS} assignments per request'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    updated, errors = bulk_assign(request.user, assignments, ip_address=request.META.get('REMOTE_ADDR'))
+    return Response({
+        'updated': [appointment.id for appointment in updated],
+        'errors': errors,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsOperationsManager])
+def auto_assign_appointments(request):
+    """Assign a hospital's REQUESTED backlog to doctors by department, schedule and load"""
+    managed = list(request.user.managed_hospitals.values_list('id', flat=True))
+    hospital_id = request.data.get('hospital_id')
+    if hospital_id is None and len(managed) == 1:
+        hospital_id = managed[0]
+    try:
+        hospital_id = int(hospital_id)
+        start_date = date.fromisoformat(request.data.get('date', date.today().isoformat()))
+        limit = request.data.get('limit')
+        limit = int(limit) if limit else None
+    except (TypeError, ValueError):
+        return Response({'error': 'Invalid hospital_id, date or limit'}, status=status.HTTP_400_BAD_REQUEST)
+    if hospital_id not in managed:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    dry_run = str(request.data.get('dry_run', False)).lower() in ['true', '1']
+    assigned, unplaced = auto_assign(request.user, hospital_id, dry_run=dry_run, start_date=start_date,
+                                     limit=limit, ip_address=request.META.get('REMOTE_ADDR'))
+    return Response({
+        'dry_run': dry_run,
+        'assigned': [{'appointment_id': item['appointment_id'], 'doctor_id': item['doctor_id']} for item in assigned],
+        'unassigned': unplaced,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def reschedule_blocked_appointments(request):
+    """Move every appointment in a doctor's blocked time to the next free slot (or a department peer)"""
+    if request.user.role not in ['SUPER_ADMIN', 'HOSPITAL_DIRECTOR', 'HOSPITAL_ADMIN', 'OPERATIONS_MANAGER']:
+        raise PermissionDenied("Only hospital management can reschedule appointments in bulk")
+    try:
+        blocked_time = DoctorBlockedTime.objects.select_related('doctor').get(id=request.data.get('blocked_time_id'))
+    except (DoctorBlockedTime.DoesNotExist, ValueError, TypeError):
+        return Response({'error': 'Blocked time not found'}, status=status.HTTP_404_NOT_FOUND)
+    if request.user.role != 'SUPER_ADMIN':
+        _check_hospital_access(request.user, blocked_time.doctor.hospital_id)
+    try:
+        days = min(int(request.data.get('days', DEFAULT_HORIZON_DAYS)), MAX_AVAILABILITY_DAYS)
+    except (TypeError, ValueError):
+        return Response({'error': 'Invalid days'}, status=status.HTTP_400_BAD_REQUEST)
+    if days < 1:
+        return Response({'error': 'days must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.data.get('dry_run', False)).lower() in ['true', '1', 'yes']
+    
+    rescheduled, unplaced = reschedule_blocked(
+        request.user, blocked_time, horizon_days=days, dry_run=dry_run,
+        ip_address=request.META.get('REMOTE_ADDR')
+    )
+    return Response({
+        'dry_run': dry_run,
+        'rescheduled': rescheduled,
+        'unplaced': unplaced,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_transition_appointments(request):
+    """Move many appointments to one status, skipping those the state machine does not allow"""
+    new_status = request.data.get('status')
+    appointment_ids = request.data.get('appointment_ids')
+    if new_status not in TRANSITIONS:
+        return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(appointment_ids, list) or not appointment_ids or len(appointment_ids) > MAX_BULK_ASSIGNMENTS:
+        return Response({'error': f'appointment_ids must be a list of 1 to {MAX_BULK_ASSIGNMENTS} ids'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        appointment_ids = [int(appointment_id) for appointment_id in appointment_ids]
+    except (TypeError, ValueError):
+        return Response({'error': 'appointment_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    moved, skipped = bulk_transition(request.user, appointment_ids, new_status)
+    return Response({'status': new_status, 'updated': moved, 'skipped': skipped})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def appointment_stage_durations(request):
+    """Average time appointments spend in each status, from the transition log"""
+    try:
+        days = min(int(request.query_params.get('days', 30)), 365)
+    except ValueError:
+        return Response({'error': 'Invalid days'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    appointments = scope_for(request.user, Appointment.objects.all())
+    hospital_id = request.query_params.get('hospital')
+    if hospital_id:
+        appointments = appointments.filter(hospital_id=hospital_id)
+    transitions = AppointmentTransition.objects.filter(
+        appointment__in=appointments, created_at__gte=timezone.now() - timedelta(days=days)
+    )
+    return Response({'days': days, 'stages': stage_durations(transitions)})
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsPatient])
 def patient_appointments(request):
@@ -283,9 +453,9 @@ def patient_appointments(request):
         # Auto-create patient profile if it doesn't exist
         patient = Patient.objects.create(user=request.user)
     
-    appointments = Appointment.objects.filter(patient=patient).order_by('-appointment_date', '-appointment_time')
-    serializer = AppointmentSerializer(appointments, many=True)
-    return Response(serializer.data)
+    ordering = ['-appointment_date', '-appointment_time', '-id']
+    appointments = Appointment.objects.filter(patient=patient).order_by(*ordering)
+    return appointment_list_response(request, appointments, ordering)
 
 
 @api_view(['GET'])
@@ -296,6 +466,122 @@ def doctor_appointments(request):
     if not doctor:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    appointments = Appointment.objects.filter(doctor=doctor).order_by('appointment_date', 'appointment_time')
-    serializer = AppointmentSerializer(appointments, many=True)
-    return Response(serializer.data)
+    ordering = ['appointment_date', 'appointment_time', 'id']
+    appointments = Appointment.objects.filter(doctor=doctor).order_by(*ordering)
+    date_filter = request.query_params.get('date')
+    if date_filter:
+        appointments = appointments.filter(appointment_date=date_filter)
+    return appointment_list_response(request, appointments, ordering)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def doctor_availability(request):
+    """Next free OPD slots for a doctor, department or hospital"""
+    try:
+        doctor_id, department_id, hospital_id = [
+            int(value) if value else None
+            for value in (request.query_params.get(name) for name in ['doctor', 'department', 'hospital'])
+        ]
+    except ValueError:
+        return Response({'error': 'doctor, department and hospital must be integer ids'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not (doctor_id or department_id or hospital_id):
+        return Response({'error': 'One of doctor, department or hospital is required'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        start_date = date.fromisoformat(request.query_params.get('date', date.today().isoformat()))
+        days = min(int(request.query_params.get('days', 14)), MAX_AVAILABILITY_DAYS)
+        limit = min(int(request.query_params.get('limit', 10)), MAX_AVAILABILITY_SLOTS)
+        slot_minutes = request.query_params.get('slot_minutes')
+        slot_minutes = int(slot_minutes) if slot_minutes else None
+    except ValueError:
+        return Response({'error': 'Invalid date, days, limit or slot_minutes'}, status=status.HTTP_400_BAD_REQUEST)
+    if days < 1 or limit < 1 or (slot_minutes is not None and slot_minutes < 1):
+        return Response({'error': 'days, limit and slot_minutes must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    doctors = Doctor.objects.filter(is_active=True, is_approved=True)
+    if doctor_id:
+        doctors = doctors.filter(id=doctor_id)
+    if department_id:
+        doctors = doctors.filter(department_id=department_id)
+    if hospital_id:
+        doctors = doctors.filter(hospital_id=hospital_id)
+    
+    end_date = start_date + timedelta(days=days - 1)
+    availability = Availability.for_doctors(doctors, start_date, end_date, slot_minutes)
+    return Response(availability.next_free_slots(limit))
+
+
+def _check_hospital_access(user, hospital_id):
+    hospital_ids = staff_hospital_ids(user)
+    if hospital_ids is None or hospital_id not in hospital_ids:
+        raise PermissionDenied("Can only manage your own hospital")
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsHospitalStaff])
+def queue_check_in(request):
+    """Check an appointment into today's OPD or emergency queue"""
+    try:
+        appointment = Appointment.objects.get(id=request.data.get('appointment_id'))
+    except (Appointment.DoesNotExist, ValueError, TypeError):
+        return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
+    _check_hospital_access(request.user, appointment.hospital_id)
+    
+    default_type = 'EMERGENCY' if appointment.appointment_type == 'EMERGENCY' else 'OPD'
+    queue_type = request.data.get('queue_type', default_type)
+    if queue_type not in dict(AppointmentQueue.QUEUE_TYPE_CHOICES):
+        return Response({'error': 'Invalid queue_type'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    entry = queues.enqueue(appointment, queue_type)
+    return Response(AppointmentQueueSerializer(entry).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def queue_board(request, hospital_id, queue_type):
+    """Token display board, served from the in-memory queue view"""
+    if queue_type not in dict(AppointmentQueue.QUEUE_TYPE_CHOICES):
+        return Response({'error': 'Invalid queue_type'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(queues.get_board(hospital_id, queue_type).snapshot())
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsHospitalStaff])
+def queue_call_next(request, hospital_id, queue_type):
+    """Call the next waiting token, optionally only for one doctor"""
+    _check_hospital_access(request.user, hospital_id)
+    if queue_type not in dict(AppointmentQueue.QUEUE_TYPE_CHOICES):
+        return Response({'error': 'Invalid queue_type'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    doctor_id = request.data.get('doctor_id')
+    doctor = getattr(request.user, 'doctor_profile', None)
+    if doctor_id is None and request.user.role == 'DOCTOR' and doctor is not None:
+        doctor_id = doctor.id
+    
+    entry = queues.call_next(hospital_id, queue_type, doctor_id=doctor_id)
+    if entry is None:
+        return Response({'message': 'No patients waiting'}, status=status.HTTP_200_OK)
+    return Response(AppointmentQueueSerializer(entry).data)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsHospitalStaff])
+def queue_entry_action(request, entry_id, action):
+    """Skip, recall or complete a queue token"""
+    operations = {'skip': queues.skip, 'recall': queues.recall, 'complete': queues.complete}
+    if action not in operations:
+        return Response({'error': 'Unknown queue action'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    hospital_ids = staff_hospital_ids(request.user)
+    if hospital_ids is None:
+        raise PermissionDenied("Can only manage your own hospital")
+    try:
+        entry = operations[action](entry_id, hospital_ids=hospital_ids)
+    except AppointmentQueue.DoesNotExist:
+        return Response({'error': 'Queue entry not found'}, status=status.HTTP_404_NOT_FOUND)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(AppointmentQueueSerializer(entry).data)
@@ -0,0 +1,164 @@
+"""
+Queue wait-time estimation.
+
+Each completed consultation (IN_PROGRESS -> COMPLETED) folds its duration
+into an exponentially weighted moving average kept per doctor and per
+department in ConsultDuration, so the averages are maintained with one
+``F()`` update instead of re-reading appointment history.
+
+On every queue change the waits of all open entries are recomputed in a
+single pass over the queue: each entry waits for the predicted consults
+ahead of it in its own line (its doctor, else its department), minus the
+time already spent by the patient currently being seen.
+"""
+from collections import defaultdict
+from django.db.models import F, Q
+from django.utils import timezone
+from hospitals.models import EmergencyCapacity
+from .availability import default_slot_minutes
+from .models import AppointmentQueue, ConsultDuration
+
+EWMA_ALPHA = 0.3
+# Durations outside this range are treated as bookkeeping mistakes
+MIN_CONSULT_MINUTES = 1
+MAX_CONSULT_MINUTES = 240
+
+
+def consult_minutes(appointment):
+    """Length of a finished consultation in minutes, or None when unusable"""
+    if not appointment.started_at or not appointment.completed_at:
+        return None
+    minutes = (appointment.completed_at - appointment.started_at).total_seconds() / 60
+    if not MIN_CONSULT_MINUTES <= minutes <= MAX_CONSULT_MINUTES:
+        return None
+    return minutes
+
+
+def _fold(lookup, minutes):
+    estimate, created = ConsultDuration.objects.get_or_create(
+        **lookup, defaults={'average_minutes': minutes, 'samples': 1}
+    )
+    if not created:
+        ConsultDuration.objects.filter(pk=estimate.pk).update(
+            average_minutes=EWMA_ALPHA * minutes + (1 - EWMA_ALPHA) * F('average_minutes'),
+            samples=F('samples') + 1,
+        )
+
+
+def record_consult(appointment):
+    """Fold a completed appointment's duration into its doctor and department averages"""
+    minutes = consult_minutes(appointment)
+    if minutes is None:
+        return
+    if appointment.doctor_id:
+        _fold({'doctor_id': appointment.doctor_id}, minutes)
+    if appointment.department_id:
+        _fold({'department_id': appointment.department_id}, minutes)
+
+
+class WaitTimeEstimator:
+    """Predicted consult length per doctor / department, with a fallback default"""
+
+    def __init__(self, doctor_minutes, department_minutes, default_minutes=None):
+        self.doctor_minutes = doctor_minutes
+        self.department_minutes = department_minutes
+        self.default_minutes = default_minutes or default_slot_minutes()
+
+    @classmethod
+    def for_appointments(cls, appointments):
+        """Load the averages needed for a set of appointments in one query"""
+        doctor_ids = {appointment.doctor_id for appointment in appointments if appointment.doctor_id}
+        department_ids = {appointment.department_id for appointment in appointments if appointment.department_id}
+        doctor_minutes = {}
+        department_minutes = {}
+        if doctor_ids or department_ids:
+            rows = ConsultDuration.objects.filter(
+                Q(doctor_id__in=doctor_ids) | Q(department_id__in=department_ids)
+            ).values_list('doctor_id', 'department_id', 'average_minutes')
+            for doctor_id, department_id, minutes in rows:
+                if doctor_id:
+                    doctor_minutes[doctor_id] = minutes
+                if department_id:
+                    department_minutes[department_id] = minutes
+        return cls(doctor_minutes, department_minutes)
+
+    def minutes_for(self, appointment):
+        if appointment.doctor_id in self.doctor_minutes:
+            return self.doctor_minutes[appointment.doctor_id]
+        if appointment.department_id in self.department_minutes:
+            return self.department_minutes[appointment.department_id]
+        return self.default_minutes
+
+    @staticmethod
+    def line_for(appointment):
+        """Patients in the same line are seen one after another"""
+        if appointment.doctor_id:
+            return ('doctor', appointment.doctor_id)
+        if appointment.department_id:
+            return ('department', appointment.department_id)
+        return ('hospital', appointment.hospital_id)
+
+    def estimate(self, entries, now=None):
+        """
+        Set ``estimated_wait_time`` on open queue entries in one O(n) pass.
+
+        ``entries`` are AppointmentQueue rows (with appointments loaded) in
+        any order. Returns (changed_entries, line_waits) where ``line_waits``
+        maps each line to the wait a newcomer joining it would face.
+        """
+        now = now or timezone.now()
+        ahead = defaultdict(float)
+        servers = defaultdict(int)
+        waiting = []
+
+        for entry in entries:
+            appointment = entry.appointment
+            line = self.line_for(appointment)
+            if entry.status == 'CALLED':
+                servers[line] += 1
+                started = appointment.started_at or entry.called_at or now
+                elapsed = (now - started).total_seconds() / 60
+                ahead[line] += max(0.0, self.minutes_for(appointment) - elapsed)
+            elif entry.status == 'WAITING':
+                waiting.append(entry)
+
+        changed = []
+        waiting.sort(key=lambda entry: entry.queue_number)
+        for entry in waiting:
+            line = self.line_for(entry.appointment)
+            wait = round(ahead[line] / max(1, servers[line]))
+            if entry.estimated_wait_time != wait:
+                entry.estimated_wait_time = wait
+                changed.append(entry)
+            ahead[line] += self.minutes_for(entry.appointment)
+
+        line_waits = {line: round(total / max(1, servers[line])) for line, total in ahead.items()}
+        return changed, line_waits
+
+
+def refresh_queue_wait_times(hospital_id, queue_type, queue_date):
+    """
+    Recompute waits for every open entry of one queue and save the changed ones.
+
+    Emergency queues also publish the wait a new arrival would face to the
+    hospital's EmergencyCapacity. Returns the entries whose wait changed.
+    """
+    entries = list(
+        AppointmentQueue.objects.select_related('appointment').filter(
+            hospital_id=hospital_id, queue_type=queue_type, queue_date=queue_date,
+            status__in=['WAITING', 'CALLED'],
+        )
+    )
+    estimator = WaitTimeEstimator.for_appointments([entry.appointment for entry in entries])
+    changed, line_waits = estimator.estimate(entries)
+    if changed:
+        AppointmentQueue.objects.bulk_update(changed, ['estimated_wait_time'])
+
+    if queue_type == 'EMERGENCY':
+        # A newcomer joins whichever line clears first
+        wait_time = min(line_waits.values()) if line_waits else 0
+        capacity = EmergencyCapacity.objects.filter(hospital_id=hospital_id).first()
+        if capacity is not None and capacity.wait_time_minutes != wait_time:
+            capacity.wait_time_minutes = wait_time
+            capacity.save(update_fields=['wait_time_minutes', 'last_updated'])
+    return changed
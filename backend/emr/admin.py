@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EMRRecord, ClinicalNote, VitalsRecord
+from .models import EMRRecord, ClinicalNote, VitalsRecord, VitalsSegment, EarlyWarningScore
 
 
 @admin.register(EMRRecord)
@@ -23,3 +23,16 @@ class VitalsRecordAdmin(admin.ModelAdmin):
     list_filter = ['recorded_at']
     search_fields = ['emr_record__patient__user__email']
 
+
+@admin.register(VitalsSegment)
+class VitalsSegmentAdmin(admin.ModelAdmin):
+    list_display = ['patient', 'measure', 'starts_at', 'ends_at', 'count']
+    list_filter = ['measure']
+    search_fields = ['patient__user__email']
+
+
+@admin.register(EarlyWarningScore)
+class EarlyWarningScoreAdmin(admin.ModelAdmin):
+    list_display = ['patient', 'hospital', 'score', 'risk', 'red_flag', 'observed_at']
+    list_filter = ['risk', 'red_flag', 'hospital']
+    search_fields = ['patient__user__email']
@@ -0,0 +1,142 @@
+"""
+NEWS2 early-warning scores.
+
+Each patient's latest respiratory rate, SpO2, systolic BP, heart rate and
+temperature are kept on an EarlyWarningScore row. New observations only
+replace the parameters they carry, and only when they are newer than the
+stored reading, so out-of-order monitor batches are harmless. Every batch
+of changed rows is scored in one NumPy pass (``np.searchsorted`` against
+each parameter's band edges) and written with one ``bulk_update`` and one
+``bulk_create``.
+
+Supplemental oxygen and consciousness are not captured in this system, so
+patients are scored as on room air and alert (both 0); SpO2 uses scale 1.
+A missing parameter scores 0 and leaves the row marked incomplete.
+"""
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .models import EarlyWarningScore
+
+# parameter: (band edges, score per band); a value v falls in band searchsorted(edges, v, 'right')
+BANDS = {
+    'respiratory_rate': ([9, 12, 21, 25], [3, 1, 0, 2, 3]),
+    'oxygen_saturation': ([92, 94, 96], [3, 2, 1, 0]),
+    'blood_pressure_systolic': ([91, 101, 111, 220], [3, 2, 1, 0, 3]),
+    'heart_rate': ([41, 51, 91, 111, 131], [3, 1, 0, 1, 2, 3]),
+    'temperature': ([35.05, 36.05, 38.05, 39.05], [3, 1, 0, 1, 2]),
+}
+PARAMETERS = list(BANDS)
+# Temperatures above this are taken to be Fahrenheit
+FAHRENHEIT_ABOVE = 45.0
+DEFAULT_THRESHOLD = 5
+
+
+def score_matrix(values):
+    """
+    Score an (n, len(PARAMETERS)) float array of vitals, NaN for missing.
+    Returns (components, totals) as int arrays of shape (n, p) and (n,).
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(-1, len(PARAMETERS))
+    components = np.zeros(values.shape, dtype=np.int64)
+    for column, parameter in enumerate(PARAMETERS):
+        edges, scores = BANDS[parameter]
+        observed = values[:, column]
+        if parameter == 'temperature':
+            observed = np.where(observed > FAHRENHEIT_ABOVE, (observed - 32) * 5 / 9, observed)
+        bands = np.searchsorted(np.asarray(edges, dtype=np.float64), observed, side='right')
+        components[:, column] = np.where(np.isnan(observed), 0, np.asarray(scores)[np.minimum(bands, len(edges))])
+    return components, components.sum(axis=1)
+
+
+def risk_levels(components, totals):
+    """NEWS2 clinical risk per row: HIGH >= 7, MEDIUM >= 5, LOW_MEDIUM for a single red score"""
+    red = (components == 3).any(axis=1)
+    return np.select([totals >= 7, totals >= 5, red], ['HIGH', 'MEDIUM', 'LOW_MEDIUM'], default='LOW'), red
+
+
+def observations_from(patient_id, hospital_id, emr_record_id, record, at):
+    """One observation of the scored parameters a record carries, or None when it has none"""
+    values = {
+        parameter: float(getattr(record, parameter))
+        for parameter in PARAMETERS
+        if getattr(record, parameter, None) is not None
+    }
+    return (patient_id, hospital_id, emr_record_id, at, values) if values else None
+
+
+def _apply(row, hospital_id, emr_record_id, at, values):
+    """Fold one observation into a row; returns whether anything changed"""
+    timestamp = at.timestamp()
+    changed = False
+    for parameter, value in values.items():
+        if timestamp >= row.measured_at.get(parameter, float('-inf')):
+            setattr(row, parameter, value)
+            row.measured_at[parameter] = timestamp
+            changed = True
+    if changed and (row.observed_at is None or at >= row.observed_at):
+        row.observed_at = at
+        row.hospital_id = hospital_id
+        row.emr_record_id = emr_record_id
+    return changed
+
+
+def score_rows(rows):
+    """Recompute score, risk and components of many rows in one vectorized pass"""
+    if not rows:
+        return
+    values = np.array([
+        [np.nan if getattr(row, parameter) is None else getattr(row, parameter) for parameter in PARAMETERS]
+        for row in rows
+    ], dtype=np.float64)
+    components, totals = score_matrix(values)
+    risks, red = risk_levels(components, totals)
+    missing = np.isnan(values)
+    for i, row in enumerate(rows):
+        row.score = int(totals[i])
+        row.risk = str(risks[i])
+        row.red_flag = bool(red[i])
+        row.components = dict(zip(PARAMETERS, components[i].tolist()))
+        row.is_complete = not missing[i].any()
+
+
+def update_scores(observations):
+    """
+    Apply (patient_id, hospital_id, emr_record_id, at, values) observations
+    and rescore the patients they changed. Returns the number rescored.
+    """
+    observations = sorted((item for item in observations if item), key=lambda item: item[3])
+    if not observations:
+        return 0
+    with transaction.atomic():
+        rows = {
+            row.patient_id: row
+            for row in EarlyWarningScore.objects.select_for_update().filter(
+                patient_id__in={item[0] for item in observations}
+            )
+        }
+        existing = set(rows)
+        changed = set()
+        for patient_id, hospital_id, emr_record_id, at, values in observations:
+            row = rows.get(patient_id)
+            if row is None:
+                row = rows[patient_id] = EarlyWarningScore(patient_id=patient_id, hospital_id=hospital_id,
+                                                           measured_at={})
+            if _apply(row, hospital_id, emr_record_id, at, values):
+                changed.add(patient_id)
+
+        touched = [rows[patient_id] for patient_id in changed]
+        score_rows(touched)
+        now = timezone.now()
+        for row in touched:
+            row.updated_at = now
+        EarlyWarningScore.objects.bulk_update(
+            [row for row in touched if row.patient_id in existing],
+            PARAMETERS + ['measured_at', 'score', 'risk', 'red_flag', 'components', 'is_complete', 'observed_at',
+                          'hospital', 'emr_record', 'updated_at'],
+            batch_size=500,
+        )
+        # A concurrent first reading may have created the row; the next reading rescores it
+        EarlyWarningScore.objects.bulk_create([row for row in touched if row.patient_id not in existing],
+                                              batch_size=500, ignore_conflicts=True)
+    return len(touched)
@@ -0,0 +1,136 @@
+"""
+Batch vitals ingestion for bedside monitors.
+
+A batch is validated in plain Python against the VitalsRecord field rules
+(no serializer per record), the EMR records it references are checked with
+one query, and the valid records are written with ``bulk_create`` in
+chunks inside one transaction. ``bulk_create`` sends no ``post_save``, so
+the readings are appended to the columnar store and the early-warning
+scores updated here, in one call each for the whole batch. Invalid records
+are reported by position and do not stop the rest of the batch.
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .early_warning import observations_from, update_scores
+from .models import EMRRecord, VitalsRecord
+from .vitals_store import MEASURES, append_readings, readings_from
+
+MAX_BATCH_RECORDS = 10000
+CHUNK_SIZE = 1000
+# Monitor clocks drift; anything further ahead than this is rejected
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+INTEGER_MEASURES = {'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'respiratory_rate'}
+# DecimalField(max_digits=5, decimal_places=2)
+MAX_DECIMAL = Decimal('999.99')
+MAX_INTEGER = 2 ** 31 - 1
+
+
+def _measure(name, value):
+    """Convert one reading to the field's type, raising ValueError when it does not fit"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f'{name} must be a number')
+    if name in INTEGER_MEASURES:
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f'{name} must be an integer')
+        if not number.is_integer() or abs(number) > MAX_INTEGER:
+            raise ValueError(f'{name} must be an integer')
+        return int(number)
+    try:
+        number = Decimal(str(value)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f'{name} must be a number')
+    if not number.is_finite() or abs(number) > MAX_DECIMAL:
+        raise ValueError(f'{name} must be between -999.99 and 999.99')
+    return number
+
+
+def _recorded_at(value, now):
+    if value in (None, ''):
+        return now
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValueError('recorded_at must be an ISO 8601 datetime')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    if parsed > now + MAX_CLOCK_SKEW:
+        raise ValueError('recorded_at is in the future')
+    return parsed
+
+
+def _as_id(value):
+    if isinstance(value, bool):
+        raise ValueError('emr_record must be an id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError('emr_record must be an id')
+
+
+def parse_vitals(items, user, now):
+    """Normalize request items into unsaved VitalsRecord objects, returning (records, errors)"""
+    records = []
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Each record must be a JSON object'})
+            continue
+        try:
+            emr_record_id = _as_id(item.get('emr_record'))
+            values = {name: _measure(name, item[name]) for name in MEASURES if item.get(name) is not None}
+            if not values:
+                raise ValueError('At least one vital sign is required')
+            recorded_at = _recorded_at(item.get('recorded_at'), now)
+            notes = item.get('notes') or ''
+            if not isinstance(notes, str):
+                raise ValueError('notes must be a string')
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        record = VitalsRecord(emr_record_id=emr_record_id, recorded_by=user, recorded_at=recorded_at,
+                              notes=notes, **values)
+        record.index = index
+        records.append(record)
+    return records, errors
+
+
+def ingest_vitals(items, user):
+    """
+    Validate and store a batch of vitals records.
+
+    Returns (created_count, errors); each error has the item's ``index`` in
+    the batch and a message.
+    """
+    now = timezone.now()
+    records, errors = parse_vitals(items, user, now)
+    patients = {
+        emr_record_id: (patient_id, hospital_id)
+        for emr_record_id, patient_id, hospital_id in EMRRecord.objects.filter(
+            id__in={record.emr_record_id for record in records}
+        ).values_list('id', 'patient_id', 'hospital_id')
+    }
+    valid = []
+    for record in records:
+        if record.emr_record_id in patients:
+            valid.append(record)
+        else:
+            errors.append({'index': record.index, 'error': f'EMR record {record.emr_record_id} not found'})
+
+    with transaction.atomic():
+        for offset in range(0, len(valid), CHUNK_SIZE):
+            VitalsRecord.objects.bulk_create(valid[offset:offset + CHUNK_SIZE])
+        append_readings(
+            reading
+            for record in valid
+            for reading in readings_from(patients[record.emr_record_id][0], record, record.recorded_at)
+        )
+        update_scores(
+            observations_from(*patients[record.emr_record_id], record.emr_record_id, record, record.recorded_at)
+            for record in valid
+        )
+    errors.sort(key=lambda error: error['index'])
+    return len(valid), errors
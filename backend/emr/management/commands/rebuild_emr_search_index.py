@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from emr.models import EMRRecord
+from emr.search import CHUNK_SIZE, index_records
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the EMR full-text search index (e.g. after bulk updates that bypass signals)'
+
+    def handle(self, *args, **options):
+        record_ids = list(EMRRecord.objects.order_by('id').values_list('id', flat=True))
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if connection.vendor == 'sqlite':
+                    cursor.execute('DELETE FROM emr_search')
+                elif connection.vendor == 'postgresql':
+                    cursor.execute('DELETE FROM emr_search_documents')
+            for offset in range(0, len(record_ids), CHUNK_SIZE):
+                index_records(record_ids[offset:offset + CHUNK_SIZE])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {len(record_ids)} EMR records'))
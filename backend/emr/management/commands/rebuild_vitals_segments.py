@@ -0,0 +1,48 @@
+from itertools import islice
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from emr.models import EMRRecord, VitalsRecord, VitalsSegment
+from emr.vitals_store import MEASURES, append_readings
+
+CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the columnar vitals store from EMR and vitals records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patient', type=int, action='append', dest='patient_ids',
+                            help='Only rebuild this patient (repeatable)')
+
+    def _readings(self, queryset, patient_field, time_field):
+        rows = queryset.order_by().values_list(patient_field, time_field, *MEASURES)
+        for patient_id, at, *values in rows.iterator(chunk_size=CHUNK_SIZE):
+            for measure, value in zip(MEASURES, values):
+                if value is not None:
+                    yield patient_id, measure, at, float(value)
+
+    def _store(self, readings):
+        """Append in chunks so memory stays flat on large tables"""
+        readings = iter(readings)
+        count = 0
+        while True:
+            chunk = list(islice(readings, CHUNK_SIZE))
+            if not chunk:
+                return count
+            count += append_readings(chunk)
+
+    def handle(self, *args, **options):
+        patient_ids = options['patient_ids']
+        records = EMRRecord.objects.all()
+        vitals = VitalsRecord.objects.all()
+        segments = VitalsSegment.objects.all()
+        if patient_ids:
+            records = records.filter(patient_id__in=patient_ids)
+            vitals = vitals.filter(emr_record__patient_id__in=patient_ids)
+            segments = segments.filter(patient_id__in=patient_ids)
+
+        with transaction.atomic():
+            segments.delete()
+            count = self._store(self._readings(records, 'patient_id', 'visit_date'))
+            count += self._store(self._readings(vitals, 'emr_record__patient_id', 'recorded_at'))
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} vitals readings'))
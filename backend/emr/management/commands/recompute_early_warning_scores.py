@@ -0,0 +1,46 @@
+from datetime import timedelta
+from itertools import islice
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from emr.early_warning import PARAMETERS, update_scores
+from emr.models import EarlyWarningScore, EMRRecord, VitalsRecord
+
+CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild early-warning scores from recent EMR and vitals records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='How far back to read vitals (default 7)')
+
+    def _observations(self, queryset, prefix, time_field, since):
+        rows = queryset.filter(**{f'{time_field}__gte': since}).order_by().values_list(
+            f'{prefix}patient_id', f'{prefix}hospital_id', f'{prefix}id' if prefix else 'id', time_field, *PARAMETERS
+        )
+        for patient_id, hospital_id, emr_record_id, at, *values in rows.iterator(chunk_size=CHUNK_SIZE):
+            values = {
+                parameter: float(value) for parameter, value in zip(PARAMETERS, values) if value is not None
+            }
+            if values:
+                yield patient_id, hospital_id, emr_record_id, at, values
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=max(1, options['days']))
+        observations = [
+            self._observations(EMRRecord.objects.all(), '', 'visit_date', since),
+            self._observations(VitalsRecord.objects.all(), 'emr_record__', 'recorded_at', since),
+        ]
+        with transaction.atomic():
+            EarlyWarningScore.objects.all().delete()
+            count = 0
+            for stream in observations:
+                while True:
+                    chunk = list(islice(stream, CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    update_scores(chunk)
+                    count += len(chunk)
+        scored = EarlyWarningScore.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Scored {scored} patients from {count} observations'))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_appointment_transitions'),
+        ('emr', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalsSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('measure', models.CharField(choices=[('temperature', 'Temperature'), ('blood_pressure_systolic', 'Systolic Blood Pressure'), ('blood_pressure_diastolic', 'Diastolic Blood Pressure'), ('heart_rate', 'Heart Rate'), ('respiratory_rate', 'Respiratory Rate'), ('oxygen_saturation', 'Oxygen Saturation'), ('weight', 'Weight'), ('height', 'Height')], max_length=30)),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('times', models.BinaryField()),
+                ('values', models.BinaryField()),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vitals_segments', to='appointments.patient')),
+            ],
+            options={
+                'db_table': 'vitals_segments',
+                'indexes': [models.Index(fields=['patient', 'measure', 'ends_at'], name='vitals_segm_patient_841402_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:13
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emr', '0002_vitals_segments'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vitalsrecord',
+            name='recorded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='vitalsrecord',
+            index=models.Index(fields=['emr_record', 'recorded_at'], name='vitals_reco_emr_rec_8adf89_idx'),
+        ),
+    ]
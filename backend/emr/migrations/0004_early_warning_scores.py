@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_appointment_transitions'),
+        ('hospitals', '0009_bed_forecasts'),
+        ('emr', '0003_vitals_device_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EarlyWarningScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('respiratory_rate', models.FloatField(blank=True, null=True)),
+                ('oxygen_saturation', models.FloatField(blank=True, null=True)),
+                ('blood_pressure_systolic', models.FloatField(blank=True, null=True)),
+                ('heart_rate', models.FloatField(blank=True, null=True)),
+                ('temperature', models.FloatField(blank=True, null=True)),
+                ('measured_at', models.JSONField(blank=True, default=dict)),
+                ('score', models.PositiveSmallIntegerField(default=0)),
+                ('risk', models.CharField(choices=[('LOW', 'Low'), ('LOW_MEDIUM', 'Low-medium'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], default='LOW', max_length=20)),
+                ('red_flag', models.BooleanField(default=False)),
+                ('components', models.JSONField(blank=True, default=dict)),
+                ('is_complete', models.BooleanField(default=False)),
+                ('observed_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('emr_record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='early_warning_scores', to='emr.emrrecord')),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='early_warning_scores', to='hospitals.hospital')),
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='early_warning_score', to='appointments.patient')),
+            ],
+            options={
+                'db_table': 'early_warning_scores',
+                'indexes': [models.Index(fields=['hospital', 'score'], name='early_warni_hospita_8578a5_idx'), models.Index(fields=['hospital', 'red_flag'], name='early_warni_hospita_4bc3de_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:17
+
+from django.db import migrations
+
+SQLITE_CREATE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS emr_search USING fts5(
+    patient_id UNINDEXED, hospital_id UNINDEXED, doctor_id UNINDEXED,
+    chief_complaint, diagnosis, treatment_plan, clinical_notes, notes,
+    tokenize = 'porter unicode61'
+)
+"""
+
+SQLITE_BACKFILL = """
+INSERT INTO emr_search (rowid, patient_id, hospital_id, doctor_id, chief_complaint, diagnosis, treatment_plan,
+                        clinical_notes, notes)
+SELECT r.id, r.patient_id, r.hospital_id, r.doctor_id, r.chief_complaint, r.diagnosis, r.treatment_plan,
+       r.clinical_notes,
+       COALESCE((SELECT group_concat(n.note, char(10)) FROM clinical_notes n WHERE n.emr_record_id = r.id), '')
+FROM emr_records r
+"""
+
+POSTGRES_CREATE = """
+CREATE TABLE IF NOT EXISTS emr_search_documents (
+    record_id bigint PRIMARY KEY REFERENCES emr_records (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+    patient_id bigint NOT NULL,
+    hospital_id bigint NOT NULL,
+    doctor_id bigint NULL,
+    body text NOT NULL,
+    document tsvector NOT NULL
+);
+CREATE INDEX IF NOT EXISTS emr_search_documents_document ON emr_search_documents USING GIN (document);
+CREATE INDEX IF NOT EXISTS emr_search_documents_patient ON emr_search_documents (patient_id);
+CREATE INDEX IF NOT EXISTS emr_search_documents_hospital ON emr_search_documents (hospital_id);
+"""
+
+POSTGRES_BACKFILL = """
+INSERT INTO emr_search_documents (record_id, patient_id, hospital_id, doctor_id, body, document)
+SELECT r.id, r.patient_id, r.hospital_id, r.doctor_id,
+       concat_ws(E'\\n', r.chief_complaint, r.diagnosis, r.treatment_plan, r.clinical_notes, n.notes),
+       setweight(to_tsvector('english', r.chief_complaint), 'A')
+       || setweight(to_tsvector('english', r.diagnosis), 'A')
+       || setweight(to_tsvector('english', r.treatment_plan), 'B')
+       || setweight(to_tsvector('english', r.clinical_notes), 'B')
+       || setweight(to_tsvector('english', COALESCE(n.notes, '')), 'C')
+FROM emr_records r
+LEFT JOIN (
+    SELECT emr_record_id, string_agg(note, E'\\n' ORDER BY created_at, id) AS notes
+    FROM clinical_notes GROUP BY emr_record_id
+) n ON n.emr_record_id = r.id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 on SQLite, tsvector + GIN on PostgreSQL; other backends search with icontains"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(SQLITE_BACKFILL)
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_CREATE)
+        schema_editor.execute(POSTGRES_BACKFILL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS emr_search')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS emr_search_documents')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emr', '0004_early_warning_scores'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from appointments.models import Patient, Appointment
 from hospitals.models import Hospital, Doctor
 
@@ -85,12 +86,89 @@ class VitalsRecord(models.Model):
     height = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     
     notes = models.TextField(blank=True)
-    recorded_at = models.DateTimeField(auto_now_add=True)
+    # Defaults to now; batch ingestion stores the monitor's own timestamp
+    recorded_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'vitals_records'
+        indexes = [
+            models.Index(fields=['emr_record', 'recorded_at']),
+        ]
         ordering = ['-recorded_at']
     
     def __str__(self):
         return f"Vitals - {self.recorded_at}"
 
+
+class VitalsSegment(models.Model):
+    """Append-only block of one vital sign's readings for a patient (see emr.vitals_store)"""
+    MEASURE_CHOICES = [
+        ('temperature', 'Temperature'),
+        ('blood_pressure_systolic', 'Systolic Blood Pressure'),
+        ('blood_pressure_diastolic', 'Diastolic Blood Pressure'),
+        ('heart_rate', 'Heart Rate'),
+        ('respiratory_rate', 'Respiratory Rate'),
+        ('oxygen_saturation', 'Oxygen Saturation'),
+        ('weight', 'Weight'),
+        ('height', 'Height'),
+    ]
+    
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='vitals_segments')
+    measure = models.CharField(max_length=30, choices=MEASURE_CHOICES)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    # Little-endian int64 epoch seconds and float32 readings, sorted by time
+    times = models.BinaryField()
+    values = models.BinaryField()
+    
+    class Meta:
+        db_table = 'vitals_segments'
+        indexes = [
+            models.Index(fields=['patient', 'measure', 'ends_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_measure_display()} - {self.count} readings from {self.starts_at}"
+
+
+class EarlyWarningScore(models.Model):
+    """Latest NEWS2 early-warning score per patient, updated as vitals arrive (see emr.early_warning)"""
+    RISK_CHOICES = [
+        ('LOW', 'Low'),
+        ('LOW_MEDIUM', 'Low-medium'),
+        ('MEDIUM', 'Medium'),
+        ('HIGH', 'High'),
+    ]
+    
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, related_name='early_warning_score')
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='early_warning_scores')
+    emr_record = models.ForeignKey(EMRRecord, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='early_warning_scores')
+    
+    # Latest reading of each scored parameter, with its time in ``measured_at``
+    respiratory_rate = models.FloatField(null=True, blank=True)
+    oxygen_saturation = models.FloatField(null=True, blank=True)
+    blood_pressure_systolic = models.FloatField(null=True, blank=True)
+    heart_rate = models.FloatField(null=True, blank=True)
+    temperature = models.FloatField(null=True, blank=True)
+    measured_at = models.JSONField(default=dict, blank=True)
+    
+    score = models.PositiveSmallIntegerField(default=0)
+    risk = models.CharField(max_length=20, choices=RISK_CHOICES, default='LOW')
+    red_flag = models.BooleanField(default=False)  # Any single parameter scoring 3
+    components = models.JSONField(default=dict, blank=True)
+    is_complete = models.BooleanField(default=False)
+    observed_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'early_warning_scores'
+        indexes = [
+            models.Index(fields=['hospital', 'score']),
+            models.Index(fields=['hospital', 'red_flag']),
+        ]
+    
+    def __str__(self):
+        return f"NEWS2 {self.score} - {self.patient.user.full_name}"
+
@@ -0,0 +1,170 @@
+"""
+Full-text search over EMR clinical text.
+
+Each EMRRecord is one search document made of its chief complaint,
+diagnosis, treatment plan, clinical notes and every ClinicalNote on it.
+On SQLite the documents live in the FTS5 table ``emr_search`` (rowid is the
+record id) and are ranked with ``bm25``; on PostgreSQL they live in
+``emr_search_documents`` as a weighted ``tsvector`` behind a GIN index and
+are ranked with ``ts_rank``. Both are created by migration
+``emr.0005_emr_search_index``. Other backends fall back to ``icontains``
+without ranking.
+
+Documents are rewritten from ``emr.signals`` whenever a record or one of
+its notes is saved or deleted. Queryset ``update()`` calls bypass signals;
+``rebuild_emr_search_index`` re-indexes everything after bulk edits.
+"""
+import re
+from django.db import connection
+from django.db.models import Q
+from .models import ClinicalNote, EMRRecord
+
+TEXT_FIELDS = ['chief_complaint', 'diagnosis', 'treatment_plan', 'clinical_notes']
+MAX_TERMS = 8
+CHUNK_SIZE = 500
+SNIPPET_START, SNIPPET_END = '[', ']'
+
+# bm25 weights per FTS5 column: patient_id, hospital_id, doctor_id, then the text columns and notes
+SQLITE_WEIGHTS = (0, 0, 0, 2.0, 3.0, 1.0, 1.0, 1.0)
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'A') || "
+    "setweight(to_tsvector('english', %s), 'B') || setweight(to_tsvector('english', %s), 'B') || "
+    "setweight(to_tsvector('english', %s), 'C')"
+)
+
+
+def search_terms(query):
+    """Lower-cased word tokens of a user query; punctuation and operators are dropped"""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _documents(record_ids):
+    """(id, patient_id, hospital_id, doctor_id, *TEXT_FIELDS, notes) rows for the given records"""
+    notes = {}
+    for emr_record_id, note in ClinicalNote.objects.filter(emr_record_id__in=record_ids).order_by(
+        'created_at', 'id'
+    ).values_list('emr_record_id', 'note'):
+        notes.setdefault(emr_record_id, []).append(note)
+    return [
+        (*row, '\n'.join(notes.get(row[0], [])))
+        for row in EMRRecord.objects.filter(id__in=record_ids).order_by().values_list(
+            'id', 'patient_id', 'hospital_id', 'doctor_id', *TEXT_FIELDS
+        )
+    ]
+
+
+def index_records(record_ids):
+    """Rewrite the search documents of these records, dropping those of records that no longer exist"""
+    record_ids = list(record_ids)
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    for offset in range(0, len(record_ids), CHUNK_SIZE):
+        chunk = record_ids[offset:offset + CHUNK_SIZE]
+        documents = _documents(chunk)
+        placeholders = ', '.join(['%s'] * len(chunk))
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'DELETE FROM emr_search WHERE rowid IN ({placeholders})', chunk)
+                cursor.executemany(
+                    'INSERT INTO emr_search (rowid, patient_id, hospital_id, doctor_id, chief_complaint, diagnosis, '
+                    'treatment_plan, clinical_notes, notes) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
+                    documents,
+                )
+            else:
+                cursor.execute(f'DELETE FROM emr_search_documents WHERE record_id IN ({placeholders})', chunk)
+                cursor.executemany(
+                    'INSERT INTO emr_search_documents (record_id, patient_id, hospital_id, doctor_id, body, document) '
+                    f'VALUES (%s, %s, %s, %s, %s, {POSTGRES_DOCUMENT})',
+                    [(*document[:4], '\n'.join(document[4:]), *document[4:]) for document in documents],
+                )
+
+
+def remove_records(record_ids):
+    """Drop the search documents of deleted records"""
+    record_ids = list(record_ids)
+    if not record_ids or connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    placeholders = ', '.join(['%s'] * len(record_ids))
+    table, key = ('emr_search', 'rowid') if connection.vendor == 'sqlite' else ('emr_search_documents', 'record_id')
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {key} IN ({placeholders})', record_ids)
+
+
+def _scope_sql(column_prefix, patient_id, hospital_ids, doctor_id):
+    clauses = []
+    params = []
+    if patient_id is not None:
+        clauses.append(f'{column_prefix}patient_id = %s')
+        params.append(patient_id)
+    if hospital_ids is not None:
+        clauses.append(f"{column_prefix}hospital_id IN ({', '.join(['%s'] * len(hospital_ids))})")
+        params.extend(hospital_ids)
+    if doctor_id is not None:
+        clauses.append(f'{column_prefix}doctor_id = %s')
+        params.append(doctor_id)
+    return ''.join(f' AND {clause}' for clause in clauses), params
+
+
+def _search_sqlite(terms, scope, limit):
+    scope_sql, scope_params = scope
+    weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+    match = ' '.join(f'"{term}"*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, -bm25(emr_search, {weights}) AS score, "
+            f"snippet(emr_search, -1, %s, %s, '...', 12) FROM emr_search "
+            f"WHERE emr_search MATCH %s{scope_sql} ORDER BY bm25(emr_search, {weights}) LIMIT %s",
+            [SNIPPET_START, SNIPPET_END, match, *scope_params, limit],
+        )
+        return cursor.fetchall()
+
+
+def _search_postgres(terms, scope, limit):
+    scope_sql, scope_params = scope
+    query = ' & '.join(f'{term}:*' for term in terms)
+    options = f'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=20, MinWords=8'
+    with connection.cursor() as cursor:
+        # Headlines are built for the page only, after ranking and LIMIT
+        cursor.execute(
+            "SELECT hits.record_id, hits.score, ts_headline('english', hits.body, hits.query, %s) FROM ("
+            "SELECT record_id, body, query, ts_rank(document, query) AS score "
+            "FROM emr_search_documents, to_tsquery('english', %s) AS query "
+            f"WHERE document @@ query{scope_sql} ORDER BY score DESC LIMIT %s"
+            ") AS hits ORDER BY hits.score DESC",
+            [options, query, *scope_params, limit],
+        )
+        return cursor.fetchall()
+
+
+def _search_fallback(terms, patient_id, hospital_ids, doctor_id, limit):
+    records = EMRRecord.objects.all()
+    for term in terms:
+        matches = Q(doctor_notes__note__icontains=term)
+        for field in TEXT_FIELDS:
+            matches |= Q(**{f'{field}__icontains': term})
+        records = records.filter(matches)
+    if patient_id is not None:
+        records = records.filter(patient_id=patient_id)
+    if hospital_ids is not None:
+        records = records.filter(hospital_id__in=hospital_ids)
+    if doctor_id is not None:
+        records = records.filter(doctor_id=doctor_id)
+    return [(record_id, 0.0, None) for record_id in records.distinct().order_by('-visit_date').values_list(
+        'id', flat=True
+    )[:limit]]
+
+
+def search_records(query, patient_id=None, hospital_ids=None, doctor_id=None, limit=20):
+    """
+    Best-matching EMR records for ``query`` as [(record_id, score, snippet)],
+    best first. Every word must match (as a prefix); the optional filters
+    scope the search to a patient, a set of hospitals or a doctor.
+    """
+    terms = search_terms(query)
+    if not terms or hospital_ids == []:
+        return []
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(terms, _scope_sql('', patient_id, hospital_ids, doctor_id), limit)
+    if connection.vendor == 'postgresql':
+        return _search_postgres(terms, _scope_sql('', patient_id, hospital_ids, doctor_id), limit)
+    return _search_fallback(terms, patient_id, hospital_ids, doctor_id, limit)
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .early_warning import observations_from, update_scores
+from .models import ClinicalNote, EMRRecord, VitalsRecord
+from .search import index_records, remove_records
+from .vitals_store import append_readings, readings_from
+
+
+@receiver(post_save, sender=EMRRecord)
+def store_emr_vitals(sender, instance, created, **kwargs):
+    """Vitals taken at the visit go into the columnar store once; the store is append-only"""
+    if created:
+        append_readings(readings_from(instance.patient_id, instance, instance.visit_date))
+        update_scores([observations_from(instance.patient_id, instance.hospital_id, instance.id, instance,
+                                         instance.visit_date)])
+
+
+@receiver(post_save, sender=VitalsRecord)
+def store_recorded_vitals(sender, instance, created, **kwargs):
+    if created:
+        patient_id, hospital_id = EMRRecord.objects.filter(id=instance.emr_record_id).values_list(
+            'patient_id', 'hospital_id'
+        ).first()
+        append_readings(readings_from(patient_id, instance, instance.recorded_at))
+        update_scores([observations_from(patient_id, hospital_id, instance.emr_record_id, instance,
+                                         instance.recorded_at)])
+
+
+@receiver(post_save, sender=EMRRecord)
+def index_emr_record(sender, instance, **kwargs):
+    index_records([instance.id])
+
+
+@receiver(post_delete, sender=EMRRecord)
+def unindex_emr_record(sender, instance, **kwargs):
+    remove_records([instance.id])
+
+
+@receiver([post_save, post_delete], sender=ClinicalNote)
+def index_clinical_note(sender, instance, **kwargs):
+    """Notes are part of their record's search document"""
+    index_records([instance.emr_record_id])
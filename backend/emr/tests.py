@@ -0,0 +1,104 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from hospitals.models import Hospital, StaffMembership
+from users.models import User
+from .early_warning import PARAMETERS, risk_levels, score_matrix
+from .vitals_store import downsample
+
+# (parameter, value, NEWS2 score) on both sides of every band edge
+BAND_EDGES = [
+    ('respiratory_rate', 8, 3), ('respiratory_rate', 9, 1),
+    ('respiratory_rate', 11, 1), ('respiratory_rate', 12, 0),
+    ('respiratory_rate', 20, 0), ('respiratory_rate', 21, 2),
+    ('respiratory_rate', 24, 2), ('respiratory_rate', 25, 3),
+    ('oxygen_saturation', 91, 3), ('oxygen_saturation', 92, 2),
+    ('oxygen_saturation', 93, 2), ('oxygen_saturation', 94, 1),
+    ('oxygen_saturation', 95, 1), ('oxygen_saturation', 96, 0),
+    ('blood_pressure_systolic', 90, 3), ('blood_pressure_systolic', 91, 2),
+    ('blood_pressure_systolic', 100, 2), ('blood_pressure_systolic', 101, 1),
+    ('blood_pressure_systolic', 110, 1), ('blood_pressure_systolic', 111, 0),
+    ('blood_pressure_systolic', 219, 0), ('blood_pressure_systolic', 220, 3),
+    ('heart_rate', 40, 3), ('heart_rate', 41, 1),
+    ('heart_rate', 50, 1), ('heart_rate', 51, 0),
+    ('heart_rate', 90, 0), ('heart_rate', 91, 1),
+    ('heart_rate', 110, 1), ('heart_rate', 111, 2),
+    ('heart_rate', 130, 2), ('heart_rate', 131, 3),
+    ('temperature', 35.0, 3), ('temperature', 35.1, 1),
+    ('temperature', 36.0, 1), ('temperature', 36.1, 0),
+    ('temperature', 38.0, 0), ('temperature', 38.1, 1),
+    ('temperature', 39.0, 1), ('temperature', 39.1, 2),
+    # Fahrenheit readings are converted first: 95.0F = 35.0C, 102.38F = 39.1C
+    ('temperature', 95.0, 3), ('temperature', 102.38, 2),
+]
+
+
+def row(**values):
+    return [values.get(parameter, np.nan) for parameter in PARAMETERS]
+
+
+class EarlyWarningScoreTests(SimpleTestCase):
+    """NEWS2 scoring"""
+
+    def test_band_edges(self):
+        components, _ = score_matrix([row(**{parameter: value}) for parameter, value, _ in BAND_EDGES])
+        for i, (parameter, value, expected) in enumerate(BAND_EDGES):
+            with self.subTest(parameter=parameter, value=value):
+                self.assertEqual(components[i, PARAMETERS.index(parameter)], expected)
+
+    def test_missing_parameters_score_zero(self):
+        components, totals = score_matrix([row()])
+        self.assertEqual(components.tolist(), [[0] * len(PARAMETERS)])
+        self.assertEqual(totals.tolist(), [0])
+
+    def test_risk_levels(self):
+        components, totals = score_matrix([
+            row(respiratory_rate=16, oxygen_saturation=98, blood_pressure_systolic=120, heart_rate=70,
+                temperature=37.0),
+            row(heart_rate=135),
+            row(respiratory_rate=22, heart_rate=115, oxygen_saturation=95),
+            row(respiratory_rate=26, heart_rate=135, oxygen_saturation=91),
+        ])
+        self.assertEqual(totals.tolist(), [0, 3, 5, 9])
+        risks, red = risk_levels(components, totals)
+        self.assertEqual(risks.tolist(), ['LOW', 'LOW_MEDIUM', 'MEDIUM', 'HIGH'])
+        self.assertEqual(red.tolist(), [False, True, False, True])
+
+
+class DownsampleTests(SimpleTestCase):
+    """Vitals trend windows"""
+
+    def test_reading_at_the_end_stays_in_the_last_window(self):
+        width, columns = downsample(np.array([0, 50, 100]), np.array([1, 2, 3]), 0, 100, 2)
+        self.assertEqual(width, 50)
+        self.assertEqual(columns['t'], [0, 50])
+        self.assertEqual(columns['count'], [1, 2])
+        self.assertEqual(columns['max'], [1.0, 3.0])
+
+
+class EarlyWarningAccessTests(TestCase):
+    """Early-warning lists are limited to staff of the hospital"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.hospital = Hospital.objects.create(
+            name='Hospital A', address='1 Main Road', city='Pune', state='Maharashtra', pincode='411001',
+            phone='0000000000', email='info@hospital.test', license_number='A', is_approved=True
+        )
+        self.nurse = User.objects.create_user(email='nurse@a.test', password='password', first_name='Test',
+                                              last_name='Nurse', role='NURSE')
+
+    def get(self, hospital_id):
+        self.client.force_authenticate(self.nurse)
+        return self.client.get(f'/api/emr/hospitals/{hospital_id}/early-warnings/')
+
+    def test_nurse_of_the_hospital_can_view(self):
+        StaffMembership.objects.create(user=self.nurse, hospital=self.hospital)
+        response = self.get(self.hospital.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+    def test_nurse_without_membership_is_refused(self):
+        self.assertEqual(self.get(self.hospital.id).status_code, 403)
+        StaffMembership.objects.create(user=self.nurse, hospital=self.hospital, is_active=False)
+        self.assertEqual(self.get(self.hospital.id).status_code, 403)
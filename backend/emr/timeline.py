@@ -0,0 +1,133 @@
+"""
+Patient timeline.
+
+A patient's EMR visits, prescriptions, lab reports and payments as one
+newest-first stream of lightweight events. Each table contributes a
+``values()`` queryset of just ``(at, kind, id)`` over its patient/date
+index; ``KeysetPagination.paginate_merged`` k-way merges them and reads at
+most one page from each, so a chart costs the same however long the
+history is. Details are then loaded for the page's rows only, with one
+query per event type present on the page.
+"""
+from django.db.models import Count, F, IntegerField, Value
+from healthcare_platform.pagination import KeysetPagination
+from labs.models import LabReport
+from payments.models import Payment
+from prescriptions.models import Prescription
+from .models import EMRRecord
+
+TIMELINE_ORDERING = ('-at', '-kind', '-id')
+
+
+def _emr_details(ids):
+    rows = EMRRecord.objects.filter(id__in=ids).values(
+        'id', 'visit_type', 'diagnosis', 'hospital_id', 'hospital__name',
+        'doctor__user__first_name', 'doctor__user__last_name',
+    )
+    return {
+        row['id']: {
+            'title': f"{row['visit_type']} visit",
+            'summary': row['diagnosis'],
+            'hospital': row['hospital__name'],
+            'doctor': _name(row['doctor__user__first_name'], row['doctor__user__last_name']),
+        }
+        for row in rows
+    }
+
+
+def _prescription_details(ids):
+    rows = Prescription.objects.filter(id__in=ids).annotate(medicine_count=Count('medicines')).values(
+        'id', 'diagnosis', 'medicine_count', 'doctor__hospital__name',
+        'doctor__user__first_name', 'doctor__user__last_name',
+    )
+    return {
+        row['id']: {
+            'title': 'Prescription',
+            'summary': row['diagnosis'],
+            'hospital': row['doctor__hospital__name'],
+            'doctor': _name(row['doctor__user__first_name'], row['doctor__user__last_name']),
+            'medicine_count': row['medicine_count'],
+        }
+        for row in rows
+    }
+
+
+def _lab_report_details(ids):
+    rows = LabReport.objects.filter(id__in=ids).values(
+        'id', 'report_date', 'lab_test_request__lab_test_recommendation__test_name', 'lab_test_request__lab__name',
+    )
+    return {
+        row['id']: {
+            'title': f"Lab report: {row['lab_test_request__lab_test_recommendation__test_name']}",
+            'summary': f"Reported on {row['report_date']:%d %b %Y}",
+            'lab': row['lab_test_request__lab__name'],
+        }
+        for row in rows
+    }
+
+
+def _payment_details(ids):
+    payments = Payment.objects.filter(id__in=ids).values(
+        'id', 'payment_type', 'amount', 'status', 'hospital__name',
+    )
+    types = dict(Payment.PAYMENT_TYPE_CHOICES)
+    return {
+        row['id']: {
+            'title': types.get(row['payment_type'], row['payment_type']),
+            'summary': f"{row['amount']} ({row['status'].lower()})",
+            'hospital': row['hospital__name'],
+            'amount': row['amount'],
+            'status': row['status'],
+        }
+        for row in payments
+    }
+
+
+def _name(first_name, last_name):
+    return f'{first_name} {last_name}' if first_name is not None else None
+
+
+# (type, base queryset for a patient, time field, detail loader); the
+# position is the ``kind`` tiebreaker between events at the same instant
+SOURCES = [
+    ('emr', lambda patient: EMRRecord.objects.filter(patient=patient), 'visit_date', _emr_details),
+    ('prescription', lambda patient: Prescription.objects.filter(patient=patient), 'created_at',
+     _prescription_details),
+    ('lab_report', lambda patient: LabReport.objects.filter(
+        lab_test_request__lab_test_recommendation__prescription__patient=patient
+    ), 'uploaded_at', _lab_report_details),
+    ('payment', lambda patient: Payment.objects.filter(user_id=patient.user_id), 'created_at', _payment_details),
+]
+
+
+def timeline_streams(patient, types=None):
+    """The per-table ``(at, kind, id)`` querysets for a patient, optionally limited to some event types"""
+    return [
+        queryset(patient).annotate(
+            at=F(time_field), kind=Value(kind, output_field=IntegerField())
+        ).values('at', 'kind', 'id')
+        for kind, (name, queryset, time_field, _) in enumerate(SOURCES)
+        if not types or name in types
+    ]
+
+
+def load_events(rows):
+    """Turn a page of ``(at, kind, id)`` rows into events, loading details for those rows only"""
+    ids_by_kind = {}
+    for row in rows:
+        ids_by_kind.setdefault(row['kind'], []).append(row['id'])
+    details = {kind: SOURCES[kind][3](ids) for kind, ids in ids_by_kind.items()}
+
+    events = []
+    for row in rows:
+        event = {'type': SOURCES[row['kind']][0], 'id': row['id'], 'at': row['at']}
+        event.update(details[row['kind']].get(row['id'], {}))
+        events.append(event)
+    return events
+
+
+def timeline_page(patient, request, types=None):
+    """One keyset page of a patient's timeline as a paginated Response"""
+    paginator = KeysetPagination(TIMELINE_ORDERING)
+    rows = paginator.paginate_merged(timeline_streams(patient, types), request)
+    return paginator.get_paginated_response(load_events(rows))
@@ -1,13 +1,19 @@
 from django.urls import path
 from .views import (
     EMRRecordListCreateAPIView, EMRRecordDetailAPIView,
-    PatientEMRListAPIView, VitalsRecordListCreateAPIView
+    PatientEMRListAPIView, VitalsRecordListCreateAPIView, patient_timeline, patient_vitals_trend,
+    ingest_vitals_batch, hospital_early_warnings, search_emr
 )
 
 urlpatterns = [
     path('', EMRRecordListCreateAPIView.as_view(), name='emr_list_create'),
     path('<int:pk>/', EMRRecordDetailAPIView.as_view(), name='emr_detail'),
+    path('search/', search_emr, name='emr_search'),
     path('patient/<int:patient_id>/', PatientEMRListAPIView.as_view(), name='patient_emr_list'),
+    path('patient/<int:patient_id>/timeline/', patient_timeline, name='patient_timeline'),
+    path('patient/<int:patient_id>/vitals/trend/', patient_vitals_trend, name='patient_vitals_trend'),
     path('vitals/', VitalsRecordListCreateAPIView.as_view(), name='vitals_list_create'),
+    path('vitals/batch/', ingest_vitals_batch, name='vitals_batch'),
+    path('hospitals/<int:hospital_id>/early-warnings/', hospital_early_warnings, name='hospital_early_warnings'),
 ]
 
@@ -1,12 +1,22 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from datetime import timedelta
+from django.db.models import Exists, OuterRef, Q, Subquery
 from django.utils import timezone
-from .models import EMRRecord, ClinicalNote, VitalsRecord
+from django.utils.dateparse import parse_datetime
+from .models import EMRRecord, ClinicalNote, VitalsRecord, EarlyWarningScore
 from .serializers import EMRRecordSerializer, ClinicalNoteSerializer, VitalsRecordSerializer
 from users.permissions import IsDoctor, IsPatient
-from hospitals.permissions import IsOperationsManager
+from hospitals.permissions import IsOperationsManager, IsHospitalStaff, staff_hospital_ids
 from users.models import AuditLog
+from healthcare_platform.parsers import NDJSONParser
+from .early_warning import DEFAULT_THRESHOLD, PARAMETERS
+from .ingest import MAX_BATCH_RECORDS, ingest_vitals
+from .search import search_records, search_terms
+from .timeline import SOURCES, timeline_page
+from .vitals_store import MEASURES, downsample, load_series
 
 
 class EMRRecordListCreateAPIView(generics.ListCreateAPIView):
@@ -131,3 +141,302 @@ class VitalsRecordListCreateAPIView(generics.ListCreateAPIView):
             raise permissions.PermissionDenied("Only nurses or medical assistants can record vitals")
         
         serializer.save(recorded_by=self.request.user)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([JSONParser, NDJSONParser])
+def ingest_vitals_batch(request):
+    """
+    Bulk vitals from bedside monitors, as a JSON array or NDJSON (one record
+    per line). Records carry ``emr_record``, the readings and optionally the
+    device's ``recorded_at``; invalid records are reported by position and
+    the rest are stored.
+    """
+    if request.user.role not in ['NURSE', 'MEDICAL_ASSISTANT']:
+        return Response({'error': 'Only nurses or medical assistants can record vitals'},
+                        status=status.HTTP_403_FORBIDDEN)
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'Body must be a non-empty JSON array or NDJSON'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BATCH_RECORDS:
+        return Response({'error': f'At most {MAX_BATCH_RECORDS} records per request'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    created, errors = ingest_vitals(items, request.user)
+    return Response({'created': created, 'errors': errors},
+                    status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
+CHART_ROLES = ['SUPER_ADMIN', 'PATIENT', 'DOCTOR', 'NURSE', 'MEDICAL_ASSISTANT', 'HOSPITAL_ADMIN',
+               'HOSPITAL_DIRECTOR', 'OPERATIONS_MANAGER']
+
+
+def can_view_chart(user, patient):
+    """Patients see their own chart; hospital staff see patients with appointments at their hospitals"""
+    from appointments.models import Appointment
+    
+    if user.role not in CHART_ROLES:
+        return False
+    if user.role == 'PATIENT':
+        return patient.user_id == user.id
+    if user.role == 'SUPER_ADMIN':
+        return True
+    hospital_ids = staff_hospital_ids(user)
+    if hospital_ids is None:
+        # Roles that cannot be scoped to a hospital
+        return False
+    return Appointment.objects.filter(patient=patient, hospital_id__in=hospital_ids).exists()
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def patient_timeline(request, patient_id):
+    """
+    A patient's EMR visits, prescriptions, lab reports and payments as one
+    newest-first stream, keyset-paginated with ``cursor`` and ``page_size``.
+    ``?types=emr,prescription`` limits the event types.
+    """
+    from appointments.models import Patient
+    
+    try:
+        patient = Patient.objects.get(id=patient_id)
+    except Patient.DoesNotExist:
+        return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not can_view_chart(request.user, patient):
+        return Response({'error': "You cannot view this patient's timeline"}, status=status.HTTP_403_FORBIDDEN)
+    
+    types = [name for name in request.query_params.get('types', '').split(',') if name]
+    unknown = set(types) - {source[0] for source in SOURCES}
+    if unknown:
+        return Response({'error': f"Unknown event types: {', '.join(sorted(unknown))}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    AuditLog.objects.create(
+        user=request.user,
+        action='EMR_ACCESSED',
+        resource_type='Patient',
+        resource_id=patient_id,
+        ip_address=request.META.get('REMOTE_ADDR')
+    )
+    return timeline_page(patient, request, types)
+
+
+DEFAULT_TREND_BUCKETS = 200
+MAX_TREND_BUCKETS = 2000
+
+
+def _parse_bound(value):
+    """Aware datetime from an ISO query parameter, None when absent; raises ValueError when invalid"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def patient_vitals_trend(request, patient_id):
+    """
+    Downsampled vitals trend: min/max/mean per fixed window for each of
+    ``?measures=`` (comma separated) between ``start`` and ``end``, in at
+    most ``buckets`` windows. Times are epoch seconds.
+    """
+    from appointments.models import Patient
+    
+    try:
+        patient = Patient.objects.get(id=patient_id)
+    except Patient.DoesNotExist:
+        return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not can_view_chart(request.user, patient):
+        return Response({'error': "You cannot view this patient's vitals"}, status=status.HTTP_403_FORBIDDEN)
+    
+    measures = [name for name in request.query_params.get('measures', '').split(',') if name]
+    unknown = set(measures) - set(MEASURES)
+    if not measures or unknown:
+        return Response({'error': f"measures must be a comma separated list of: {', '.join(MEASURES)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        buckets = int(request.query_params.get('buckets', DEFAULT_TREND_BUCKETS))
+    except (TypeError, ValueError):
+        return Response({'error': 'buckets must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    buckets = max(1, min(buckets, MAX_TREND_BUCKETS))
+    try:
+        start = _parse_bound(request.query_params.get('start'))
+        end = _parse_bound(request.query_params.get('end')) or timezone.now()
+        if start and start >= end:
+            raise ValueError
+    except ValueError:
+        return Response({'error': 'start and end must be ISO datetimes with start before end'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    series = {measure: load_series(patient.id, measure, start, end) for measure in measures}
+    if start is None:
+        # Default to the first reading, so the whole history fits the buckets
+        firsts = [int(times[0]) for times, _ in series.values() if len(times)]
+        start_ts = min(firsts) if firsts else int(end.timestamp()) - 1
+    else:
+        start_ts = int(start.timestamp())
+    end_ts = max(int(end.timestamp()), start_ts + 1)
+    
+    response = {'patient': patient.id, 'start': start_ts, 'end': end_ts, 'series': {}}
+    for measure, (times, values) in series.items():
+        width, columns = downsample(times, values, start_ts, end_ts, buckets)
+        response['bucket_seconds'] = width
+        response['series'][measure] = columns
+    
+    AuditLog.objects.create(
+        user=request.user,
+        action='EMR_ACCESSED',
+        resource_type='Patient',
+        resource_id=patient_id,
+        ip_address=request.META.get('REMOTE_ADDR')
+    )
+    return Response(response)
+
+
+MAX_EARLY_WARNING_AGE_HOURS = 168
+MAX_EARLY_WARNINGS = 500
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsHospitalStaff])
+def hospital_early_warnings(request, hospital_id):
+    """
+    Patients at a hospital whose latest NEWS2 score is at or above
+    ``threshold`` (default 5) or who have a single red parameter, highest
+    first. ``ward`` limits to patients in a bed on that ward and
+    ``max_age_hours`` (default 24) ignores stale observations.
+    """
+    from hospitals.models import BedOccupancy
+    
+    hospital_ids = staff_hospital_ids(request.user)
+    if hospital_ids is None or hospital_id not in hospital_ids:
+        return Response({'error': 'Can only view early warnings for your hospital'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        threshold = int(request.query_params.get('threshold', DEFAULT_THRESHOLD))
+        max_age = int(request.query_params.get('max_age_hours', 24))
+    except (TypeError, ValueError):
+        return Response({'error': 'threshold and max_age_hours must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    max_age = max(1, min(max_age, MAX_EARLY_WARNING_AGE_HOURS))
+    
+    occupancy = BedOccupancy.objects.filter(
+        patient=OuterRef('patient'), discharged_at__isnull=True, bed__hospital_id=hospital_id
+    )
+    scores = EarlyWarningScore.objects.filter(
+        Q(score__gte=threshold) | Q(red_flag=True),
+        hospital_id=hospital_id,
+        observed_at__gte=timezone.now() - timedelta(hours=max_age),
+    )
+    ward = request.query_params.get('ward')
+    if ward:
+        scores = scores.filter(Exists(occupancy.filter(bed__ward=ward)))
+    rows = scores.annotate(
+        ward=Subquery(occupancy.values('bed__ward')[:1]),
+        bed_number=Subquery(occupancy.values('bed__bed_number')[:1]),
+    ).order_by('-score', '-observed_at').values(
+        'patient_id', 'patient__user__first_name', 'patient__user__last_name', 'emr_record_id', 'score', 'risk',
+        'red_flag', 'components', 'is_complete', 'observed_at', 'ward', 'bed_number', *PARAMETERS
+    )[:MAX_EARLY_WARNINGS]
+    
+    results = []
+    for row in rows:
+        first_name = row.pop('patient__user__first_name')
+        row['patient_name'] = f"{first_name} {row.pop('patient__user__last_name')}"
+        results.append(row)
+    return Response(results)
+
+
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 50
+
+
+def _search_scope(user):
+    """Filters limiting a search without ``patient`` to what the user may read, or an error Response"""
+    if user.role == 'SUPER_ADMIN':
+        return {}
+    if user.role == 'PATIENT':
+        patient = getattr(user, 'patient_profile', None)
+        return {'patient_id': patient.id if patient else 0}
+    if user.role == 'DOCTOR':
+        doctor = getattr(user, 'doctor_profile', None)
+        return {'doctor_id': doctor.id if doctor else 0}
+    if user.role in ['HOSPITAL_ADMIN', 'OPERATIONS_MANAGER', 'HOSPITAL_DIRECTOR', 'NURSE', 'MEDICAL_ASSISTANT']:
+        return {'hospital_ids': staff_hospital_ids(user)}
+    return Response({'error': 'You cannot search medical records'}, status=status.HTTP_403_FORBIDDEN)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def search_emr(request):
+    """
+    Ranked full-text search over EMR clinical text and notes. With
+    ``?patient=`` it covers that patient's lifetime records (for users who
+    may view the chart); otherwise it is limited to the user's own records,
+    patients or hospitals.
+    """
+    from appointments.models import Patient
+    
+    query = request.query_params.get('q', '').strip()
+    if not search_terms(query):
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_SEARCH_RESULTS))
+    except (TypeError, ValueError):
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+    
+    patient_id = request.query_params.get('patient')
+    if patient_id:
+        try:
+            patient = Patient.objects.get(id=patient_id)
+        except (Patient.DoesNotExist, ValueError):
+            return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not can_view_chart(request.user, patient):
+            return Response({'error': "You cannot view this patient's records"}, status=status.HTTP_403_FORBIDDEN)
+        scope = {'patient_id': patient.id}
+    else:
+        scope = _search_scope(request.user)
+        if isinstance(scope, Response):
+            return scope
+    
+    hits = search_records(query, limit=limit, **scope)
+    records = {
+        row['id']: row
+        for row in EMRRecord.objects.filter(id__in=[hit[0] for hit in hits]).values(
+            'id', 'patient_id', 'patient__user__first_name', 'patient__user__last_name', 'hospital_id',
+            'hospital__name', 'doctor__user__first_name', 'doctor__user__last_name', 'visit_date', 'visit_type',
+            'diagnosis'
+        )
+    }
+    results = []
+    for record_id, score, snippet in hits:
+        row = records.get(record_id)
+        if row is None:
+            continue
+        results.append({
+            'id': record_id,
+            'patient_id': row['patient_id'],
+            'patient_name': f"{row['patient__user__first_name']} {row['patient__user__last_name']}",
+            'hospital_id': row['hospital_id'],
+            'hospital_name': row['hospital__name'],
+            'doctor_name': (f"{row['doctor__user__first_name']} {row['doctor__user__last_name']}"
+                            if row['doctor__user__first_name'] is not None else None),
+            'visit_date': row['visit_date'],
+            'visit_type': row['visit_type'],
+            'diagnosis': row['diagnosis'],
+            'score': round(float(score), 4),
+            'snippet': snippet,
+        })
+    
+    AuditLog.objects.create(
+        user=request.user,
+        action='EMR_SEARCHED',
+        resource_type='Patient' if patient_id else 'User',
+        resource_id=scope['patient_id'] if patient_id else request.user.id,
+        ip_address=request.META.get('REMOTE_ADDR'),
+        details={'query': query, 'record_ids': [result['id'] for result in results]}
+    )
+    return Response(results)
@@ -0,0 +1,148 @@
+"""
+Columnar vitals store.
+
+Each patient's readings of one measure live in append-only VitalsSegment
+rows of up to ``SEGMENT_SIZE`` points, held as packed int64 epoch seconds
+and float32 values. New readings fill the measure's open (not yet full)
+segment and spill into new ones, so a batch costs one query to load the
+open segments, one ``bulk_update`` and one ``bulk_create`` however many
+patients and measures it touches.
+
+A trend reads the segments overlapping the requested range through the
+``(patient, measure, ends_at)`` index, concatenates them with NumPy and
+reduces fixed-width windows to min/max/mean with ``ufunc.reduceat``, so
+years of readings come back as a few hundred buckets.
+
+Readings come from VitalsRecord rows and the vitals columns of new
+EMRRecord rows (see ``emr.signals``); ``rebuild_vitals_segments``
+rebuilds the store from those tables.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+import numpy as np
+from django.db import transaction
+from .models import VitalsSegment
+
+SEGMENT_SIZE = 4096
+MEASURES = [measure for measure, _ in VitalsSegment.MEASURE_CHOICES]
+TIME_DTYPE = np.dtype('<i8')
+VALUE_DTYPE = np.dtype('<f4')
+
+
+def readings_from(patient_id, record, at):
+    """(patient_id, measure, at, value) for each vitals column filled on an EMRRecord or VitalsRecord"""
+    return [
+        (patient_id, measure, at, float(getattr(record, measure)))
+        for measure in MEASURES
+        if getattr(record, measure) is not None
+    ]
+
+
+def _decode(segment):
+    return (np.frombuffer(bytes(segment.times), dtype=TIME_DTYPE),
+            np.frombuffer(bytes(segment.values), dtype=VALUE_DTYPE))
+
+
+def _fill(segment, times, values):
+    """Store sorted arrays on a segment and refresh its bounds"""
+    order = np.argsort(times, kind='stable')
+    times = times[order].astype(TIME_DTYPE)
+    values = values[order].astype(VALUE_DTYPE)
+    segment.times = times.tobytes()
+    segment.values = values.tobytes()
+    segment.count = len(times)
+    segment.starts_at = datetime.fromtimestamp(int(times[0]), tz=dt_timezone.utc)
+    segment.ends_at = datetime.fromtimestamp(int(times[-1]), tz=dt_timezone.utc)
+    return segment
+
+
+def append_readings(readings):
+    """
+    Append (patient_id, measure, at, value) readings to the store; readings
+    with a None value are skipped. Returns the number of readings stored.
+    """
+    grouped = defaultdict(lambda: ([], []))
+    for patient_id, measure, at, value in readings:
+        if value is None:
+            continue
+        times, values = grouped[(patient_id, measure)]
+        times.append(int(at.timestamp()))
+        values.append(value)
+    if not grouped:
+        return 0
+
+    with transaction.atomic():
+        open_segments = {}
+        for segment in VitalsSegment.objects.select_for_update().filter(
+            patient_id__in={patient_id for patient_id, _ in grouped},
+            measure__in={measure for _, measure in grouped},
+            count__lt=SEGMENT_SIZE,
+        ).order_by('id'):
+            open_segments[(segment.patient_id, segment.measure)] = segment
+
+        updated = []
+        created = []
+        for (patient_id, measure), (times, values) in grouped.items():
+            times = np.array(times, dtype=TIME_DTYPE)
+            values = np.array(values, dtype=VALUE_DTYPE)
+            segment = open_segments.get((patient_id, measure))
+            if segment is not None:
+                room = SEGMENT_SIZE - segment.count
+                stored_times, stored_values = _decode(segment)
+                updated.append(_fill(segment, np.concatenate([stored_times, times[:room]]),
+                                     np.concatenate([stored_values, values[:room]])))
+                times, values = times[room:], values[room:]
+            for offset in range(0, len(times), SEGMENT_SIZE):
+                created.append(_fill(VitalsSegment(patient_id=patient_id, measure=measure),
+                                     times[offset:offset + SEGMENT_SIZE], values[offset:offset + SEGMENT_SIZE]))
+
+        if updated:
+            VitalsSegment.objects.bulk_update(updated, ['times', 'values', 'count', 'starts_at', 'ends_at'])
+        VitalsSegment.objects.bulk_create(created, batch_size=500)
+    return sum(len(times) for times, _ in grouped.values())
+
+
+def load_series(patient_id, measure, start=None, end=None):
+    """(times, values) arrays of a patient's readings of one measure, sorted by time"""
+    segments = VitalsSegment.objects.filter(patient_id=patient_id, measure=measure)
+    if start is not None:
+        segments = segments.filter(ends_at__gte=start)
+    if end is not None:
+        segments = segments.filter(starts_at__lte=end)
+    decoded = [_decode(segment) for segment in segments.only('times', 'values')]
+    if not decoded:
+        return np.empty(0, dtype=TIME_DTYPE), np.empty(0, dtype=VALUE_DTYPE)
+
+    times = np.concatenate([times for times, _ in decoded])
+    values = np.concatenate([values for _, values in decoded])
+    order = np.argsort(times, kind='stable')
+    times, values = times[order], values[order]
+    mask = np.ones(len(times), dtype=bool)
+    if start is not None:
+        mask &= times >= int(start.timestamp())
+    if end is not None:
+        mask &= times <= int(end.timestamp())
+    return times[mask], values[mask]
+
+
+def downsample(times, values, start, end, buckets):
+    """
+    Fixed-window min/max/mean of sorted readings between ``start`` and
+    ``end`` (epoch seconds) in at most ``buckets`` windows. Returns the
+    window width and a dict of columns; empty windows are omitted.
+    """
+    width = max(1, -(-(end - start) // buckets))
+    if len(times) == 0:
+        return width, {'t': [], 'min': [], 'max': [], 'mean': [], 'count': []}
+    # A reading exactly at ``end`` would open one window too many
+    window = np.minimum((times - start) // width, buckets - 1)
+    firsts = np.flatnonzero(np.r_[True, window[1:] != window[:-1]])
+    counts = np.diff(np.r_[firsts, len(times)])
+    values = values.astype(np.float64)
+    return width, {
+        't': (start + window[firsts] * width).tolist(),
+        'min': np.round(np.minimum.reduceat(values, firsts), 2).tolist(),
+        'max': np.round(np.maximum.reduceat(values, firsts), 2).tolist(),
+        'mean': np.round(np.add.reduceat(values, firsts) / counts, 2).tolist(),
+        'count': counts.tolist(),
+    }
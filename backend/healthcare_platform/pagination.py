@@ -0,0 +1,174 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a ``WHERE (a, b, id) > (last a, last b, last id)``
+style filter over an indexed ordering instead of ``OFFSET``, so page 500
+costs the same as page 1. The cursor is an opaque token holding the
+ordering values of the last row served. The total ``count`` is included by
+default for compatibility with the page-number responses and can be
+skipped with ``?count=false``, which makes every page constant-time.
+
+Ordering fields must be non-null and end with a unique field (normally
+``id``) so rows with equal timestamps are neither skipped nor repeated.
+"""
+import base64
+import heapq
+import json
+from datetime import date, datetime, time
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only cursor pagination; views can set ``keyset_ordering``"""
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE or 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, 'true').lower() not in ['false', '0', 'no']
+
+    def encode_cursor(self, row):
+        values = [self._value(row, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps(values, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _value(row, field):
+        value = row[field] if isinstance(row, dict) else getattr(row, field)
+        if isinstance(value, (date, datetime, time)):
+            return value.isoformat()
+        return value
+
+    def after(self, values):
+        """Rows strictly after the cursor in ``self.ordering``"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if view is not None and getattr(view, 'keyset_ordering', None):
+            self.ordering = tuple(view.keyset_ordering)
+        page_size = self.get_page_size(request)
+        self.count = queryset.count() if self.include_count(request) else None
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            try:
+                queryset = queryset.filter(self.after(cursor))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def paginate_merged(self, querysets, request):
+        """
+        One page of several querysets merged into a single ordered stream.
+
+        Every queryset must be a ``values()`` queryset with all ordering fields
+        (annotated where the models name them differently), and the ordering
+        must run in one direction. Each queryset reads at most one page plus
+        one row, and ``heapq.merge`` stops as soon as the page is full.
+        """
+        descending = {field.startswith('-') for field in self.ordering}
+        if len(descending) != 1:
+            raise ValueError('Merged pagination needs every ordering field in the same direction')
+        self.request = request
+        self.count = None
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        streams = []
+        for queryset in querysets:
+            queryset = queryset.order_by(*self.ordering)
+            if cursor is not None:
+                try:
+                    queryset = queryset.filter(self.after(cursor))
+                except (TypeError, ValueError, ValidationError):
+                    raise NotFound(self.invalid_cursor_message)
+            streams.append(queryset[:page_size + 1])
+
+        fields = [field.lstrip('-') for field in self.ordering]
+        merged = heapq.merge(*streams, key=lambda row: [row[field] for field in fields], reverse=descending.pop())
+        rows = list(islice(merged, page_size + 1))
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        body = {}
+        if self.count is not None:
+            body['count'] = self.count
+        body['next'] = self.get_next_link()
+        body['first'] = self.get_first_link()
+        body['results'] = data
+        return Response(body)
+
+
+def paginated_response(request, queryset, serialize, ordering):
+    """
+    Keyset-paginate a function view's list when the client asks for pages.
+
+    Requests without ``cursor`` or ``page_size`` keep the historical
+    unpaginated list so existing screens are unaffected.
+    """
+    params = request.query_params
+    if KeysetPagination.cursor_query_param not in params and KeysetPagination.page_size_query_param not in params:
+        return Response(serialize(queryset))
+    paginator = KeysetPagination(ordering)
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_response(serialize(page))
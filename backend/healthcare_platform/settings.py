@@ -100,6 +100,31 @@ DATABASES = {
 }
 
 
+# Cache
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache with
+# CACHE_LOCATION=redis://127.0.0.1:6379/1) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='healthcare-platform'),
+    }
+}
+
+# Seconds a cached public discovery response is kept
+DISCOVERY_CACHE_TIMEOUT = config('DISCOVERY_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a live hospital event (queue calls, capacity changes) stays replayable
+HOSPITAL_EVENT_TTL = config('HOSPITAL_EVENT_TTL', default=600, cast=int)
+
+
+# Length of a bookable OPD slot in minutes
+APPOINTMENT_SLOT_MINUTES = config('APPOINTMENT_SLOT_MINUTES', default=15, cast=int)
+
+# Hours ahead of an appointment that its reminder is created
+APPOINTMENT_REMINDER_HOURS = config('APPOINTMENT_REMINDER_HOURS', default=24, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Hospital, Doctor, DoctorApplication, OPDSchedule
+from .models import Hospital, Doctor, DoctorApplication, OPDSchedule, DoctorBlockedTime, OTBooking, StaffMembership
 
 
 @admin.register(Hospital)
@@ -18,6 +18,14 @@ class DoctorAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+@admin.register(StaffMembership)
+class StaffMembershipAdmin(admin.ModelAdmin):
+    list_display = ['user', 'hospital', 'is_active', 'created_at']
+    list_filter = ['is_active', 'hospital']
+    search_fields = ['user__email', 'user__first_name', 'user__last_name', 'hospital__name']
+    readonly_fields = ['created_at']
+
+
 @admin.register(DoctorApplication)
 class DoctorApplicationAdmin(admin.ModelAdmin):
     list_display = ['user', 'hospital', 'specialization', 'status', 'applied_at', 'reviewed_at']
@@ -32,3 +40,16 @@ class OPDScheduleAdmin(admin.ModelAdmin):
     list_filter = ['day', 'is_active', 'doctor__hospital']
     search_fields = ['doctor__user__email', 'doctor__user__first_name']
 
+
+@admin.register(DoctorBlockedTime)
+class DoctorBlockedTimeAdmin(admin.ModelAdmin):
+    list_display = ['doctor', 'starts_at', 'ends_at', 'reason']
+    list_filter = ['doctor__hospital']
+    search_fields = ['doctor__user__email', 'doctor__user__first_name']
+
+
+@admin.register(OTBooking)
+class OTBookingAdmin(admin.ModelAdmin):
+    list_display = ['theater', 'procedure', 'surgeon', 'starts_at', 'ends_at', 'status']
+    list_filter = ['status', 'theater__hospital']
+    search_fields = ['procedure', 'surgeon__user__email', 'theater__name']
@@ -0,0 +1,99 @@
+"""
+Bed allocation.
+
+Admitting a patient picks the best free bed of the requested type (the
+requested ward first, then bed number), locks it with ``select_for_update``
+(``skip_locked`` where supported, so concurrent admissions take different
+beds instead of queueing on the same one), flips it occupied with a
+conditional UPDATE and opens a BedOccupancy interval. Discharge closes the
+interval and frees the bed.
+
+Both paths move the hospital's HospitalBedStats counter with an ``F()``
+update instead of re-aggregating the beds table, so discovery and
+dashboards keep reading counters. Manual edits of Bed rows still go
+through the full recount in ``hospitals.signals``.
+"""
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .cache import bump_hospital_version
+from .models import Bed, BedOccupancy, HospitalBedStats
+from .routing import invalidate_snapshot
+from . import events
+
+
+class NoBedAvailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'No bed of this type is available.'
+    default_code = 'no_bed_available'
+
+
+def free_beds(hospital_id, bed_type, ward=None):
+    """Free beds of a type, best first: the requested ward, then bed number"""
+    beds = Bed.objects.filter(hospital_id=hospital_id, bed_type=bed_type, is_available=True, is_occupied=False)
+    if ward:
+        beds = beds.annotate(
+            ward_rank=Case(When(ward=ward, then=Value(0)), default=Value(1), output_field=IntegerField())
+        ).order_by('ward_rank', 'bed_number')
+    else:
+        beds = beds.order_by('bed_number')
+    return beds
+
+
+def _move_counter(hospital_id, bed_type, delta):
+    """Shift the available counter and publish the new value once committed"""
+    HospitalBedStats.objects.filter(hospital_id=hospital_id, bed_type=bed_type).update(
+        available=Least(Greatest(F('available') + delta, 0), F('total')), updated_at=timezone.now()
+    )
+    counts = HospitalBedStats.objects.filter(hospital_id=hospital_id, bed_type=bed_type).values(
+        'bed_type', 'total', 'available'
+    ).first()
+    if counts:
+        events.publish(hospital_id, 'beds', {'changes': [counts]})
+    transaction.on_commit(lambda: bump_hospital_version(hospital_id))
+    if bed_type == 'ICU':
+        invalidate_snapshot()
+
+
+def allocate_bed(hospital_id, bed_type, ward=None, patient=None, appointment=None, user=None, notes=''):
+    """Reserve the best free bed and open an occupancy, raising NoBedAvailable when none is free"""
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    # With skip_locked the first row is ours; otherwise try a few in case of a race
+    candidates = free_beds(hospital_id, bed_type, ward).select_for_update(skip_locked=skip_locked)
+    with transaction.atomic():
+        for bed in candidates[:1 if skip_locked else 5]:
+            # The flags may have changed between the read and the lock on backends without skip_locked
+            if Bed.objects.filter(id=bed.id, is_available=True, is_occupied=False).update(is_occupied=True):
+                break
+        else:
+            raise NoBedAvailable(f'No {bed_type} bed is available.')
+        bed.is_occupied = True
+        occupancy = BedOccupancy.objects.create(bed=bed, patient=patient, appointment=appointment,
+                                                admitted_by=user, notes=notes)
+        _move_counter(hospital_id, bed_type, -1)
+    return occupancy
+
+
+def discharge(occupancy_id, user=None, hospital_ids=None):
+    """Close an open occupancy and free its bed; returns the occupancy or None when not open"""
+    with transaction.atomic():
+        occupancies = BedOccupancy.objects.select_for_update().select_related('bed').filter(
+            id=occupancy_id, discharged_at__isnull=True
+        )
+        if hospital_ids is not None:
+            occupancies = occupancies.filter(bed__hospital_id__in=hospital_ids)
+        occupancy = occupancies.first()
+        if occupancy is None:
+            return None
+        occupancy.discharged_at = timezone.now()
+        occupancy.discharged_by = user
+        occupancy.save(update_fields=['discharged_at', 'discharged_by'])
+        bed = occupancy.bed
+        # Only count the bed as freed if this discharge is what freed it (not a manual edit beforehand)
+        freed = Bed.objects.filter(id=bed.id, is_occupied=True).update(is_occupied=False)
+        if freed == 1 and bed.is_available:
+            _move_counter(bed.hospital_id, bed.bed_type, 1)
+    return occupancy
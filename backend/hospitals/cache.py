@@ -0,0 +1,162 @@
+"""
+Response cache for the public discovery endpoints.
+
+Cached responses are keyed on the request path, the normalized query string
+and a version number. Every write to a Hospital, Doctor, Department, Bed or
+EmergencyCapacity bumps the version of that hospital and of the global
+discovery scope (see ``hospitals.signals``), so stale entries are never read
+again and simply expire. Concurrent misses for the same key are coalesced:
+one request computes the response while the others wait for it.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+GLOBAL_SCOPE = 'all'
+LOCK_TIMEOUT_SECONDS = 10
+WAIT_TIMEOUT_SECONDS = 5
+POLL_INTERVAL_SECONDS = 0.05
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def hospital_scope(hospital_id):
+    return f'hospital:{hospital_id}'
+
+
+def get_version(scope):
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(scope):
+    key = _version_key(scope)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Unknown key: start above the implicit initial version
+        cache.add(key, 2, timeout=None)
+        return cache.get(key, 2)
+
+
+def bump_hospital_version(hospital_id):
+    """Invalidate cached responses that may include this hospital"""
+    bump_version(hospital_scope(hospital_id))
+    bump_version(GLOBAL_SCOPE)
+
+
+def normalize_params(query_params):
+    """Sorted, blank-free query string so equivalent requests share a key"""
+    items = sorted(
+        (key.lower(), value.strip())
+        for key in query_params
+        for value in query_params.getlist(key)
+        if value.strip()
+    )
+    return urlencode(items)
+
+
+def response_key(request, hospital_param=None):
+    """
+    Cache key for a request, stamped with the version of its scope.
+
+    The scope is the hospital named by the ``hospital_param`` query parameter
+    when given; only views that really filter on that parameter may pass it,
+    as writes to other hospitals only bump the global scope and their own.
+    """
+    hospital_id = request.query_params.get(hospital_param) if hospital_param else None
+    scope = hospital_scope(hospital_id) if hospital_id and hospital_id.isdigit() else GLOBAL_SCOPE
+    params = normalize_params(request.query_params)
+    digest = hashlib.sha1(f'{request.get_host()}|{request.path}|{params}'.encode()).hexdigest()
+    return f'discovery:response:{scope}:{get_version(scope)}:{digest}'
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + WAIT_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        data = cache.get(key)
+        if data is not None:
+            return data
+        time.sleep(POLL_INTERVAL_SECONDS)
+    return None
+
+
+def _compute(key, build):
+    """Build the response, caching its data when it succeeded"""
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, settings.DISCOVERY_CACHE_TIMEOUT)
+    return response
+
+
+def cached_response(request, build, hospital_param=None):
+    """
+    Return a cached Response for ``request`` or build one with ``build()``.
+    ``hospital_param`` scopes the entry to one hospital (see ``response_key``).
+
+    Within a process, only the first request for a missing key runs ``build``;
+    the others wait on it. Across processes a short-lived cache lock plays the
+    same role, falling back to computing after ``WAIT_TIMEOUT_SECONDS``.
+    """
+    key = response_key(request, hospital_param)
+    data = cache.get(key)
+    if data is not None:
+        return Response(data, headers={'X-Cache': 'HIT'})
+
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = threading.Event()
+
+    if not leader:
+        event.wait(WAIT_TIMEOUT_SECONDS)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        return build()
+
+    lock_key = f'{key}:lock'
+    try:
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT_SECONDS)
+        if not locked:
+            # Another process is computing this response
+            data = _wait_for(key)
+            if data is not None:
+                return Response(data, headers={'X-Cache': 'HIT'})
+        try:
+            response = _compute(key, build)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        response['X-Cache'] = 'MISS'
+        return response
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
+
+
+def cache_public_response(view_func):
+    """Decorator for public function-based GET views"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view_func(request, *args, **kwargs)
+        return cached_response(request, lambda: view_func(request, *args, **kwargs))
+    return wrapper
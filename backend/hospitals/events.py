@@ -0,0 +1,166 @@
+"""
+Live hospital event feed for token boards and capacity widgets.
+
+Writers append small JSON events (queue calls, EmergencyCapacity changes,
+bed availability deltas) to a per-hospital log in the shared cache: an
+``incr`` sequence number plus one key per event, expiring after
+``HOSPITAL_EVENT_TTL``. The server-sent-events view tails that log with
+cheap cache reads, so a screen holds one connection and never touches the
+ORM while it waits. ``stream`` serves WSGI deployments (``runserver``,
+``wsgi.py``) and ``astream`` ASGI ones; Django buffers an iterator of the
+other kind to the end before sending anything. Clients resume with ``Last-Event-ID``; if they fell
+further behind than the log keeps, they get a ``reset`` event and reload.
+"""
+import asyncio
+import json
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+POLL_INTERVAL_SECONDS = 1
+HEARTBEAT_SECONDS = 15
+# Streams end after this long; browsers' EventSource reconnects on its own
+MAX_STREAM_SECONDS = 300
+MAX_BACKLOG = 200
+RETRY_MILLISECONDS = 3000
+
+
+def _sequence_key(hospital_id):
+    return f'events:{hospital_id}:seq'
+
+
+def _event_key(hospital_id, event_id):
+    return f'events:{hospital_id}:{event_id}'
+
+
+def _append(hospital_id, event_type, data):
+    key = _sequence_key(hospital_id)
+    cache.add(key, 0, timeout=None)
+    event_id = cache.incr(key)
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    cache.set(_event_key(hospital_id, event_id), (event_type, payload), settings.HOSPITAL_EVENT_TTL)
+    return event_id
+
+
+def publish(hospital_id, event_type, data):
+    """Append an event to a hospital's feed once the current transaction commits"""
+    transaction.on_commit(lambda: _append(hospital_id, event_type, data))
+
+
+def latest_event_id(hospital_id):
+    return cache.get(_sequence_key(hospital_id), 0)
+
+
+async def alatest_event_id(hospital_id):
+    return await cache.aget(_sequence_key(hospital_id), 0)
+
+
+def _pending_ids(last_id, current):
+    """Ids the client has not seen, or None when more have passed than the log keeps"""
+    if current - last_id > MAX_BACKLOG:
+        return None
+    return range(last_id + 1, current + 1)
+
+
+def _collect(hospital_id, ids, found):
+    events = []
+    for event_id in ids:
+        event = found.get(_event_key(hospital_id, event_id))
+        if event is None:
+            return None
+        events.append((event_id, *event))
+    return events
+
+
+def read_since(hospital_id, last_id):
+    """
+    Events after ``last_id`` as (next_last_id, [(event_id, type, payload), ...]).
+
+    Returns None for the event list when events the client has not seen
+    already expired, so it must reload its state.
+    """
+    current = latest_event_id(hospital_id)
+    if current <= last_id:
+        return current, []
+    ids = _pending_ids(last_id, current)
+    if ids is None:
+        return current, None
+    found = cache.get_many([_event_key(hospital_id, event_id) for event_id in ids])
+    return current, _collect(hospital_id, ids, found)
+
+
+async def aread_since(hospital_id, last_id):
+    """Async ``read_since``"""
+    current = await alatest_event_id(hospital_id)
+    if current <= last_id:
+        return current, []
+    ids = _pending_ids(last_id, current)
+    if ids is None:
+        return current, None
+    found = await cache.aget_many([_event_key(hospital_id, event_id) for event_id in ids])
+    return current, _collect(hospital_id, ids, found)
+
+
+def format_event(event_type, payload, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {payload}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class _Tail:
+    """Turns successive ``read_since`` results into chunks, adding heartbeats while idle"""
+
+    def __init__(self):
+        self.started = self.last_sent = time.monotonic()
+
+    def open(self):
+        return time.monotonic() - self.started < MAX_STREAM_SECONDS
+
+    def chunks(self, last_id, events):
+        now = time.monotonic()
+        if events is None:
+            chunks = [format_event('reset', '{}', last_id)]
+        elif events:
+            chunks = [format_event(event_type, payload, event_id) for event_id, event_type, payload in events]
+        elif now - self.last_sent >= HEARTBEAT_SECONDS:
+            chunks = [': ping\n\n']
+        else:
+            return []
+        self.last_sent = now
+        return chunks
+
+
+def stream(hospital_id, last_id=None):
+    """
+    Generator of server-sent-event chunks for one hospital, for WSGI servers.
+
+    Each open stream holds a worker thread until it ends, so deployments
+    need enough threads for their screens (``runserver`` starts one per
+    connection).
+    """
+    yield f'retry: {RETRY_MILLISECONDS}\n\n'
+    if last_id is None:
+        last_id = latest_event_id(hospital_id)
+    tail = _Tail()
+    while tail.open():
+        last_id, events = read_since(hospital_id, last_id)
+        yield from tail.chunks(last_id, events)
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+async def astream(hospital_id, last_id=None):
+    """Async generator of server-sent-event chunks for one hospital, for ASGI servers"""
+    yield f'retry: {RETRY_MILLISECONDS}\n\n'
+    if last_id is None:
+        last_id = await alatest_event_id(hospital_id)
+    tail = _Tail()
+    while tail.open():
+        last_id, events = await aread_since(hospital_id, last_id)
+        for chunk in tail.chunks(last_id, events):
+            yield chunk
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
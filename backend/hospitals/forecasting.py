@@ -0,0 +1,149 @@
+"""
+Bed occupancy forecasting.
+
+BedOccupancy intervals from the last ``HISTORY_DAYS`` are turned into an
+hourly occupancy series per (hospital, bed type) with two ``searchsorted``
+calls over the sorted admission and discharge times: beds occupied at hour
+``t`` are the admissions up to ``t`` minus the discharges up to ``t``. The
+series is split into an hour-of-day (or, with two weeks of history,
+hour-of-week) seasonal profile and an exponentially smoothed level, both
+computed with vector operations, and the forecast is level plus profile,
+clipped to the number of beds. The last point of the series is the live
+HospitalBedStats count, so beds toggled by hand are still anchored right.
+
+``refresh_bed_forecasts`` stores the lowest predicted availability over the
+next ``DISCOVERY_HORIZON_HOURS`` on HospitalBedStats, which is what
+discovery reads to push hospitals that are about to fill down the list.
+"""
+from collections import defaultdict
+from datetime import timedelta
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .cache import bump_hospital_version
+from .models import BedOccupancy, HospitalBedStats
+
+HISTORY_DAYS = 28
+DEFAULT_HORIZON_HOURS = 48
+MAX_HORIZON_HOURS = 72
+DISCOVERY_HORIZON_HOURS = 24
+SMOOTHING_ALPHA = 0.3
+DAY_HOURS = 24
+WEEK_HOURS = 7 * 24
+
+
+def history_start(now):
+    """Local midnight on the Monday ``HISTORY_DAYS`` back, so series index % 24 (or 168) is the local hour"""
+    start = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=HISTORY_DAYS)
+    return start - timedelta(days=start.weekday())
+
+
+def hour_marks(start, now):
+    """Epoch seconds of every hour from ``start`` up to ``now``"""
+    count = int((now - start).total_seconds() // 3600) + 1
+    return start.timestamp() + 3600.0 * np.arange(count)
+
+
+def hourly_occupancy(admitted, discharged, marks):
+    """Beds occupied at each mark, from epoch-second admission and discharge arrays"""
+    admitted = np.sort(admitted)
+    discharged = np.sort(discharged)
+    return (np.searchsorted(admitted, marks, side='right')
+            - np.searchsorted(discharged, marks, side='right')).astype(float)
+
+
+def forecast_series(series, horizon, alpha=SMOOTHING_ALPHA):
+    """Seasonal profile plus exponentially smoothed level for the ``horizon`` hours after ``series``"""
+    count = len(series)
+    if count == 0:
+        return np.zeros(horizon)
+    period = WEEK_HOURS if count >= 2 * WEEK_HOURS else DAY_HOURS
+    phase = np.arange(count) % period
+    mean = series.mean()
+    seen = np.bincount(phase, minlength=period)
+    totals = np.bincount(phase, weights=series, minlength=period)
+    season = np.where(seen > 0, totals / np.maximum(seen, 1), mean) - mean
+
+    # Final level of l[i] = alpha * x[i] + (1 - alpha) * l[i - 1], l[0] = x[0], as one dot product
+    weights = alpha * (1 - alpha) ** np.arange(count - 1, -1, -1)
+    weights[0] = (1 - alpha) ** (count - 1)
+    level = float(weights @ (series - season[phase]))
+    return level + season[np.arange(count, count + horizon) % period]
+
+
+def _intervals(hospital_ids, bed_types, start, now):
+    """{(hospital_id, bed_type): (admitted, discharged)} epoch-second arrays of stays overlapping the history"""
+    rows = BedOccupancy.objects.filter(bed__hospital_id__in=hospital_ids, admitted_at__lte=now).exclude(
+        discharged_at__lt=start
+    )
+    if bed_types:
+        rows = rows.filter(bed__bed_type__in=bed_types)
+    grouped = defaultdict(lambda: ([], []))
+    far_future = (now + timedelta(days=365)).timestamp()
+    for hospital_id, bed_type, admitted_at, discharged_at in rows.order_by().values_list(
+        'bed__hospital_id', 'bed__bed_type', 'admitted_at', 'discharged_at'
+    ).iterator():
+        admitted, discharged = grouped[(hospital_id, bed_type)]
+        admitted.append(admitted_at.timestamp())
+        discharged.append(discharged_at.timestamp() if discharged_at else far_future)
+    return {key: (np.array(admitted), np.array(discharged)) for key, (admitted, discharged) in grouped.items()}
+
+
+def _forecasts(hospital_ids, bed_types, horizon, now):
+    """Yield (HospitalBedStats row, result) pairs; see ``forecast_beds``"""
+    start = history_start(now)
+    marks = hour_marks(start, now)
+    stats = HospitalBedStats.objects.filter(hospital_id__in=hospital_ids)
+    if bed_types:
+        stats = stats.filter(bed_type__in=bed_types)
+    stats = list(stats)
+    intervals = _intervals(hospital_ids, bed_types, start, now)
+
+    for row in stats:
+        admitted, discharged = intervals.get((row.hospital_id, row.bed_type), (np.empty(0), np.empty(0)))
+        series = hourly_occupancy(admitted, discharged, marks)
+        occupied = row.total - row.available
+        series[-1] = occupied
+        forecast = np.clip(np.rint(forecast_series(series, horizon)), 0, row.total).astype(int)
+        full = np.nonzero(forecast >= row.total)[0] if row.total else np.empty(0, dtype=int)
+        yield row, {
+            'total': row.total,
+            'occupied': occupied,
+            'forecast': forecast,
+            'hours_until_full': int(full[0]) + 1 if len(full) else None,
+        }
+
+
+def forecast_beds(hospital_ids, bed_types=None, horizon=DEFAULT_HORIZON_HOURS, now=None):
+    """
+    Hourly occupancy forecasts as {(hospital_id, bed_type): result}.
+
+    Each result has the bed ``total``, ``occupied`` now, the ``forecast``
+    array of predicted occupied beds for the next ``horizon`` hours and
+    ``hours_until_full`` (None when the type is not predicted to fill).
+    Costs two queries however many hospitals are forecast.
+    """
+    now = now or timezone.now()
+    return {
+        (row.hospital_id, row.bed_type): result
+        for row, result in _forecasts(hospital_ids, bed_types, horizon, now)
+    }
+
+
+def refresh_bed_forecasts(hospital_ids, now=None):
+    """Store each bed type's lowest predicted availability over the discovery horizon"""
+    now = now or timezone.now()
+    rows = []
+    changed = set()
+    for row, result in _forecasts(hospital_ids, None, DISCOVERY_HORIZON_HOURS, now):
+        available = result['total'] - int(result['forecast'].max())
+        if available != row.forecast_available:
+            changed.add(row.hospital_id)
+        row.forecast_available = available
+        row.forecast_updated_at = now
+        rows.append(row)
+    HospitalBedStats.objects.bulk_update(rows, ['forecast_available', 'forecast_updated_at'], batch_size=500)
+    # bulk_update sends no signals, so drop cached discovery responses here
+    for hospital_id in changed:
+        transaction.on_commit(lambda hospital_id=hospital_id: bump_hospital_version(hospital_id))
+    return len(rows)
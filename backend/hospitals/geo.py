@@ -0,0 +1,165 @@
+"""
+Geospatial helpers for hospital discovery.
+
+Hospitals carry a geohash of their coordinates (kept up to date in
+``Hospital.save``). Radius queries prune candidates with a bounding box on the
+indexed latitude/longitude columns and a set of geohash prefix cells covering
+that box, and only then run the exact haversine check on the survivors.
+"""
+from math import radians, cos, sin, asin, sqrt, ceil, degrees
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371
+GEOHASH_PRECISION = 9
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Upper bound on the number of prefix cells used to cover a search box
+MAX_COVER_CELLS = 32
+
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance between two points using Haversine formula"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return EARTH_RADIUS_KM * c
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate pair as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bit = 0
+    ch = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                ch |= 1 << (4 - bit)
+                lon_range[0] = mid
+            else:
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                ch |= 1 << (4 - bit)
+                lat_range[0] = mid
+            else:
+                lat_range[1] = mid
+        even = not even
+
+        if bit < 4:
+            bit += 1
+        else:
+            geohash.append(GEOHASH_BASE32[ch])
+            bit = 0
+            ch = 0
+
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    """Return (lat_degrees, lon_degrees) spanned by a geohash cell"""
+    bits = precision * 5
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing a search circle"""
+    lat_delta = degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(latitude - lat_delta, -90.0)
+    max_lat = min(latitude + lat_delta, 90.0)
+
+    # Longitude degrees shrink towards the poles; give up on pruning there
+    cos_lat = cos(radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-6:
+        return min_lat, max_lat, -180.0, 180.0
+    lon_delta = degrees(radius_km / EARTH_RADIUS_KM) / cos_lat
+    min_lon = longitude - lon_delta
+    max_lon = longitude + lon_delta
+    if min_lon < -180.0 or max_lon > 180.0:
+        # Box wraps the antimeridian; fall back to the full longitude span
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def _axis_samples(low, high, step):
+    """Points spaced one cell apart from low to high, always including high"""
+    samples = []
+    value = low
+    while value < high:
+        samples.append(value)
+        value += step
+    samples.append(high)
+    return samples
+
+
+def covering_cells(min_lat, max_lat, min_lon, max_lon, max_cells=MAX_COVER_CELLS):
+    """
+    Return the geohash prefixes covering a bounding box.
+
+    Picks the finest precision whose cover stays within ``max_cells`` cells.
+    Returns an empty list when the box is too large to be worth pruning.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(precision)
+        rows = ceil((max_lat - min_lat) / lat_step) + 1
+        cols = ceil((max_lon - min_lon) / lon_step) + 1
+        if rows * cols > max_cells:
+            continue
+
+        cells = set()
+        for lat in _axis_samples(min_lat, max_lat, lat_step):
+            for lon in _axis_samples(min_lon, max_lon, lon_step):
+                cells.add(encode_geohash(lat, lon, precision))
+        return sorted(cells)
+    return []
+
+
+def cell_range(cell):
+    """
+    Q matching geohashes that start with ``cell``, as a range the geohash
+    index can seek (``startswith`` compiles to a LIKE that scans it).
+    """
+    prefix = cell.rstrip(GEOHASH_BASE32[-1])
+    if not prefix:
+        return Q(geohash__gte=cell)
+    upper = prefix[:-1] + GEOHASH_BASE32[GEOHASH_BASE32.index(prefix[-1]) + 1]
+    return Q(geohash__gte=cell, geohash__lt=upper)
+
+
+def filter_within_radius(queryset, latitude, longitude, radius_km):
+    """
+    Restrict a Hospital queryset to hospitals within ``radius_km`` of a point.
+
+    The bounding box and geohash cells are applied in SQL so only nearby rows
+    are read; the exact haversine check then runs on (id, lat, lon) tuples.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    candidates = queryset.filter(
+        latitude__isnull=False,
+        longitude__isnull=False,
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    )
+
+    cells = covering_cells(min_lat, max_lat, min_lon, max_lon)
+    if cells:
+        cell_filter = Q()
+        for cell in cells:
+            cell_filter |= cell_range(cell)
+        candidates = candidates.filter(cell_filter)
+
+    nearby = [
+        hospital_id
+        for hospital_id, lat, lon in candidates.values_list('id', 'latitude', 'longitude')
+        if calculate_distance(latitude, longitude, float(lat), float(lon)) <= radius_km
+    ]
+    return queryset.filter(id__in=nearby)
@@ -0,0 +1,74 @@
+"""
+Interval index for schedule and booking conflict checks.
+
+Intervals are half-open ``[start, end)`` over any ordered values (minutes,
+datetimes). They are kept sorted by start next to a running maximum of
+their ends, which is the augmentation of an interval tree flattened into
+arrays: the intervals starting before ``end`` are a prefix found by
+bisection, and that prefix overlaps ``[start, end)`` exactly when its
+largest end is after ``start``. Overlap checks are therefore O(log n) even
+when stored intervals overlap or nest, as legacy rows may.
+
+Indexes are built per request from the handful of rows a query returns
+(one doctor's weekday windows, one theater's bookings for a few days), so
+inserts simply rebuild the running maximum from the insertion point.
+"""
+from bisect import bisect_left, bisect_right, insort
+from itertools import count
+
+
+class IntervalIndex:
+    """Half-open intervals with O(log n) overlap queries"""
+
+    def __init__(self, intervals=()):
+        # A sequence number breaks ties so keys never need to be comparable
+        self._sequence = count()
+        self.items = sorted((start, end, next(self._sequence), key) for start, end, key in intervals)
+        self.max_ends = []
+        self._rebuild(0)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _rebuild(self, position):
+        del self.max_ends[position:]
+        for _, end, _, _ in self.items[position:]:
+            self.max_ends.append(end if not self.max_ends or end > self.max_ends[-1] else self.max_ends[-1])
+
+    def _prefix(self, end):
+        """Number of intervals starting before ``end``"""
+        return bisect_left(self.items, (end,))
+
+    def add(self, start, end, key=None):
+        position = bisect_left(self.items, (start,))
+        insort(self.items, (start, end, next(self._sequence), key))
+        self._rebuild(position)
+
+    def overlaps(self, start, end):
+        """Whether any interval overlaps ``[start, end)``"""
+        prefix = self._prefix(end)
+        return prefix > 0 and self.max_ends[prefix - 1] > start
+
+    def conflicts(self, start, end):
+        """Keys of the intervals overlapping ``[start, end)``, in start order"""
+        prefix = self._prefix(end)
+        if prefix == 0 or self.max_ends[prefix - 1] <= start:
+            return []
+        return [key for _, item_end, _, key in self.items[:prefix] if item_end > start]
+
+    def first_gap(self, start, end, length):
+        """
+        Start of the earliest free ``[t, t + length)`` inside ``[start, end)``,
+        or None. ``length`` must be addable to the interval values (e.g. a
+        timedelta for datetimes).
+        """
+        candidate = start
+        # max_ends never decreases, so every interval before this one ends by ``start``
+        for item_start, item_end, _, _ in self.items[bisect_right(self.max_ends, start):]:
+            if candidate + length <= item_start:
+                break
+            if item_end > candidate:
+                candidate = item_end
+            if candidate + length > end:
+                return None
+        return candidate if candidate + length <= end else None
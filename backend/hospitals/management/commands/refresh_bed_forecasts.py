@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from hospitals.forecasting import refresh_bed_forecasts
+from hospitals.models import Hospital
+
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = 'Recompute bed occupancy forecasts used by discovery (run hourly, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hospital', type=int, action='append', dest='hospital_ids',
+                            help='Only refresh this hospital (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        hospital_ids = options['hospital_ids'] or list(
+            Hospital.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+        )
+        batch_size = max(1, options['batch_size'])
+        count = 0
+        for offset in range(0, len(hospital_ids), batch_size):
+            count += refresh_bed_forecasts(hospital_ids[offset:offset + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {count} bed forecasts for {len(hospital_ids)} hospitals'))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+def populate_geohash(apps, schema_editor):
+    from hospitals.geo import encode_geohash
+
+    Hospital = apps.get_model('hospitals', 'Hospital')
+    hospitals = Hospital.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for hospital in hospitals.iterator():
+        hospital.geohash = encode_geohash(float(hospital.latitude), float(hospital.longitude))
+        hospital.save(update_fields=['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0003_bed_department_doctorapplication_emergencycapacity_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hospital',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='hospital',
+            index=models.Index(fields=['geohash'], name='hospitals_geohash_1f354d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hospital',
+            index=models.Index(fields=['latitude', 'longitude'], name='hospitals_latitud_0ad327_idx'),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+    ]
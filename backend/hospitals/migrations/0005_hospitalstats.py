@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def populate_hospital_stats(apps, schema_editor):
+    Hospital = apps.get_model('hospitals', 'Hospital')
+    Bed = apps.get_model('hospitals', 'Bed')
+    HospitalStats = apps.get_model('hospitals', 'HospitalStats')
+    HospitalBedStats = apps.get_model('hospitals', 'HospitalBedStats')
+
+    hospitals = Hospital.objects.annotate(
+        active_doctors=Count('doctors', filter=Q(doctors__is_active=True, doctors__is_approved=True))
+    ).select_related('emergency_capacity')
+    for hospital in hospitals.iterator():
+        capacity = getattr(hospital, 'emergency_capacity', None)
+        HospitalStats.objects.create(
+            hospital=hospital,
+            doctor_count=hospital.active_doctors,
+            emergency_wait_time=capacity.wait_time_minutes if capacity else None,
+        )
+
+    bed_counts = Bed.objects.values('hospital_id', 'bed_type').annotate(
+        total=Count('id'),
+        available=Count('id', filter=Q(is_available=True, is_occupied=False)),
+    )
+    HospitalBedStats.objects.bulk_create([HospitalBedStats(**row) for row in bed_counts])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0004_hospital_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HospitalStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doctor_count', models.IntegerField(default=0)),
+                ('emergency_wait_time', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hospital', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='hospitals.hospital')),
+            ],
+            options={
+                'db_table': 'hospital_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='HospitalBedStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bed_type', models.CharField(choices=[('GENERAL', 'General'), ('ICU', 'ICU'), ('NICU', 'NICU'), ('HDU', 'HDU'), ('ISOLATION', 'Isolation')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('available', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bed_stats', to='hospitals.hospital')),
+            ],
+            options={
+                'db_table': 'hospital_bed_stats',
+                'indexes': [models.Index(fields=['bed_type', 'available'], name='hospital_be_bed_typ_72fcba_idx')],
+                'unique_together': {('hospital', 'bed_type')},
+            },
+        ),
+        migrations.RunPython(populate_hospital_stats, migrations.RunPython.noop),
+    ]
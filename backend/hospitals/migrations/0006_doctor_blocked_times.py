@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hospitals', '0005_hospitalstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorBlockedTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_blocked_times', to=settings.AUTH_USER_MODEL)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocked_times', to='hospitals.doctor')),
+            ],
+            options={
+                'db_table': 'doctor_blocked_times',
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['doctor', 'starts_at'], name='doctor_bloc_doctor__735759_idx')],
+            },
+        ),
+    ]
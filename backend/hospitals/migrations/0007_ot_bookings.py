@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('appointments', '0007_appointment_transitions'),
+        ('hospitals', '0006_doctor_blocked_times'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OTBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('procedure', models.CharField(max_length=200)),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('SCHEDULED', 'Scheduled'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], default='SCHEDULED', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_ot_bookings', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ot_bookings', to='appointments.patient')),
+                ('surgeon', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ot_bookings', to='hospitals.doctor')),
+                ('theater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='hospitals.operationtheater')),
+            ],
+            options={
+                'db_table': 'ot_bookings',
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['theater', 'starts_at'], name='ot_bookings_theater_7083da_idx'), models.Index(fields=['surgeon', 'starts_at'], name='ot_bookings_surgeon_b3073a_idx')],
+            },
+        ),
+    ]
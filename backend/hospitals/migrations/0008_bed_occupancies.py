@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_appointment_transitions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hospitals', '0007_ot_bookings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BedOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('admitted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('discharged_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('admitted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bed_admissions', to=settings.AUTH_USER_MODEL)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bed_occupancies', to='appointments.appointment')),
+                ('bed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancies', to='hospitals.bed')),
+                ('discharged_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bed_discharges', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bed_occupancies', to='appointments.patient')),
+            ],
+            options={
+                'db_table': 'bed_occupancies',
+                'ordering': ['-admitted_at'],
+                'indexes': [models.Index(fields=['bed', 'admitted_at'], name='bed_occupan_bed_id_5b540a_idx'), models.Index(fields=['patient', 'admitted_at'], name='bed_occupan_patient_78cbd3_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bedoccupancy',
+            constraint=models.UniqueConstraint(condition=models.Q(('discharged_at__isnull', True)), fields=('bed',), name='one_open_occupancy_per_bed'),
+        ),
+    ]
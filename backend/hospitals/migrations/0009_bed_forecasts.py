@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0008_bed_occupancies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hospitalbedstats',
+            name='forecast_available',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hospitalbedstats',
+            name='forecast_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hospitals', '0009_bed_forecasts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='staff_memberships', to='hospitals.hospital')),
+                ('user', models.ForeignKey(limit_choices_to={'role__in': ['NURSE', 'MEDICAL_ASSISTANT']}, on_delete=django.db.models.deletion.CASCADE, related_name='staff_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'staff_memberships',
+                'unique_together': {('user', 'hospital')},
+            },
+        ),
+    ]
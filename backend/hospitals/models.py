@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from users.models import User
+from .geo import encode_geohash
 
 
 class Hospital(models.Model):
@@ -20,6 +22,7 @@ class Hospital(models.Model):
     pincode = models.CharField(max_length=10)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)  # Derived from latitude/longitude
     
     phone = models.CharField(max_length=20)
     email = models.EmailField()
@@ -45,11 +48,23 @@ class Hospital(models.Model):
             models.Index(fields=['city', 'state']),
             models.Index(fields=['is_active', 'is_approved']),
             models.Index(fields=['opd_open', 'emergency_available']),
+            models.Index(fields=['geohash']),
+            models.Index(fields=['latitude', 'longitude']),
         ]
     
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        # Keep the spatial index cell in sync with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(float(self.latitude), float(self.longitude))
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
 
 
 class Department(models.Model):
@@ -102,6 +117,22 @@ class Doctor(models.Model):
         return f"Dr. {self.user.full_name} - {self.specialization}"
 
 
+class StaffMembership(models.Model):
+    """Hospital a nurse or medical assistant works at, used to scope their access"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='staff_memberships',
+                             limit_choices_to={'role__in': ['NURSE', 'MEDICAL_ASSISTANT']})
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='staff_memberships')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'staff_memberships'
+        unique_together = ['user', 'hospital']
+    
+    def __str__(self):
+        return f"{self.user.full_name} - {self.hospital.name}"
+
+
 class Bed(models.Model):
     """Bed management system"""
     BED_TYPE_CHOICES = [
@@ -131,6 +162,37 @@ class Bed(models.Model):
         return f"{self.hospital.name} - {self.bed_number} ({self.bed_type})"
 
 
+class BedOccupancy(models.Model):
+    """One admission's stay in a bed; open while ``discharged_at`` is null"""
+    bed = models.ForeignKey(Bed, on_delete=models.CASCADE, related_name='occupancies')
+    patient = models.ForeignKey('appointments.Patient', on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='bed_occupancies')
+    appointment = models.ForeignKey('appointments.Appointment', on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='bed_occupancies')
+    admitted_at = models.DateTimeField(default=timezone.now)
+    discharged_at = models.DateTimeField(null=True, blank=True)
+    admitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='bed_admissions')
+    discharged_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='bed_discharges')
+    notes = models.TextField(blank=True)
+    
+    class Meta:
+        db_table = 'bed_occupancies'
+        indexes = [
+            models.Index(fields=['bed', 'admitted_at']),
+            models.Index(fields=['patient', 'admitted_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['bed'], condition=models.Q(discharged_at__isnull=True),
+                                    name='one_open_occupancy_per_bed'),
+        ]
+        ordering = ['-admitted_at']
+    
+    def __str__(self):
+        return f"{self.bed} from {self.admitted_at}"
+
+
 class OperationTheater(models.Model):
     """Operation Theater scheduling"""
     hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='operation_theaters')
@@ -147,6 +209,41 @@ class OperationTheater(models.Model):
         return f"{self.hospital.name} - {self.name}"
 
 
+class OTBooking(models.Model):
+    """A surgery slot booked in an operation theater"""
+    STATUS_CHOICES = [
+        ('SCHEDULED', 'Scheduled'),
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETED', 'Completed'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+    
+    theater = models.ForeignKey(OperationTheater, on_delete=models.CASCADE, related_name='bookings')
+    surgeon = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='ot_bookings')
+    patient = models.ForeignKey('appointments.Patient', on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='ot_bookings')
+    procedure = models.CharField(max_length=200)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SCHEDULED')
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='created_ot_bookings')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'ot_bookings'
+        indexes = [
+            models.Index(fields=['theater', 'starts_at']),
+            models.Index(fields=['surgeon', 'starts_at']),
+        ]
+        ordering = ['starts_at']
+    
+    def __str__(self):
+        return f"{self.theater.name} - {self.procedure} ({self.starts_at} - {self.ends_at})"
+
+
 class EmergencyCapacity(models.Model):
     """Emergency department capacity tracking"""
     hospital = models.OneToOneField(Hospital, on_delete=models.CASCADE, related_name='emergency_capacity')
@@ -231,3 +328,60 @@ class OPDSchedule(models.Model):
     
     def __str__(self):
         return f"{self.doctor.user.full_name} - {self.day} ({self.start_time} - {self.end_time})"
+
+
+class DoctorBlockedTime(models.Model):
+    """Leave or other time a doctor cannot see patients, overriding the OPD schedule"""
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='blocked_times')
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    reason = models.CharField(max_length=200, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='created_blocked_times')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'doctor_blocked_times'
+        indexes = [
+            models.Index(fields=['doctor', 'starts_at']),
+        ]
+        ordering = ['starts_at']
+    
+    def __str__(self):
+        return f"{self.doctor.user.full_name} unavailable {self.starts_at} - {self.ends_at}"
+
+
+class HospitalStats(models.Model):
+    """Denormalized per-hospital counters read by HospitalSerializer"""
+    hospital = models.OneToOneField(Hospital, on_delete=models.CASCADE, related_name='stats')
+    doctor_count = models.IntegerField(default=0)
+    emergency_wait_time = models.IntegerField(null=True, blank=True)  # in minutes
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'hospital_stats'
+    
+    def __str__(self):
+        return f"{self.hospital.name} - Stats"
+
+
+class HospitalBedStats(models.Model):
+    """Denormalized bed counts per hospital and bed type"""
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='bed_stats')
+    bed_type = models.CharField(max_length=20, choices=Bed.BED_TYPE_CHOICES)
+    total = models.IntegerField(default=0)
+    available = models.IntegerField(default=0)
+    # Lowest availability predicted for the next day (see hospitals.forecasting)
+    forecast_available = models.IntegerField(null=True, blank=True)
+    forecast_updated_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'hospital_bed_stats'
+        unique_together = ['hospital', 'bed_type']
+        indexes = [
+            models.Index(fields=['bed_type', 'available']),
+        ]
+    
+    def __str__(self):
+        return f"{self.hospital.name} - {self.bed_type} ({self.available}/{self.total})"
@@ -0,0 +1,92 @@
+"""
+Vectorized nearest-hospital search.
+
+Coordinates of every active, approved hospital are held in NumPy arrays so a
+k-nearest query computes all haversine distances in a single batch instead of
+looping over model instances. The arrays are rebuilt lazily after a hospital
+is saved or deleted (see ``hospitals.signals``) and at most every
+``CACHE_TTL_SECONDS`` so other worker processes pick up changes too.
+"""
+import threading
+import time
+import numpy as np
+from .geo import EARTH_RADIUS_KM
+from .models import Hospital
+
+CACHE_TTL_SECONDS = 300
+
+
+class HospitalCoordinateCache:
+    """Process-local cache of hospital ids and coordinates (in radians)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._arrays = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._arrays = None
+
+    def get(self):
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > CACHE_TTL_SECONDS
+            if self._arrays is None or expired:
+                self._arrays = self._load()
+                self._loaded_at = time.monotonic()
+            return self._arrays
+
+    def _load(self):
+        rows = list(
+            Hospital.objects.filter(
+                is_active=True, is_approved=True,
+                latitude__isnull=False, longitude__isnull=False
+            ).values_list('id', 'latitude', 'longitude')
+        )
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        coords = np.array([[float(row[1]), float(row[2])] for row in rows], dtype=np.float64).reshape(-1, 2)
+        coords = np.radians(coords)
+        return ids, coords[:, 0], coords[:, 1]
+
+
+coordinate_cache = HospitalCoordinateCache()
+
+
+def haversine_km(lat, lon, lats_rad, lons_rad):
+    """Distances in km from (lat, lon) in degrees to arrays of points in radians"""
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    dlat = lats_rad - lat
+    dlon = lons_rad - lon
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(lats_rad) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_hospitals(latitude, longitude, limit, candidate_ids=None, radius_km=None):
+    """
+    Return [(hospital_id, distance_km), ...] for the ``limit`` closest hospitals.
+
+    ``candidate_ids`` restricts the search to hospitals that passed other
+    filters; ``radius_km`` drops anything further away than the given radius.
+    """
+    ids, lats, lons = coordinate_cache.get()
+    if candidate_ids is not None:
+        mask = np.isin(ids, np.fromiter(candidate_ids, dtype=np.int64))
+        ids, lats, lons = ids[mask], lats[mask], lons[mask]
+    if ids.size == 0 or limit <= 0:
+        return []
+
+    distances = haversine_km(latitude, longitude, lats, lons)
+    if radius_km is not None:
+        within = distances <= radius_km
+        ids, distances = ids[within], distances[within]
+        if ids.size == 0:
+            return []
+
+    if ids.size > limit:
+        # Partial selection is O(n); only the k survivors get fully sorted
+        top = np.argpartition(distances, limit - 1)[:limit]
+    else:
+        top = np.arange(ids.size)
+    top = top[np.argsort(distances[top], kind='stable')]
+    return [(int(ids[i]), float(distances[i])) for i in top]
@@ -23,3 +23,37 @@ class IsSuperAdmin(permissions.BasePermission):
     """Permission check for Super Admin role"""
     def has_permission(self, request, view):
         return request.user and request.user.is_authenticated and request.user.role == 'SUPER_ADMIN'
+
+
+class IsHospitalStaff(permissions.BasePermission):
+    """Permission check for staff who run hospital floor operations (queues, beds)"""
+    STAFF_ROLES = ['HOSPITAL_DIRECTOR', 'OPERATIONS_MANAGER', 'HOSPITAL_ADMIN', 'DOCTOR',
+                   'NURSE', 'MEDICAL_ASSISTANT']
+    
+    def has_permission(self, request, view):
+        return request.user and request.user.is_authenticated and request.user.role in self.STAFF_ROLES
+
+
+def staff_hospital_ids(user):
+    """
+    Ids of the hospitals a staff user belongs to.
+    
+    Nurses and medical assistants belong to the hospitals of their active
+    StaffMembership rows. Returns None for other roles (e.g. patients); None
+    means the user cannot be scoped to a hospital, so hospital-scoped actions
+    must refuse them rather than allow everything.
+    """
+    if user.role == 'OPERATIONS_MANAGER':
+        return list(user.managed_hospitals.values_list('id', flat=True))
+    if user.role == 'HOSPITAL_ADMIN':
+        hospital = getattr(user, 'hospital_admin', None)
+        return [hospital.id] if hospital else []
+    if user.role == 'HOSPITAL_DIRECTOR':
+        hospital = getattr(user, 'hospital_director', None)
+        return [hospital.id] if hospital else []
+    if user.role == 'DOCTOR':
+        doctor = getattr(user, 'doctor_profile', None)
+        return [doctor.hospital_id] if doctor else []
+    if user.role in ['NURSE', 'MEDICAL_ASSISTANT']:
+        return list(user.staff_memberships.filter(is_active=True).values_list('hospital_id', flat=True))
+    return None
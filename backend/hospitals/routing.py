@@ -0,0 +1,160 @@
+"""
+Capacity-aware emergency routing.
+
+Every active, approved hospital with an emergency department is held in a
+process-local snapshot of NumPy arrays: coordinates, ER occupancy, wait
+time, free ventilators and free ICU beds. A routing query computes all
+haversine distances in one batch, adds a penalty in kilometres for a busy
+or ill-equipped hospital and ranks by the sum, without touching the
+database.
+
+Writes to EmergencyCapacity, hospitals and bed counters bump a version in
+the shared cache once committed (see ``hospitals.signals`` and
+``hospitals.beds``); the snapshot compares it on every read and reloads
+with two queries when it moved, so every worker process sees a write on
+its next request.
+"""
+import threading
+import time
+import numpy as np
+from django.db import transaction
+from .cache import bump_version, get_version
+from .models import Hospital, HospitalBedStats
+from .nearest import haversine_km
+
+SNAPSHOT_SCOPE = 'emergency-capacity'
+# Backstop for cache backends that are not shared between processes
+CACHE_TTL_SECONDS = 60
+
+# Penalties are in kilometres so they add to the distance directly
+OCCUPANCY_PENALTY_KM = 20.0
+FULL_ER_PENALTY_KM = 50.0
+UNKNOWN_OCCUPANCY = 0.5
+WAIT_PENALTY_KM_PER_MINUTE = 0.5
+NO_VENTILATOR_PENALTY_KM = 10.0
+NO_ICU_PENALTY_KM = 10.0
+
+
+def invalidate_snapshot():
+    """Make every process reload the snapshot once the current transaction commits"""
+    transaction.on_commit(lambda: bump_version(SNAPSHOT_SCOPE))
+
+
+class CapacitySnapshot:
+    """Process-local arrays of emergency capacity per hospital"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    def get(self):
+        version = get_version(SNAPSHOT_SCOPE)
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > CACHE_TTL_SECONDS
+            if self._data is None or self._version != version or expired:
+                self._data = self._load()
+                self._version = version
+                self._loaded_at = time.monotonic()
+            return self._data
+
+    def _load(self):
+        rows = list(
+            Hospital.objects.filter(
+                is_active=True, is_approved=True, emergency_available=True,
+                latitude__isnull=False, longitude__isnull=False
+            ).order_by('id').values(
+                'id', 'name', 'address', 'city', 'phone', 'latitude', 'longitude',
+                'emergency_capacity__total_capacity', 'emergency_capacity__current_occupancy',
+                'emergency_capacity__wait_time_minutes', 'emergency_capacity__ventilators_available',
+            )
+        )
+        icu_free = dict(
+            HospitalBedStats.objects.filter(
+                bed_type='ICU', hospital_id__in=[row['id'] for row in rows]
+            ).values_list('hospital_id', 'available')
+        )
+
+        def column(field):
+            return np.array([row[field] or 0 for row in rows], dtype=np.float64)
+
+        coords = np.radians(
+            np.array([[float(row['latitude']), float(row['longitude'])] for row in rows], dtype=np.float64)
+        ).reshape(-1, 2)
+        return {
+            'hospitals': [
+                {key: row[key] for key in ('id', 'name', 'address', 'city', 'phone', 'latitude', 'longitude')}
+                for row in rows
+            ],
+            'lats': coords[:, 0],
+            'lons': coords[:, 1],
+            'er_total': column('emergency_capacity__total_capacity'),
+            'er_occupancy': column('emergency_capacity__current_occupancy'),
+            'wait_minutes': column('emergency_capacity__wait_time_minutes'),
+            'ventilators': column('emergency_capacity__ventilators_available'),
+            'icu_free': np.array([icu_free.get(row['id'], 0) for row in rows], dtype=np.float64),
+        }
+
+
+capacity_snapshot = CapacitySnapshot()
+
+
+def penalties_km(snapshot):
+    """Penalty per hospital from ER load, wait time and missing ventilators or ICU beds"""
+    total = snapshot['er_total']
+    occupancy = snapshot['er_occupancy']
+    known = total > 0
+    load = np.where(known, occupancy / np.where(known, total, 1), UNKNOWN_OCCUPANCY)
+    return (
+        OCCUPANCY_PENALTY_KM * np.clip(load, 0.0, 1.0)
+        + np.where(known & (occupancy >= total), FULL_ER_PENALTY_KM, 0.0)
+        + WAIT_PENALTY_KM_PER_MINUTE * np.maximum(snapshot['wait_minutes'], 0)
+        + np.where(snapshot['ventilators'] > 0, 0.0, NO_VENTILATOR_PENALTY_KM)
+        + np.where(snapshot['icu_free'] > 0, 0.0, NO_ICU_PENALTY_KM)
+    )
+
+
+def route_emergency(latitude, longitude, limit, radius_km=None, needs_icu=False, needs_ventilator=False):
+    """
+    Return the ``limit`` best hospitals for an emergency at (latitude,
+    longitude), best first, as dicts with the hospital's contact details,
+    ``distance_km``, ``score`` (distance plus penalty) and current capacity.
+
+    ``needs_icu`` and ``needs_ventilator`` drop hospitals without a free ICU
+    bed or ventilator instead of only penalising them.
+    """
+    snapshot = capacity_snapshot.get()
+    count = len(snapshot['hospitals'])
+    if count == 0 or limit <= 0:
+        return []
+
+    distances = haversine_km(latitude, longitude, snapshot['lats'], snapshot['lons'])
+    scores = distances + penalties_km(snapshot)
+    mask = np.ones(count, dtype=bool)
+    if radius_km is not None:
+        mask &= distances <= radius_km
+    if needs_icu:
+        mask &= snapshot['icu_free'] > 0
+    if needs_ventilator:
+        mask &= snapshot['ventilators'] > 0
+    candidates = np.nonzero(mask)[0]
+    if candidates.size > limit:
+        # Partial selection is O(n); only the k survivors get fully sorted
+        candidates = candidates[np.argpartition(scores[candidates], limit - 1)[:limit]]
+    candidates = candidates[np.argsort(scores[candidates], kind='stable')]
+
+    results = []
+    for i in candidates:
+        hospital = dict(snapshot['hospitals'][i])
+        hospital.update({
+            'distance_km': round(float(distances[i]), 2),
+            'score': round(float(scores[i]), 2),
+            'er_total_capacity': int(snapshot['er_total'][i]),
+            'er_current_occupancy': int(snapshot['er_occupancy'][i]),
+            'wait_time_minutes': int(snapshot['wait_minutes'][i]),
+            'ventilators_available': int(snapshot['ventilators'][i]),
+            'icu_beds_available': int(snapshot['icu_free'][i]),
+        })
+        results.append(hospital)
+    return results
@@ -1,6 +1,13 @@
 from rest_framework import serializers
+from django.db.models import Count, Q
 from users.serializers import UserSerializer
-from .models import Hospital, Department, Doctor, DoctorApplication, OPDSchedule, Bed, OperationTheater, EmergencyCapacity
+from .models import (
+    Hospital, Department, Doctor, DoctorApplication, OPDSchedule, DoctorBlockedTime, Bed, OperationTheater,
+    OTBooking, BedOccupancy, EmergencyCapacity, HospitalStats
+)
+from .intervals import IntervalIndex
+from .stats import refresh_hospital_stats
+from .theaters import MAX_BOOKING_HOURS
 
 
 class HospitalSerializer(serializers.ModelSerializer):
@@ -23,23 +30,40 @@ class HospitalSerializer(serializers.ModelSerializer):
                   'created_at']
         read_only_fields = ['id', 'created_at', 'doctor_count', 'bed_availability', 'emergency_wait_time']
     
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        """Load everything the serializer reads so a page costs a constant number of queries"""
+        return queryset.select_related(
+            f'{prefix}stats', f'{prefix}admin', f'{prefix}director', f'{prefix}operations_manager'
+        ).prefetch_related(f'{prefix}bed_stats')
+    
+    def _get_stats(self, obj):
+        try:
+            return obj.stats
+        except HospitalStats.DoesNotExist:
+            refresh_hospital_stats(obj.id)
+            return HospitalStats.objects.get(hospital=obj)
+    
     def get_doctor_count(self, obj):
-        return obj.doctors.filter(is_active=True, is_approved=True).count()
+        return self._get_stats(obj).doctor_count
     
     def get_bed_availability(self, obj):
-        total_beds = obj.beds.count()
-        available_beds = obj.beds.filter(is_available=True, is_occupied=False).count()
+        by_type = {
+            stats.bed_type: {'total': stats.total, 'available': stats.available,
+                             'forecast_available': stats.forecast_available}
+            for stats in obj.bed_stats.all()
+        }
+        total_beds = sum(counts['total'] for counts in by_type.values())
+        available_beds = sum(counts['available'] for counts in by_type.values())
         return {
             'total': total_beds,
             'available': available_beds,
-            'occupied': total_beds - available_beds
+            'occupied': total_beds - available_beds,
+            'by_type': by_type
         }
     
     def get_emergency_wait_time(self, obj):
-        try:
-            return obj.emergency_capacity.wait_time_minutes
-        except:
-            return None
+        return self._get_stats(obj).emergency_wait_time
 
 
 class DepartmentSerializer(serializers.ModelSerializer):
@@ -53,7 +77,16 @@ class DepartmentSerializer(serializers.ModelSerializer):
                   'doctor_count', 'created_at']
         read_only_fields = ['id', 'created_at', 'doctor_count']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Count active doctors in the same query instead of once per department"""
+        return queryset.select_related('hospital').annotate(
+            active_doctor_count=Count('doctors', filter=Q(doctors__is_active=True))
+        )
+    
     def get_doctor_count(self, obj):
+        if hasattr(obj, 'active_doctor_count'):
+            return obj.active_doctor_count
         return obj.doctors.filter(is_active=True).count()
 
 
@@ -108,6 +141,21 @@ class BedSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class BedOccupancySerializer(serializers.ModelSerializer):
+    """Serializer for a patient's stay in a bed"""
+    hospital = serializers.IntegerField(source='bed.hospital_id', read_only=True)
+    bed_number = serializers.CharField(source='bed.bed_number', read_only=True)
+    bed_type = serializers.CharField(source='bed.bed_type', read_only=True)
+    ward = serializers.CharField(source='bed.ward', read_only=True)
+    patient_name = serializers.CharField(source='patient.user.full_name', read_only=True, default=None)
+    
+    class Meta:
+        model = BedOccupancy
+        fields = ['id', 'bed', 'hospital', 'bed_number', 'bed_type', 'ward', 'patient', 'patient_name',
+                  'appointment', 'admitted_at', 'discharged_at', 'admitted_by', 'discharged_by', 'notes']
+        read_only_fields = fields
+
+
 class OperationTheaterSerializer(serializers.ModelSerializer):
     """Serializer for Operation Theater"""
     hospital_name = serializers.CharField(source='hospital.name', read_only=True)
@@ -118,6 +166,31 @@ class OperationTheaterSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class OTBookingSerializer(serializers.ModelSerializer):
+    """Serializer for an operation theater booking"""
+    theater_name = serializers.CharField(source='theater.name', read_only=True)
+    hospital = serializers.IntegerField(source='theater.hospital_id', read_only=True)
+    surgeon_name = serializers.CharField(source='surgeon.user.full_name', read_only=True, default=None)
+    
+    class Meta:
+        model = OTBooking
+        fields = ['id', 'theater', 'theater_name', 'hospital', 'surgeon', 'surgeon_name', 'patient', 'procedure',
+                  'starts_at', 'ends_at', 'status', 'notes', 'created_by', 'created_at']
+        read_only_fields = ['id', 'created_by', 'created_at']
+    
+    def validate(self, attrs):
+        starts_at = attrs.get('starts_at', getattr(self.instance, 'starts_at', None))
+        ends_at = attrs.get('ends_at', getattr(self.instance, 'ends_at', None))
+        if ends_at <= starts_at:
+            raise serializers.ValidationError({'ends_at': 'Must be after starts_at'})
+        if (ends_at - starts_at).total_seconds() > MAX_BOOKING_HOURS * 3600:
+            raise serializers.ValidationError({'ends_at': f'Bookings cannot be longer than {MAX_BOOKING_HOURS} hours'})
+        theater = attrs.get('theater', getattr(self.instance, 'theater', None))
+        if self.instance is None and not theater.is_available:
+            raise serializers.ValidationError({'theater': 'Operation theater is not available'})
+        return attrs
+
+
 class EmergencyCapacitySerializer(serializers.ModelSerializer):
     """Serializer for Emergency Capacity"""
     hospital_name = serializers.CharField(source='hospital.name', read_only=True)
@@ -139,3 +212,42 @@ class OPDScheduleSerializer(serializers.ModelSerializer):
         fields = ['id', 'doctor', 'doctor_name', 'hospital_name', 'day', 'start_time', 
                   'end_time', 'is_active', 'max_appointments']
         read_only_fields = ['id']
+    
+    def validate(self, attrs):
+        doctor = attrs.get('doctor', getattr(self.instance, 'doctor', None))
+        day = attrs.get('day', getattr(self.instance, 'day', None))
+        start_time = attrs.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = attrs.get('end_time', getattr(self.instance, 'end_time', None))
+        if end_time <= start_time:
+            raise serializers.ValidationError({'end_time': 'Must be after start_time'})
+        if not attrs.get('is_active', getattr(self.instance, 'is_active', True)):
+            return attrs
+        
+        # The doctor's other active windows that day must not overlap this one
+        others = OPDSchedule.objects.filter(doctor=doctor, day=day, is_active=True)
+        if self.instance is not None:
+            others = others.exclude(id=self.instance.id)
+        index = IntervalIndex(others.values_list('start_time', 'end_time', 'id'))
+        conflicts = index.conflicts(start_time, end_time)
+        if conflicts:
+            raise serializers.ValidationError(
+                {'start_time': f'Overlaps the doctor\'s existing OPD schedule(s) {conflicts} on {day}'}
+            )
+        return attrs
+
+
+class DoctorBlockedTimeSerializer(serializers.ModelSerializer):
+    """Serializer for a doctor's blocked (leave) time"""
+    doctor_name = serializers.CharField(source='doctor.user.full_name', read_only=True)
+    
+    class Meta:
+        model = DoctorBlockedTime
+        fields = ['id', 'doctor', 'doctor_name', 'starts_at', 'ends_at', 'reason', 'created_by', 'created_at']
+        read_only_fields = ['id', 'created_by', 'created_at']
+    
+    def validate(self, attrs):
+        starts_at = attrs.get('starts_at', getattr(self.instance, 'starts_at', None))
+        ends_at = attrs.get('ends_at', getattr(self.instance, 'ends_at', None))
+        if starts_at and ends_at and ends_at <= starts_at:
+            raise serializers.ValidationError({'ends_at': 'Must be after starts_at'})
+        return attrs
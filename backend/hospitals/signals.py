@@ -0,0 +1,87 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Hospital, Department, Doctor, Bed, EmergencyCapacity, HospitalStats
+from .cache import bump_hospital_version
+from .nearest import coordinate_cache
+from .routing import invalidate_snapshot
+from . import events, stats
+
+
+@receiver([post_save, post_delete], sender=Hospital)
+def invalidate_hospital_coordinates(sender, instance, **kwargs):
+    """Drop cached coordinate arrays so nearest-hospital search sees the change"""
+    coordinate_cache.invalidate()
+    invalidate_snapshot()
+
+
+@receiver(post_save, sender=Hospital)
+def create_hospital_stats(sender, instance, created, **kwargs):
+    if created:
+        HospitalStats.objects.get_or_create(hospital=instance)
+
+
+@receiver([post_save, post_delete], sender=Hospital)
+def invalidate_hospital_responses(sender, instance, **kwargs):
+    bump_hospital_version(instance.id)
+
+
+@receiver(pre_save, sender=Doctor)
+@receiver(pre_save, sender=Bed)
+def remember_previous_hospital(sender, instance, **kwargs):
+    """Record the stored hospital so a move refreshes the old hospital's counters too"""
+    instance._previous_hospital_id = None
+    if instance.pk:
+        instance._previous_hospital_id = sender.objects.filter(pk=instance.pk).values_list(
+            'hospital_id', flat=True
+        ).first()
+
+
+def _affected_hospitals(instance):
+    hospital_ids = {instance.hospital_id}
+    previous = getattr(instance, '_previous_hospital_id', None)
+    if previous:
+        hospital_ids.add(previous)
+    return hospital_ids
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def update_doctor_count(sender, instance, **kwargs):
+    for hospital_id in _affected_hospitals(instance):
+        stats.refresh_doctor_count(hospital_id)
+
+
+@receiver([post_save, post_delete], sender=Bed)
+def update_bed_stats(sender, instance, **kwargs):
+    for hospital_id in _affected_hospitals(instance):
+        changed = stats.refresh_bed_stats(hospital_id)
+        if changed:
+            events.publish(hospital_id, 'beds', {'changes': changed})
+            if any(row['bed_type'] == 'ICU' for row in changed):
+                invalidate_snapshot()
+
+
+@receiver([post_save, post_delete], sender=EmergencyCapacity)
+def update_emergency_wait_time(sender, instance, **kwargs):
+    stats.refresh_emergency_wait_time(instance.hospital_id)
+    invalidate_snapshot()
+
+
+@receiver(post_save, sender=EmergencyCapacity)
+def publish_emergency_capacity(sender, instance, **kwargs):
+    events.publish(instance.hospital_id, 'emergency_capacity', {
+        'total_capacity': instance.total_capacity,
+        'current_occupancy': instance.current_occupancy,
+        'wait_time_minutes': instance.wait_time_minutes,
+        'ventilators_available': instance.ventilators_available,
+        'ventilators_total': instance.ventilators_total,
+    })
+
+
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Doctor)
+@receiver([post_save, post_delete], sender=Bed)
+@receiver([post_save, post_delete], sender=EmergencyCapacity)
+def invalidate_related_responses(sender, instance, **kwargs):
+    """Bump the discovery cache version after the denormalized counters are refreshed"""
+    for hospital_id in _affected_hospitals(instance):
+        bump_hospital_version(hospital_id)
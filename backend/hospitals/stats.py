@@ -0,0 +1,60 @@
+"""
+Maintenance of the denormalized HospitalStats / HospitalBedStats rows.
+
+Each refresh recomputes one hospital's counters with a single aggregate
+query over indexed columns, so writes to Doctor, Bed and EmergencyCapacity
+stay cheap while HospitalSerializer only reads precomputed values.
+"""
+from django.db.models import Count, Q
+from .models import Doctor, Bed, EmergencyCapacity, HospitalStats, HospitalBedStats
+
+
+def refresh_doctor_count(hospital_id):
+    doctor_count = Doctor.objects.filter(hospital_id=hospital_id, is_active=True, is_approved=True).count()
+    HospitalStats.objects.update_or_create(hospital_id=hospital_id, defaults={'doctor_count': doctor_count})
+
+
+def refresh_emergency_wait_time(hospital_id):
+    wait_time = EmergencyCapacity.objects.filter(hospital_id=hospital_id).values_list(
+        'wait_time_minutes', flat=True
+    ).first()
+    HospitalStats.objects.update_or_create(hospital_id=hospital_id, defaults={'emergency_wait_time': wait_time})
+
+
+def refresh_bed_stats(hospital_id):
+    """Recompute per-type bed counts, returning the rows that changed"""
+    counts = {
+        row['bed_type']: row
+        for row in Bed.objects.filter(hospital_id=hospital_id).values('bed_type').annotate(
+            total=Count('id'),
+            available=Count('id', filter=Q(is_available=True, is_occupied=False)),
+        )
+    }
+    existing = {stats.bed_type: stats for stats in HospitalBedStats.objects.filter(hospital_id=hospital_id)}
+    changed = []
+    
+    for bed_type, row in counts.items():
+        stats = existing.pop(bed_type, None)
+        if stats is None:
+            HospitalBedStats.objects.create(hospital_id=hospital_id, bed_type=bed_type,
+                                            total=row['total'], available=row['available'])
+        elif (stats.total, stats.available) != (row['total'], row['available']):
+            stats.total = row['total']
+            stats.available = row['available']
+            stats.save(update_fields=['total', 'available', 'updated_at'])
+        else:
+            continue
+        changed.append({'bed_type': bed_type, 'total': row['total'], 'available': row['available']})
+    
+    # Bed types the hospital no longer has
+    if existing:
+        HospitalBedStats.objects.filter(id__in=[stats.id for stats in existing.values()]).delete()
+        changed.extend({'bed_type': bed_type, 'total': 0, 'available': 0} for bed_type in existing)
+    return changed
+
+
+def refresh_hospital_stats(hospital_id):
+    """Recompute every denormalized counter for one hospital"""
+    refresh_doctor_count(hospital_id)
+    refresh_emergency_wait_time(hospital_id)
+    refresh_bed_stats(hospital_id)
@@ -0,0 +1,132 @@
+from datetime import timedelta
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from users.models import User
+from .beds import NoBedAvailable, allocate_bed, discharge
+from .intervals import IntervalIndex
+from .models import Bed, BedOccupancy, Doctor, Hospital, HospitalBedStats, OperationTheater
+from .theaters import BookingConflict, book_theater
+
+
+def create_hospital(name):
+    return Hospital.objects.create(
+        name=name, address='1 Main Road', city='Pune', state='Maharashtra', pincode='411001',
+        phone='0000000000', email='info@hospital.test', license_number=name, is_approved=True
+    )
+
+
+class IntervalIndexTests(SimpleTestCase):
+    """Half-open interval overlap checks"""
+
+    def test_touching_intervals_do_not_overlap(self):
+        index = IntervalIndex([(10, 20, 'a')])
+        self.assertFalse(index.overlaps(0, 10))
+        self.assertFalse(index.overlaps(20, 30))
+        self.assertTrue(index.overlaps(19, 21))
+        self.assertTrue(index.overlaps(0, 30))
+
+    def test_conflicts_behind_a_long_interval(self):
+        # The short interval starts later but ends first; the running maximum must still see the long one
+        index = IntervalIndex([(0, 100, 'long'), (10, 20, 'short')])
+        self.assertEqual(index.conflicts(50, 60), ['long'])
+        self.assertEqual(index.conflicts(15, 16), ['long', 'short'])
+        self.assertEqual(index.conflicts(100, 110), [])
+
+    def test_add_keeps_the_index_consistent(self):
+        index = IntervalIndex([(30, 40, 'b')])
+        index.add(0, 35, 'a')
+        self.assertEqual(index.conflicts(32, 33), ['a', 'b'])
+        self.assertEqual(len(index), 2)
+
+    def test_first_gap(self):
+        index = IntervalIndex([(10, 20, 'a'), (25, 40, 'b')])
+        self.assertEqual(index.first_gap(0, 100, 10), 0)
+        self.assertEqual(index.first_gap(5, 100, 10), 40)
+        self.assertEqual(index.first_gap(5, 100, 5), 5)
+        self.assertEqual(index.first_gap(12, 100, 5), 20)
+        self.assertIsNone(index.first_gap(5, 45, 10))
+
+
+class TheaterBookingTests(TestCase):
+    """Operation theater and surgeon conflicts"""
+
+    def setUp(self):
+        self.hospital = create_hospital('Hospital A')
+        self.theater = OperationTheater.objects.create(hospital=self.hospital, name='OT 1', ot_number='1')
+        self.other_theater = OperationTheater.objects.create(hospital=self.hospital, name='OT 2', ot_number='2')
+        user = User.objects.create_user(email='surgeon@a.test', password='password', first_name='Test',
+                                        last_name='Surgeon', role='DOCTOR')
+        self.surgeon = Doctor.objects.create(user=user, hospital=self.hospital, specialization='Surgery',
+                                             qualification='MS', license_number='S1', consultation_fee=500)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def book(self, theater, start_hours, end_hours, surgeon=None):
+        return book_theater(theater, self.start + timedelta(hours=start_hours),
+                            self.start + timedelta(hours=end_hours), surgeon=surgeon, procedure='Appendectomy')
+
+    def test_overlapping_booking_is_rejected(self):
+        self.book(self.theater, 0, 2)
+        with self.assertRaises(BookingConflict):
+            self.book(self.theater, 1, 3)
+
+    def test_back_to_back_bookings_are_allowed(self):
+        self.book(self.theater, 0, 2)
+        self.book(self.theater, 2, 4)
+        self.book(self.theater, -2, 0)
+
+    def test_surgeon_cannot_be_in_two_theaters(self):
+        self.book(self.theater, 0, 2, surgeon=self.surgeon)
+        with self.assertRaises(BookingConflict):
+            self.book(self.other_theater, 1, 3, surgeon=self.surgeon)
+        self.book(self.other_theater, 1, 3)
+
+
+class BedAllocationTests(TestCase):
+    """Bed allocation and the available-bed counters"""
+
+    def setUp(self):
+        self.hospital = create_hospital('Hospital A')
+        for number in ['ICU-1', 'ICU-2']:
+            Bed.objects.create(hospital=self.hospital, bed_number=number, bed_type='ICU', ward='North')
+        Bed.objects.create(hospital=self.hospital, bed_number='ICU-3', bed_type='ICU', ward='South')
+
+    def available(self):
+        return HospitalBedStats.objects.get(hospital=self.hospital, bed_type='ICU').available
+
+    def test_allocation_prefers_the_requested_ward(self):
+        occupancy = allocate_bed(self.hospital.id, 'ICU', ward='South')
+        self.assertEqual(occupancy.bed.bed_number, 'ICU-3')
+        self.assertTrue(Bed.objects.get(bed_number='ICU-3').is_occupied)
+
+    def test_allocation_stops_when_beds_run_out(self):
+        for _ in range(3):
+            allocate_bed(self.hospital.id, 'ICU')
+        self.assertEqual(self.available(), 0)
+        with self.assertRaises(NoBedAvailable):
+            allocate_bed(self.hospital.id, 'ICU')
+        self.assertEqual(BedOccupancy.objects.count(), 3)
+
+    def test_discharge_frees_the_bed(self):
+        occupancy = allocate_bed(self.hospital.id, 'ICU')
+        self.assertEqual(self.available(), 2)
+        self.assertIsNotNone(discharge(occupancy.id))
+        self.assertEqual(self.available(), 3)
+        self.assertFalse(Bed.objects.get(id=occupancy.bed_id).is_occupied)
+        # A second discharge of the same admission is a no-op
+        self.assertIsNone(discharge(occupancy.id))
+        self.assertEqual(self.available(), 3)
+
+    def test_discharge_is_limited_to_the_given_hospitals(self):
+        occupancy = allocate_bed(self.hospital.id, 'ICU')
+        other = create_hospital('Hospital B')
+        self.assertIsNone(discharge(occupancy.id, hospital_ids=[other.id]))
+        self.assertEqual(self.available(), 2)
+
+    def test_discharge_after_a_manual_release_does_not_overcount(self):
+        occupancy = allocate_bed(self.hospital.id, 'ICU')
+        bed = Bed.objects.get(id=occupancy.bed_id)
+        bed.is_occupied = False
+        bed.save()
+        self.assertEqual(self.available(), 3)
+        self.assertIsNotNone(discharge(occupancy.id))
+        self.assertEqual(self.available(), 3)
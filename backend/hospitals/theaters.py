@@ -0,0 +1,109 @@
+"""
+Operation theater booking.
+
+Conflicts are checked with ``IntervalIndex`` over the bookings a bounded
+range query returns: bookings can last at most ``MAX_BOOKING_HOURS``, so
+everything that can overlap ``[start, end)`` starts after
+``start - MAX_BOOKING_HOURS`` and is found through the ``(theater,
+starts_at)`` and ``(surgeon, starts_at)`` indexes. A surgeon is checked
+across every hospital's theaters, so a visiting surgeon cannot be booked
+in two places at once. Bookings lock the theater row (and then the
+surgeon row) so concurrent bookings for the same theater serialize.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .intervals import IntervalIndex
+from .models import Doctor, OperationTheater, OTBooking
+
+ACTIVE_BOOKING_STATUSES = ['SCHEDULED', 'IN_PROGRESS']
+MAX_BOOKING_HOURS = 24
+
+
+class BookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The operation theater or surgeon is already booked.'
+    default_code = 'booking_conflict'
+
+
+def _active_bookings(start, end, exclude_id=None):
+    bookings = OTBooking.objects.filter(
+        status__in=ACTIVE_BOOKING_STATUSES,
+        starts_at__gt=start - timedelta(hours=MAX_BOOKING_HOURS),
+        starts_at__lt=end,
+    )
+    if exclude_id:
+        bookings = bookings.exclude(id=exclude_id)
+    return bookings
+
+
+def theater_indexes(theater_ids, start, end, exclude_id=None):
+    """{theater_id: IntervalIndex} of the active bookings that can overlap ``[start, end)``"""
+    indexes = defaultdict(IntervalIndex)
+    bookings = _active_bookings(start, end, exclude_id).filter(theater_id__in=theater_ids).values_list(
+        'theater_id', 'starts_at', 'ends_at', 'id'
+    )
+    for theater_id, starts_at, ends_at, booking_id in bookings:
+        indexes[theater_id].add(starts_at, ends_at, booking_id)
+    return indexes
+
+
+def surgeon_index(surgeon_id, start, end, exclude_id=None):
+    """IntervalIndex of a surgeon's active bookings in any hospital that can overlap ``[start, end)``"""
+    bookings = _active_bookings(start, end, exclude_id).filter(surgeon_id=surgeon_id).values_list(
+        'starts_at', 'ends_at', 'id'
+    )
+    return IntervalIndex(bookings)
+
+
+def check_booking(theater_id, surgeon_id, starts_at, ends_at, exclude_id=None):
+    """Raise BookingConflict when the theater or surgeon is busy during ``[starts_at, ends_at)``"""
+    conflicts = theater_indexes([theater_id], starts_at, ends_at, exclude_id)[theater_id].conflicts(
+        starts_at, ends_at
+    )
+    if conflicts:
+        raise BookingConflict({'error': 'Operation theater is already booked at this time',
+                               'conflicting_bookings': conflicts})
+    if surgeon_id:
+        conflicts = surgeon_index(surgeon_id, starts_at, ends_at, exclude_id).conflicts(starts_at, ends_at)
+        if conflicts:
+            raise BookingConflict({'error': 'Surgeon is already booked at this time',
+                                   'conflicting_bookings': conflicts})
+
+
+def lock_and_check(theater_id, surgeon_id, starts_at, ends_at, exclude_id=None):
+    """Lock the theater and surgeon, then check for conflicts; must run inside ``transaction.atomic``"""
+    OperationTheater.objects.select_for_update().filter(id=theater_id).first()
+    if surgeon_id:
+        Doctor.objects.select_for_update().filter(id=surgeon_id).first()
+    check_booking(theater_id, surgeon_id, starts_at, ends_at, exclude_id)
+
+
+def book_theater(theater, starts_at, ends_at, surgeon=None, **fields):
+    """Create an OTBooking after checking the theater and surgeon are free"""
+    with transaction.atomic():
+        lock_and_check(theater.id, surgeon.id if surgeon else None, starts_at, ends_at)
+        return OTBooking.objects.create(theater=theater, surgeon=surgeon, starts_at=starts_at, ends_at=ends_at,
+                                        **fields)
+
+
+def earliest_window(theaters, duration, after, until, surgeon_id=None):
+    """
+    Earliest (theater, start) where ``duration`` fits in a theater before
+    ``until``, also avoiding the surgeon's bookings when given; None when
+    nothing fits. Costs two queries however many theaters are searched.
+    """
+    theaters = list(theaters)
+    indexes = theater_indexes([theater.id for theater in theaters], after, until)
+    busy = surgeon_index(surgeon_id, after, until) if surgeon_id else IntervalIndex()
+    best = None
+    for theater in theaters:
+        index = indexes[theater.id]
+        for starts_at, ends_at, _, booking_id in busy.items:
+            index.add(starts_at, ends_at, booking_id)
+        start = index.first_gap(after, until, duration)
+        if start is not None and (best is None or start < best[1]):
+            best = (theater, start)
+    return best
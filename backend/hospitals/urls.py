@@ -1,26 +1,41 @@
 from django.urls import path
 from .views import (
-    HospitalListCreateAPIView, HospitalDetailAPIView, hospital_map_discovery,
-    DepartmentListCreateAPIView,
+    HospitalListCreateAPIView, HospitalDetailAPIView, hospital_map_discovery, hospital_nearest,
+    hospital_emergency_route, DepartmentListCreateAPIView,
     DoctorListCreateAPIView, approve_doctor,
     DoctorApplicationListCreateAPIView, DoctorApplicationDetailAPIView,
-    BedListCreateAPIView, OperationTheaterListCreateAPIView, EmergencyCapacityDetailAPIView,
-    OPDScheduleListCreateAPIView, OPDScheduleDetailAPIView
+    BedListCreateAPIView, OperationTheaterListCreateAPIView, EmergencyCapacityDetailAPIView, hospital_events,
+    OPDScheduleListCreateAPIView, OPDScheduleDetailAPIView,
+    DoctorBlockedTimeListCreateAPIView, DoctorBlockedTimeDetailAPIView,
+    OTBookingListCreateAPIView, OTBookingDetailAPIView, ot_earliest_window,
+    BedOccupancyListAPIView, allocate_bed_view, discharge_bed, hospital_bed_forecast
 )
 
 urlpatterns = [
     path('', HospitalListCreateAPIView.as_view(), name='hospital_list_create'),
     path('map-discovery/', hospital_map_discovery, name='hospital_map_discovery'),
+    path('nearest/', hospital_nearest, name='hospital_nearest'),
+    path('emergency-route/', hospital_emergency_route, name='hospital_emergency_route'),
     path('<int:pk>/', HospitalDetailAPIView.as_view(), name='hospital_detail'),
+    path('<int:hospital_id>/events/', hospital_events, name='hospital_events'),
+    path('<int:hospital_id>/bed-forecast/', hospital_bed_forecast, name='hospital_bed_forecast'),
     path('departments/', DepartmentListCreateAPIView.as_view(), name='department_list_create'),
     path('doctors/', DoctorListCreateAPIView.as_view(), name='doctor_list_create'),
     path('doctors/<int:doctor_id>/approve/', approve_doctor, name='approve_doctor'),
     path('doctor-applications/', DoctorApplicationListCreateAPIView.as_view(), name='doctor_application_list_create'),
     path('doctor-applications/<int:pk>/', DoctorApplicationDetailAPIView.as_view(), name='doctor_application_detail'),
     path('beds/', BedListCreateAPIView.as_view(), name='bed_list_create'),
+    path('beds/allocate/', allocate_bed_view, name='allocate_bed'),
+    path('beds/occupancies/', BedOccupancyListAPIView.as_view(), name='bed_occupancy_list'),
+    path('beds/occupancies/<int:occupancy_id>/discharge/', discharge_bed, name='discharge_bed'),
     path('operation-theaters/', OperationTheaterListCreateAPIView.as_view(), name='ot_list_create'),
+    path('operation-theaters/earliest-window/', ot_earliest_window, name='ot_earliest_window'),
+    path('ot-bookings/', OTBookingListCreateAPIView.as_view(), name='ot_booking_list_create'),
+    path('ot-bookings/<int:pk>/', OTBookingDetailAPIView.as_view(), name='ot_booking_detail'),
     path('emergency-capacity/<int:pk>/', EmergencyCapacityDetailAPIView.as_view(), name='emergency_capacity_detail'),
     path('opd-schedules/', OPDScheduleListCreateAPIView.as_view(), name='opd_schedule_list_create'),
     path('opd-schedules/<int:pk>/', OPDScheduleDetailAPIView.as_view(), name='opd_schedule_detail'),
+    path('blocked-times/', DoctorBlockedTimeListCreateAPIView.as_view(), name='blocked_time_list_create'),
+    path('blocked-times/<int:pk>/', DoctorBlockedTimeDetailAPIView.as_view(), name='blocked_time_detail'),
 ]
 
@@ -1,27 +1,36 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
-from django.db.models import Q
+from datetime import timedelta
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from math import radians, cos, sin, asin, sqrt
-from .models import Hospital, Department, Doctor, DoctorApplication, OPDSchedule, Bed, OperationTheater, EmergencyCapacity
+from django.utils.dateparse import parse_datetime
+from .models import (
+    Hospital, Department, Doctor, DoctorApplication, OPDSchedule, DoctorBlockedTime, Bed, OperationTheater,
+    OTBooking, BedOccupancy, EmergencyCapacity, HospitalBedStats
+)
 from .serializers import (
     HospitalSerializer, DepartmentSerializer, DoctorSerializer, DoctorApplicationSerializer,
-    OPDScheduleSerializer, BedSerializer, OperationTheaterSerializer, EmergencyCapacitySerializer
+    OPDScheduleSerializer, DoctorBlockedTimeSerializer, BedSerializer, OperationTheaterSerializer,
+    OTBookingSerializer, BedOccupancySerializer, EmergencyCapacitySerializer
 )
-from .permissions import IsHospitalAdmin, IsSuperAdmin, IsOperationsManager
+from .permissions import IsHospitalAdmin, IsSuperAdmin, IsOperationsManager, IsHospitalStaff, staff_hospital_ids
+from .geo import filter_within_radius
+from .nearest import nearest_hospitals
+from .routing import route_emergency
+from .cache import cached_response, cache_public_response
+from .beds import allocate_bed, discharge
+from .forecasting import DEFAULT_HORIZON_HOURS, MAX_HORIZON_HOURS, forecast_beds
+from .theaters import MAX_BOOKING_HOURS, earliest_window, lock_and_check
+from . import events
 from users.models import AuditLog
 
-
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points using Haversine formula"""
-    R = 6371  # Earth radius in kilometers
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
+MAX_NEAREST_LIMIT = 100
+MAX_OT_SEARCH_DAYS = 60
 
 
 class HospitalListCreateAPIView(generics.ListCreateAPIView):
@@ -66,7 +75,7 @@ class HospitalListCreateAPIView(generics.ListCreateAPIView):
         if opd_open == 'true':
             queryset = queryset.filter(opd_open=True)
         if icu_available == 'true':
-            queryset = queryset.filter(beds__bed_type='ICU', beds__is_available=True).distinct()
+            queryset = queryset.filter(bed_stats__bed_type='ICU', bed_stats__available__gt=0)
         if open_now == 'true':
             # Check if current time is within OPD hours (simplified)
             queryset = queryset.filter(opd_open=True)
@@ -78,15 +87,8 @@ class HospitalListCreateAPIView(generics.ListCreateAPIView):
                 lon = float(longitude)
                 radius = float(radius_km)
                 
-                # Filter hospitals within radius
-                nearby_hospitals = []
-                for hospital in queryset:
-                    if hospital.latitude and hospital.longitude:
-                        distance = calculate_distance(lat, lon, float(hospital.latitude), float(hospital.longitude))
-                        if distance <= radius:
-                            nearby_hospitals.append(hospital.id)
-                
-                queryset = queryset.filter(id__in=nearby_hospitals)
+                # Filter hospitals within radius (bounding box + geohash cells, then exact distance)
+                queryset = filter_within_radius(queryset, lat, lon, radius)
             except (ValueError, TypeError):
                 pass
         
@@ -95,7 +97,16 @@ class HospitalListCreateAPIView(generics.ListCreateAPIView):
             queryset = queryset.filter(doctors__specialization__icontains=specialization,
                                       doctors__is_active=True, doctors__is_approved=True).distinct()
         
-        return queryset
+        # Hospitals predicted to run out of beds go last
+        queryset = queryset.annotate(filling_soon=Exists(HospitalBedStats.objects.filter(
+            hospital=OuterRef('pk'), bed_type=forecast_bed_type(self.request.query_params),
+            forecast_available__lte=0
+        ))).order_by('filling_soon', 'id')
+        
+        return HospitalSerializer.setup_eager_loading(queryset)
+    
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, lambda: super(HospitalListCreateAPIView, self).list(request, *args, **kwargs))
     
     def perform_create(self, serializer):
         # Only Super Admin can create hospitals
@@ -104,45 +115,131 @@ class HospitalListCreateAPIView(generics.ListCreateAPIView):
         serializer.save()
 
 
+def filter_discovery_queryset(queryset, params):
+    """Apply the specialization/status filters shared by the discovery endpoints"""
+    specialization = params.get('specialization')
+    emergency = params.get('emergency_available') == 'true'
+    opd_open = params.get('opd_open') == 'true'
+    icu = params.get('icu_available') == 'true'
+    
+    if specialization:
+        queryset = queryset.filter(doctors__specialization__icontains=specialization).distinct()
+    if emergency:
+        queryset = queryset.filter(emergency_available=True)
+    if opd_open:
+        queryset = queryset.filter(opd_open=True)
+    if icu:
+        # One HospitalBedStats row per (hospital, bed_type), so no join fan-out to undo
+        queryset = queryset.filter(bed_stats__bed_type='ICU', bed_stats__available__gt=0)
+    return queryset
+
+
+def forecast_bed_type(params):
+    """Bed type whose forecast decides whether a hospital is about to fill up"""
+    return 'ICU' if params.get('icu_available') == 'true' else 'GENERAL'
+
+
+def is_filling_soon(hospital, bed_type):
+    """Whether the stored forecast says this bed type runs out within a day; reads prefetched bed_stats"""
+    return any(
+        stats.bed_type == bed_type and stats.forecast_available is not None and stats.forecast_available <= 0
+        for stats in hospital.bed_stats.all()
+    )
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cache_public_response
 def hospital_map_discovery(request):
     """Map-based hospital discovery with filters"""
     latitude = request.query_params.get('latitude')
     longitude = request.query_params.get('longitude')
     radius = float(request.query_params.get('radius', 50))
     
-    specialization = request.query_params.get('specialization')
-    emergency = request.query_params.get('emergency_available') == 'true'
-    opd_open = request.query_params.get('opd_open') == 'true'
-    icu = request.query_params.get('icu_available') == 'true'
-    
     queryset = Hospital.objects.filter(is_active=True, is_approved=True)
     
     if latitude and longitude:
         lat = float(latitude)
         lon = float(longitude)
-        nearby = []
-        for hospital in queryset:
-            if hospital.latitude and hospital.longitude:
-                dist = calculate_distance(lat, lon, float(hospital.latitude), float(hospital.longitude))
-                if dist <= radius:
-                    nearby.append(hospital.id)
-        queryset = queryset.filter(id__in=nearby)
+        queryset = filter_within_radius(queryset, lat, lon, radius)
     
-    if specialization:
-        queryset = queryset.filter(doctors__specialization__icontains=specialization).distinct()
-    if emergency:
-        queryset = queryset.filter(emergency_available=True)
-    if opd_open:
-        queryset = queryset.filter(opd_open=True)
-    if icu:
-        queryset = queryset.filter(beds__bed_type='ICU', beds__is_available=True).distinct()
+    queryset = filter_discovery_queryset(queryset, request.query_params)
+    queryset = HospitalSerializer.setup_eager_loading(queryset)
     
-    serializer = HospitalSerializer(queryset, many=True)
+    # Stable sort: hospitals about to fill up go last, otherwise the order is unchanged
+    bed_type = forecast_bed_type(request.query_params)
+    hospitals = sorted(queryset, key=lambda hospital: is_filling_soon(hospital, bed_type))
+    serializer = HospitalSerializer(hospitals, many=True)
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@cache_public_response
+def hospital_nearest(request):
+    """K-nearest hospitals ranked by distance, with distance_km per result"""
+    try:
+        lat = float(request.query_params['latitude'])
+        lon = float(request.query_params['longitude'])
+        limit = int(request.query_params.get('limit', 10))
+        radius = request.query_params.get('radius')
+        radius = float(radius) if radius else None
+    except (KeyError, ValueError, TypeError):
+        return Response({'error': 'latitude and longitude are required; limit and radius must be numeric'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    limit = max(1, min(limit, MAX_NEAREST_LIMIT))
+    sort = request.query_params.get('sort', 'distance')
+    if sort not in ('distance', 'name'):
+        return Response({'error': "sort must be 'distance' or 'name'"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Only hit the database for candidates when a filter narrows the set
+    queryset = Hospital.objects.filter(is_active=True, is_approved=True)
+    filtered = filter_discovery_queryset(queryset, request.query_params)
+    candidate_ids = None
+    if filtered is not queryset:
+        candidate_ids = filtered.values_list('id', flat=True)
+    
+    ranked = nearest_hospitals(lat, lon, limit, candidate_ids=candidate_ids, radius_km=radius)
+    hospitals = HospitalSerializer.setup_eager_loading(Hospital.objects.all()).in_bulk(
+        [hospital_id for hospital_id, _ in ranked]
+    )
+    
+    ranked = [(hospitals[hospital_id], distance) for hospital_id, distance in ranked if hospital_id in hospitals]
+    # Still nearest first, but hospitals about to fill up go after the rest
+    bed_type = forecast_bed_type(request.query_params)
+    ranked.sort(key=lambda item: is_filling_soon(item[0], bed_type))
+    results = HospitalSerializer([hospital for hospital, _ in ranked], many=True).data
+    for data, (_, distance) in zip(results, ranked):
+        data['distance_km'] = round(distance, 2)
+    
+    if sort == 'name':
+        results.sort(key=lambda item: item['name'])
+    return Response(results)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def hospital_emergency_route(request):
+    """Hospitals that can take an emergency patient, ranked by distance plus a capacity penalty"""
+    try:
+        lat = float(request.query_params['latitude'])
+        lon = float(request.query_params['longitude'])
+        limit = int(request.query_params.get('limit', 5))
+        radius = request.query_params.get('radius')
+        radius = float(radius) if radius else None
+    except (KeyError, ValueError, TypeError):
+        return Response({'error': 'latitude and longitude are required; limit and radius must be numeric'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    results = route_emergency(
+        lat, lon, max(1, min(limit, MAX_NEAREST_LIMIT)), radius_km=radius,
+        needs_icu=request.query_params.get('needs_icu') == 'true',
+        needs_ventilator=request.query_params.get('needs_ventilator') == 'true',
+    )
+    return Response(results)
+
+
 class HospitalDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a hospital"""
     queryset = Hospital.objects.all()
@@ -162,7 +259,7 @@ class DepartmentListCreateAPIView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        queryset = Department.objects.filter(is_active=True)
+        queryset = DepartmentSerializer.setup_eager_loading(Department.objects.filter(is_active=True))
         hospital_id = self.request.query_params.get('hospital', None)
         if hospital_id:
             queryset = queryset.filter(hospital_id=hospital_id)
@@ -176,7 +273,7 @@ class DoctorListCreateAPIView(generics.ListCreateAPIView):
     permission_classes = [permissions.AllowAny]
     
     def get_queryset(self):
-        queryset = Doctor.objects.filter(is_active=True, is_approved=True)
+        queryset = Doctor.objects.filter(is_active=True, is_approved=True).select_related('user', 'hospital', 'department')
         
         hospital_id = self.request.query_params.get('hospital', None)
         department_id = self.request.query_params.get('department', None)
@@ -197,6 +294,10 @@ class DoctorListCreateAPIView(generics.ListCreateAPIView):
             )
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, lambda: super(DoctorListCreateAPIView, self).list(request, *args, **kwargs),
+                               hospital_param='hospital')
 
 
 class DoctorApplicationListCreateAPIView(generics.ListCreateAPIView):
@@ -303,6 +404,128 @@ class BedListCreateAPIView(generics.ListCreateAPIView):
         return queryset
 
 
+class BedOccupancyListAPIView(generics.ListAPIView):
+    """List bed occupancies (current admissions by default)"""
+    serializer_class = BedOccupancySerializer
+    permission_classes = [permissions.IsAuthenticated, IsHospitalStaff]
+    
+    def get_queryset(self):
+        queryset = BedOccupancy.objects.select_related('bed', 'patient__user')
+        hospital_ids = staff_hospital_ids(self.request.user)
+        if hospital_ids is None:
+            raise PermissionDenied("Can only view admissions in your hospital")
+        queryset = queryset.filter(bed__hospital_id__in=hospital_ids)
+        hospital_id = self.request.query_params.get('hospital', None)
+        bed_type = self.request.query_params.get('bed_type', None)
+        
+        if hospital_id:
+            queryset = queryset.filter(bed__hospital_id=hospital_id)
+        if bed_type:
+            queryset = queryset.filter(bed__bed_type=bed_type)
+        if self.request.query_params.get('include_discharged') != 'true':
+            queryset = queryset.filter(discharged_at__isnull=True)
+        
+        return queryset
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsHospitalStaff])
+def allocate_bed_view(request):
+    """Admit a patient to the best free bed of a type, preferring a ward"""
+    from appointments.models import Appointment, Patient
+    
+    try:
+        hospital_id = int(request.data.get('hospital'))
+    except (TypeError, ValueError):
+        return Response({'error': 'hospital is required'}, status=status.HTTP_400_BAD_REQUEST)
+    bed_type = request.data.get('bed_type')
+    if bed_type not in dict(Bed.BED_TYPE_CHOICES):
+        return Response({'error': 'Invalid bed_type'}, status=status.HTTP_400_BAD_REQUEST)
+    hospital_ids = staff_hospital_ids(request.user)
+    if hospital_ids is None or hospital_id not in hospital_ids:
+        raise PermissionDenied("Can only admit patients to your hospital")
+    
+    patient = appointment = None
+    try:
+        if request.data.get('patient_id'):
+            patient = Patient.objects.get(id=request.data['patient_id'])
+        if request.data.get('appointment_id'):
+            appointment = Appointment.objects.get(id=request.data['appointment_id'], hospital_id=hospital_id)
+            patient = patient or appointment.patient
+    except (Patient.DoesNotExist, Appointment.DoesNotExist, ValueError, TypeError):
+        return Response({'error': 'Patient or appointment not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    occupancy = allocate_bed(hospital_id, bed_type, ward=request.data.get('ward') or None, patient=patient,
+                             appointment=appointment, user=request.user, notes=request.data.get('notes', ''))
+    AuditLog.objects.create(
+        user=request.user,
+        action='BED_ALLOCATED',
+        resource_type='Bed',
+        resource_id=occupancy.bed_id,
+        ip_address=request.META.get('REMOTE_ADDR'),
+        details={'occupancy_id': occupancy.id, 'patient_id': patient.id if patient else None}
+    )
+    return Response(BedOccupancySerializer(occupancy).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsHospitalStaff])
+def discharge_bed(request, occupancy_id):
+    """Close an admission and free its bed"""
+    hospital_ids = staff_hospital_ids(request.user)
+    if hospital_ids is None:
+        raise PermissionDenied("Can only discharge patients from your hospital")
+    occupancy = discharge(occupancy_id, user=request.user, hospital_ids=hospital_ids)
+    if occupancy is None:
+        return Response({'error': 'Open admission not found'}, status=status.HTTP_404_NOT_FOUND)
+    AuditLog.objects.create(
+        user=request.user,
+        action='BED_RELEASED',
+        resource_type='Bed',
+        resource_id=occupancy.bed_id,
+        ip_address=request.META.get('REMOTE_ADDR'),
+        details={'occupancy_id': occupancy.id}
+    )
+    return Response(BedOccupancySerializer(occupancy).data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def hospital_bed_forecast(request, hospital_id):
+    """Hourly bed occupancy forecast per bed type for a hospital's director"""
+    is_director = (request.user.role == 'HOSPITAL_DIRECTOR'
+                   and Hospital.objects.filter(id=hospital_id, director=request.user).exists())
+    if request.user.role != 'SUPER_ADMIN' and not is_director:
+        raise PermissionDenied("Only the hospital's director can view bed forecasts")
+    
+    try:
+        hours = int(request.query_params.get('hours', DEFAULT_HORIZON_HOURS))
+    except (TypeError, ValueError):
+        return Response({'error': 'hours must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    hours = max(1, min(hours, MAX_HORIZON_HOURS))
+    bed_type = request.query_params.get('bed_type')
+    if bed_type and bed_type not in dict(Bed.BED_TYPE_CHOICES):
+        return Response({'error': 'Invalid bed_type'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    now = timezone.now()
+    start = now.replace(minute=0, second=0, microsecond=0)
+    forecasts = forecast_beds([hospital_id], [bed_type] if bed_type else None, horizon=hours, now=now)
+    bed_types = {}
+    for (_, forecast_type), result in sorted(forecasts.items()):
+        total = result['total']
+        bed_types[forecast_type] = {
+            'total': total,
+            'occupied': result['occupied'],
+            'hours_until_full': result['hours_until_full'],
+            'forecast': [
+                {'at': start + timedelta(hours=offset + 1), 'occupied': int(occupied),
+                 'available': total - int(occupied)}
+                for offset, occupied in enumerate(result['forecast'])
+            ],
+        }
+    return Response({'hospital': hospital_id, 'generated_at': now, 'hours': hours, 'bed_types': bed_types})
+
+
 class OperationTheaterListCreateAPIView(generics.ListCreateAPIView):
     """List or create operation theaters"""
     queryset = OperationTheater.objects.all()
@@ -317,6 +540,120 @@ class OperationTheaterListCreateAPIView(generics.ListCreateAPIView):
         return queryset
 
 
+def _check_theater_access(user, theater):
+    if user.role == 'SUPER_ADMIN':
+        return
+    hospital_ids = staff_hospital_ids(user)
+    if hospital_ids is None or theater.hospital_id not in hospital_ids:
+        raise PermissionDenied("Can only book operation theaters in your hospital")
+
+
+def _visible_bookings(user, queryset):
+    """Operation theater bookings in the user's hospitals"""
+    if user.role == 'SUPER_ADMIN':
+        return queryset
+    hospital_ids = staff_hospital_ids(user)
+    if hospital_ids is None:
+        raise PermissionDenied("Can only view operation theaters in your hospital")
+    return queryset.filter(theater__hospital_id__in=hospital_ids)
+
+
+class OTBookingListCreateAPIView(generics.ListCreateAPIView):
+    """List or create operation theater bookings"""
+    serializer_class = OTBookingSerializer
+    permission_classes = [permissions.IsAuthenticated, IsHospitalStaff]
+    
+    def get_queryset(self):
+        queryset = _visible_bookings(self.request.user, OTBooking.objects.select_related('theater', 'surgeon__user'))
+        theater_id = self.request.query_params.get('theater', None)
+        hospital_id = self.request.query_params.get('hospital', None)
+        surgeon_id = self.request.query_params.get('surgeon', None)
+        day = self.request.query_params.get('date', None)
+        
+        if theater_id:
+            queryset = queryset.filter(theater_id=theater_id)
+        if hospital_id:
+            queryset = queryset.filter(theater__hospital_id=hospital_id)
+        if surgeon_id:
+            queryset = queryset.filter(surgeon_id=surgeon_id)
+        if day:
+            queryset = queryset.filter(starts_at__date=day)
+        
+        return queryset
+    
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        _check_theater_access(self.request.user, data['theater'])
+        surgeon = data.get('surgeon')
+        with transaction.atomic():
+            lock_and_check(data['theater'].id, surgeon.id if surgeon else None, data['starts_at'], data['ends_at'])
+            serializer.save(created_by=self.request.user)
+
+
+class OTBookingDetailAPIView(generics.RetrieveUpdateAPIView):
+    """Retrieve or update (reschedule, cancel, complete) an operation theater booking"""
+    serializer_class = OTBookingSerializer
+    permission_classes = [permissions.IsAuthenticated, IsHospitalStaff]
+    
+    def get_queryset(self):
+        return _visible_bookings(self.request.user, OTBooking.objects.select_related('theater', 'surgeon__user'))
+    
+    def perform_update(self, serializer):
+        booking = self.get_object()
+        _check_theater_access(self.request.user, booking.theater)
+        data = serializer.validated_data
+        theater = data.get('theater', booking.theater)
+        _check_theater_access(self.request.user, theater)
+        surgeon = data.get('surgeon', booking.surgeon)
+        with transaction.atomic():
+            if data.get('status', booking.status) in ['SCHEDULED', 'IN_PROGRESS']:
+                lock_and_check(theater.id, surgeon.id if surgeon else None,
+                               data.get('starts_at', booking.starts_at), data.get('ends_at', booking.ends_at),
+                               exclude_id=booking.id)
+            serializer.save()
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsHospitalStaff])
+def ot_earliest_window(request):
+    """Earliest free window of ``duration`` minutes in a hospital's operation theaters"""
+    try:
+        hospital_id = int(request.query_params.get('hospital'))
+    except (TypeError, ValueError):
+        return Response({'error': 'hospital is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        duration = int(request.query_params.get('duration', 60))
+        days = min(int(request.query_params.get('days', 7)), MAX_OT_SEARCH_DAYS)
+        surgeon_id = request.query_params.get('surgeon')
+        surgeon_id = int(surgeon_id) if surgeon_id else None
+    except ValueError:
+        return Response({'error': 'Invalid duration, days or surgeon'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < duration <= MAX_BOOKING_HOURS * 60 or days < 1:
+        return Response({'error': f'duration must be 1 to {MAX_BOOKING_HOURS * 60} minutes and days positive'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    after = timezone.now()
+    if request.query_params.get('after'):
+        after = parse_datetime(request.query_params['after'])
+        if after is None:
+            return Response({'error': 'Invalid after'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(after):
+            after = timezone.make_aware(after)
+    
+    theaters = OperationTheater.objects.filter(hospital_id=hospital_id, is_available=True).order_by('id')
+    window = earliest_window(theaters, timedelta(minutes=duration), after, after + timedelta(days=days), surgeon_id)
+    if window is None:
+        return Response({'error': f'No free window of {duration} minutes in the next {days} days'},
+                        status=status.HTTP_404_NOT_FOUND)
+    theater, starts_at = window
+    return Response({
+        'theater': theater.id,
+        'theater_name': theater.name,
+        'starts_at': starts_at,
+        'ends_at': starts_at + timedelta(minutes=duration),
+    })
+
+
 class EmergencyCapacityDetailAPIView(generics.RetrieveUpdateAPIView):
     """Get or update emergency capacity"""
     queryset = EmergencyCapacity.objects.all()
@@ -329,6 +666,32 @@ class EmergencyCapacityDetailAPIView(generics.RetrieveUpdateAPIView):
         return [permissions.AllowAny()]
 
 
+def hospital_events(request, hospital_id):
+    """
+    Server-sent events for one hospital's boards and capacity widgets.
+    
+    Pushes ``queue``, ``emergency_capacity`` and ``beds`` events as they
+    happen. Plain Django view, as DRF responses cannot stream; the stream
+    matches the server so neither WSGI nor ASGI buffers it.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not Hospital.objects.filter(id=hospital_id, is_active=True).exists():
+        return JsonResponse({'error': 'Hospital not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id is not None else None
+    except ValueError:
+        last_id = None
+    
+    stream = events.astream if isinstance(request, ASGIRequest) else events.stream
+    response = StreamingHttpResponse(stream(hospital_id, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, IsSuperAdmin])
 def approve_doctor(request, doctor_id):
@@ -382,3 +745,66 @@ class OPDScheduleDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = OPDSchedule.objects.all()
     serializer_class = OPDScheduleSerializer
     permission_classes = [permissions.IsAuthenticated, IsHospitalAdmin]
+
+
+def _check_doctor_calendar_access(user, doctor):
+    """Doctors manage their own calendar; hospital managers manage their doctors'"""
+    if user.role == 'SUPER_ADMIN':
+        return
+    if user.role == 'DOCTOR':
+        if doctor.user_id != user.id:
+            raise PermissionDenied("Can only block your own time")
+        return
+    hospital_ids = staff_hospital_ids(user)
+    if hospital_ids is None or doctor.hospital_id not in hospital_ids:
+        raise PermissionDenied("Can only block time for doctors in your hospital")
+
+
+def _visible_blocked_time(user, queryset):
+    """Leave of doctors in the user's hospitals; none for users without a hospital link (e.g. patients)"""
+    if user.role == 'SUPER_ADMIN':
+        return queryset
+    hospital_ids = staff_hospital_ids(user)
+    if hospital_ids is None:
+        return queryset.none()
+    return queryset.filter(doctor__hospital_id__in=hospital_ids)
+
+
+class DoctorBlockedTimeListCreateAPIView(generics.ListCreateAPIView):
+    """List or create doctor blocked time (leave)"""
+    serializer_class = DoctorBlockedTimeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = _visible_blocked_time(self.request.user, DoctorBlockedTime.objects.select_related('doctor__user'))
+        doctor_id = self.request.query_params.get('doctor', None)
+        hospital_id = self.request.query_params.get('hospital', None)
+        
+        if doctor_id:
+            queryset = queryset.filter(doctor_id=doctor_id)
+        if hospital_id:
+            queryset = queryset.filter(doctor__hospital_id=hospital_id)
+        # Past leave is only listed on request
+        if self.request.query_params.get('include_past') != 'true':
+            queryset = queryset.filter(ends_at__gt=timezone.now())
+        
+        return queryset
+    
+    def perform_create(self, serializer):
+        if self.request.user.role not in IsHospitalStaff.STAFF_ROLES + ['SUPER_ADMIN']:
+            raise PermissionDenied("Only hospital staff can block doctor time")
+        _check_doctor_calendar_access(self.request.user, serializer.validated_data['doctor'])
+        serializer.save(created_by=self.request.user)
+
+
+class DoctorBlockedTimeDetailAPIView(generics.RetrieveDestroyAPIView):
+    """Retrieve or remove doctor blocked time"""
+    serializer_class = DoctorBlockedTimeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return _visible_blocked_time(self.request.user, DoctorBlockedTime.objects.select_related('doctor__user'))
+    
+    def perform_destroy(self, instance):
+        _check_doctor_calendar_access(self.request.user, instance.doctor)
+        instance.delete()
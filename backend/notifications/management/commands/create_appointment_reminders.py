@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from notifications.models import Notification
+from notifications.reminders import CHUNK_SIZE, create_appointment_reminders
+
+
+class Command(BaseCommand):
+    help = 'Create reminder notifications for upcoming appointments (safe to run repeatedly, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None,
+                            help='Look-ahead window in hours (default: APPOINTMENT_REMINDER_HOURS)')
+        parser.add_argument('--type', dest='notification_type', default='PUSH',
+                            choices=[choice for choice, _ in Notification.TYPE_CHOICES])
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Count due reminders without creating them')
+
+    def handle(self, *args, **options):
+        count = create_appointment_reminders(
+            hours=options['hours'],
+            notification_type=options['notification_type'],
+            chunk_size=max(1, options['chunk_size']),
+            dry_run=options['dry_run'],
+        )
+        verb = 'Due' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {count} appointment reminders'))
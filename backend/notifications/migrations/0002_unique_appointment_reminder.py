@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('category', 'APPOINTMENT_REMINDER')), fields=('appointment', 'category'), name='unique_appointment_reminder'),
+        ),
+    ]
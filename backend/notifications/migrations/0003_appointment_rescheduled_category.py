@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_unique_appointment_reminder'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='category',
+            field=models.CharField(choices=[('APPOINTMENT_REMINDER', 'Appointment Reminder'), ('APPOINTMENT_CONFIRMED', 'Appointment Confirmed'), ('APPOINTMENT_CANCELLED', 'Appointment Cancelled'), ('APPOINTMENT_RESCHEDULED', 'Appointment Rescheduled'), ('PRESCRIPTION_READY', 'Prescription Ready'), ('LAB_REPORT_READY', 'Lab Report Ready'), ('PAYMENT_SUCCESS', 'Payment Success'), ('PAYMENT_FAILED', 'Payment Failed'), ('MEDICINE_DISPATCHED', 'Medicine Dispatched'), ('GENERAL', 'General')], default='GENERAL', max_length=50),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:46
+
+from datetime import date, time
+from django.db import migrations, models
+
+
+def populate_reminder_slot(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    reminders = Notification.objects.filter(category='APPOINTMENT_REMINDER', appointment__isnull=False)
+    for reminder in reminders.iterator():
+        try:
+            reminder.appointment_date = date.fromisoformat(reminder.metadata['appointment_date'])
+            reminder.appointment_time = time.fromisoformat(reminder.metadata['appointment_time'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        reminder.save(update_fields=['appointment_date', 'appointment_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_appointment_rescheduled_category'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='notification',
+            name='unique_appointment_reminder',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='appointment_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='appointment_time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_reminder_slot, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('category', 'APPOINTMENT_REMINDER')), fields=('appointment', 'category', 'appointment_date', 'appointment_time'), name='unique_appointment_reminder'),
+        ),
+    ]
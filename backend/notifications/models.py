@@ -22,6 +22,7 @@ class Notification(models.Model):
         ('APPOINTMENT_REMINDER', 'Appointment Reminder'),
         ('APPOINTMENT_CONFIRMED', 'Appointment Confirmed'),
         ('APPOINTMENT_CANCELLED', 'Appointment Cancelled'),
+        ('APPOINTMENT_RESCHEDULED', 'Appointment Rescheduled'),
         ('PRESCRIPTION_READY', 'Prescription Ready'),
         ('LAB_REPORT_READY', 'Lab Report Ready'),
         ('PAYMENT_SUCCESS', 'Payment Success'),
@@ -40,6 +41,9 @@ class Notification(models.Model):
     # Related entities
     appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, null=True, blank=True,
                                     related_name='notifications')
+    # Slot an appointment reminder was sent for, so a rescheduled appointment is reminded again
+    appointment_date = models.DateField(null=True, blank=True)
+    appointment_time = models.TimeField(null=True, blank=True)
     
     # Delivery tracking
     sent_at = models.DateTimeField(null=True, blank=True)
@@ -58,6 +62,14 @@ class Notification(models.Model):
             models.Index(fields=['category', 'status']),
             models.Index(fields=['appointment', 'status']),
         ]
+        constraints = [
+            # One reminder per appointment slot, so the reminder job can be re-run safely
+            models.UniqueConstraint(
+                fields=['appointment', 'category', 'appointment_date', 'appointment_time'],
+                condition=models.Q(category='APPOINTMENT_REMINDER'),
+                name='unique_appointment_reminder',
+            ),
+        ]
         ordering = ['-created_at']
     
     def __str__(self):
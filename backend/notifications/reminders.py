@@ -0,0 +1,92 @@
+"""
+Batch creation of appointment reminders.
+
+Appointments in the look-ahead window are read through the
+``(status, appointment_date)`` index as plain value rows, streamed in
+chunks, and written with one ``bulk_create`` per chunk. Reminders record
+the slot they were sent for; appointments already reminded of their
+current slot are excluded in the same query (a rescheduled appointment is
+reminded again), and the ``unique_appointment_reminder`` constraint with
+``ignore_conflicts`` keeps overlapping or concurrent runs from creating
+duplicates.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from appointments.models import Appointment
+from .models import Notification
+
+REMINDER_CATEGORY = 'APPOINTMENT_REMINDER'
+# Statuses of appointments that are still going to happen
+REMINDER_STATUSES = ['ASSIGNED', 'CONFIRMED', 'RESCHEDULED']
+CHUNK_SIZE = 2000
+
+
+def due_appointments(start, end):
+    """Value rows of appointments between ``start`` and ``end`` that have no reminder for their slot yet"""
+    in_window = Q(appointment_date__gt=start.date()) | Q(appointment_date=start.date(),
+                                                         appointment_time__gte=start.time())
+    in_window &= Q(appointment_date__lt=end.date()) | Q(appointment_date=end.date(),
+                                                        appointment_time__lte=end.time())
+    reminded = Notification.objects.filter(
+        appointment=OuterRef('pk'), category=REMINDER_CATEGORY,
+        appointment_date=OuterRef('appointment_date'), appointment_time=OuterRef('appointment_time'),
+    )
+    return Appointment.objects.filter(
+        in_window,
+        status__in=REMINDER_STATUSES,
+        appointment_date__gte=start.date(),
+        appointment_date__lte=end.date(),
+    ).exclude(Exists(reminded)).order_by().values(
+        'id', 'patient__user_id', 'appointment_date', 'appointment_time', 'hospital__name',
+        'doctor__user__first_name', 'doctor__user__last_name',
+    )
+
+
+def build_reminder(row, notification_type):
+    doctor = ' '.join(filter(None, [row['doctor__user__first_name'], row['doctor__user__last_name']]))
+    with_doctor = f' with Dr. {doctor}' if doctor else ''
+    when = f"{row['appointment_date']:%d %b %Y} at {row['appointment_time']:%H:%M}"
+    return Notification(
+        user_id=row['patient__user_id'],
+        notification_type=notification_type,
+        category=REMINDER_CATEGORY,
+        title='Appointment Reminder',
+        message=f"Your appointment{with_doctor} at {row['hospital__name']} is on {when}.",
+        appointment_id=row['id'],
+        appointment_date=row['appointment_date'],
+        appointment_time=row['appointment_time'],
+        metadata={'appointment_date': row['appointment_date'].isoformat(),
+                  'appointment_time': row['appointment_time'].isoformat()},
+    )
+
+
+def create_appointment_reminders(hours=None, now=None, notification_type='PUSH', chunk_size=CHUNK_SIZE,
+                                 dry_run=False):
+    """
+    Create a reminder for every upcoming appointment in the next ``hours``.
+
+    Returns the number of appointments that were due a reminder.
+    """
+    hours = settings.APPOINTMENT_REMINDER_HOURS if hours is None else hours
+    start = timezone.localtime(now)
+    end = start + timedelta(hours=hours)
+    rows = due_appointments(start.replace(tzinfo=None), end.replace(tzinfo=None))
+
+    count = 0
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(build_reminder(row, notification_type))
+        if len(chunk) >= chunk_size:
+            count += _flush(chunk, dry_run)
+            chunk = []
+    if chunk:
+        count += _flush(chunk, dry_run)
+    return count
+
+
+def _flush(chunk, dry_run):
+    if not dry_run:
+        Notification.objects.bulk_create(chunk, batch_size=len(chunk), ignore_conflicts=True)
+    return len(chunk)
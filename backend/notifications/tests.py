@@ -0,0 +1,41 @@
+from datetime import datetime, time, timedelta
+from django.test import TestCase
+from django.utils import timezone
+from appointments.models import Appointment, Patient
+from hospitals.models import Hospital
+from users.models import User
+from .models import Notification
+from .reminders import create_appointment_reminders
+
+
+class AppointmentReminderTests(TestCase):
+    """Reminder batches"""
+
+    def setUp(self):
+        user = User.objects.create_user(email='patient@a.test', password='password', first_name='Test',
+                                        last_name='Patient', role='PATIENT')
+        hospital = Hospital.objects.create(
+            name='Hospital A', address='1 Main Road', city='Pune', state='Maharashtra', pincode='411001',
+            phone='0000000000', email='info@hospital.test', license_number='A', is_approved=True
+        )
+        self.now = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), time(8)))
+        self.appointment = Appointment.objects.create(
+            patient=Patient.objects.create(user=user), hospital=hospital, appointment_date=self.now.date(),
+            appointment_time=time(10), status='CONFIRMED'
+        )
+
+    def test_reruns_do_not_duplicate_reminders(self):
+        self.assertEqual(create_appointment_reminders(hours=24, now=self.now), 1)
+        self.assertEqual(create_appointment_reminders(hours=24, now=self.now), 0)
+        reminder = Notification.objects.get()
+        self.assertEqual((reminder.appointment_date, reminder.appointment_time), (self.now.date(), time(10)))
+
+    def test_rescheduled_appointment_is_reminded_again(self):
+        create_appointment_reminders(hours=24, now=self.now)
+        self.appointment.appointment_time = time(14)
+        self.appointment.status = 'RESCHEDULED'
+        self.appointment.save()
+        self.assertEqual(create_appointment_reminders(hours=24, now=self.now), 1)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('appointment_time', flat=True)), [time(10), time(14)]
+        )
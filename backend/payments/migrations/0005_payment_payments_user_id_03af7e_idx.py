@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_invoice_payment_hospital_payment_hospital_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user', 'created_at'], name='payments_user_id_03af7e_idx'),
+        ),
+    ]
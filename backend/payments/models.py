@@ -63,6 +63,7 @@ class Payment(models.Model):
         db_table = 'payments'
         indexes = [
             models.Index(fields=['user', 'status']),
+            models.Index(fields=['user', 'created_at']),
             models.Index(fields=['hospital', 'status']),
             models.Index(fields=['payment_type', 'status']),
             models.Index(fields=['transaction_id']),
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0003_rename_invoices_invoice_7778bc_idx_pharmacy_in_invoice_4dbe8d_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pharmacyorder',
+            index=models.Index(fields=['pharmacy', 'created_at'], name='pharmacy_or_pharmac_6eadc0_idx'),
+        ),
+    ]
@@ -74,6 +74,7 @@ class PharmacyOrder(models.Model):
         db_table = 'pharmacy_orders'
         indexes = [
             models.Index(fields=['pharmacy', 'status']),
+            models.Index(fields=['pharmacy', 'created_at']),
             models.Index(fields=['prescription', 'status']),
             models.Index(fields=['status', 'created_at']),
         ]
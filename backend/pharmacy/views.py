@@ -10,6 +10,7 @@ from .serializers import (
 )
 from users.permissions import IsPharmacyAdmin, IsSuperAdmin
 from users.models import AuditLog
+from healthcare_platform.pagination import KeysetPagination, paginated_response
 
 
 class PharmacyListCreateAPIView(generics.ListCreateAPIView):
@@ -93,6 +94,7 @@ class PharmacyOrderListCreateAPIView(generics.ListCreateAPIView):
     queryset = PharmacyOrder.objects.all()
     serializer_class = PharmacyOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         queryset = PharmacyOrder.objects.select_related('prescription', 'pharmacy')
@@ -211,7 +213,8 @@ def pharmacy_orders(request):
     if not pharmacy:
         return Response({'error': 'Pharmacy profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    orders = PharmacyOrder.objects.filter(pharmacy=pharmacy).order_by('-created_at')
-    serializer = PharmacyOrderSerializer(orders, many=True)
-    return Response(serializer.data)
+    orders = PharmacyOrder.objects.filter(pharmacy=pharmacy).order_by('-created_at', '-id')
+    return paginated_response(request, orders,
+                              lambda rows: PharmacyOrderSerializer(rows, many=True).data,
+                              ['-created_at', '-id'])
 
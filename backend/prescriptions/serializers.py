@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from appointments.serializers import PatientSerializer, AppointmentSerializer
+from appointments.transitions import complete_consultation
 from hospitals.serializers import DoctorSerializer
 from .models import Medicine, Prescription, PrescriptionMedicine, LabTestRecommendation
 
@@ -105,9 +106,9 @@ class PrescriptionCreateSerializer(serializers.ModelSerializer):
                 test_description=test_data.get('test_description', '')
             )
         
-        # Update appointment status to completed
-        appointment.status = 'COMPLETED'
-        appointment.save()
+        # Writing the prescription finishes the consultation
+        request = self.context.get('request')
+        complete_consultation(appointment, user=request.user if request else None)
         
         return prescription
 
@@ -8,6 +8,7 @@ from .serializers import (
 )
 from users.permissions import IsDoctor, IsPatient
 from users.models import AuditLog
+from healthcare_platform.pagination import KeysetPagination, paginated_response
 
 
 class MedicineListCreateAPIView(generics.ListCreateAPIView):
@@ -32,6 +33,7 @@ class PrescriptionListCreateAPIView(generics.ListCreateAPIView):
     """List or create prescriptions"""
     queryset = Prescription.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -116,7 +118,8 @@ def patient_prescriptions(request):
     if not patient:
         return Response({'error': 'Patient profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    prescriptions = Prescription.objects.filter(patient=patient).order_by('-created_at')
-    serializer = PrescriptionSerializer(prescriptions, many=True)
-    return Response(serializer.data)
+    prescriptions = Prescription.objects.filter(patient=patient).order_by('-created_at', '-id')
+    return paginated_response(request, prescriptions,
+                              lambda rows: PrescriptionSerializer(rows, many=True).data,
+                              ['-created_at', '-id'])
 